@@ -14,69 +14,66 @@ import re
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
-from openai import OpenAI
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_client = None
 
 
-# ==========================================
-# 1. ANÁLISIS DE HYPE VS SUSTANCIA
-# ==========================================
+def _get_client():
+    """Crea el cliente de OpenAI en el primer uso (no al importar el módulo)"""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
 
-def analyze_hype_vs_substance(
-    title: str,
-    content: str,
-    sources: List[str] = None
-) -> Dict[str, Any]:
+
+# Timeout (s) y reintentos por llamada de hype/títulos (el enriquecimiento del
+# digest); el resto de llamadas usa los valores por defecto del cliente. La
+# concurrencia/rate de api.openai.com es la compartida de http_client
+ADVANCED_CALL_TIMEOUT = float(os.getenv("ADVANCED_CALL_TIMEOUT", "30"))
+ADVANCED_MAX_RETRIES = int(os.getenv("ADVANCED_MAX_RETRIES", "1"))
+
+
+def _chat(timeout: Optional[float] = None, max_retries: Optional[int] = None, **kwargs):
     """
-    Detecta si un tema tiene contenido real o es solo hype/ruido
-    
-    Args:
-        title: Título del artículo/tema
-        content: Contenido del artículo
-        sources: Lista de URLs fuente (opcional)
-        
-    Returns:
-        {
-            'substance_score': float (0-10),
-            'hype_score': float (0-10),
-            'verdict': 'substance' | 'hype' | 'mixed',
-            'reasoning': str,
-            'red_flags': [str],
-            'green_flags': [str]
-        }
+    chat.completions.create con el límite compartido de la API; timeout y
+    max_retries solo cambian los del cliente si se pasan
     """
-    # Red flags típicos de hype sin sustancia
-    hype_indicators = [
-        r'\b(revolucion|revolucionar|cambiar el mundo|game changer)\b',
-        r'\b(nunca antes visto|histórico|sin precedentes)\b',
-        r'\b(pronto|muy pronto|inminente)\b',
-        r'\b(rumor|se dice|podría|posiblemente)\b',
-        r'[!]{2,}',  # Múltiples signos de exclamación
-    ]
-    
-    # Green flags de contenido sustancial
-    substance_indicators = [
-        r'\b(paper|estudio|investigación|research)\b',
-        r'\b(benchmark|resultado|métrica|performance)\b',
-        r'\b(código|github|open source|implementación)\b',
-        r'\b(técnica|arquitectura|algoritmo|método)\b',
-        r'\d+%',  # Porcentajes (datos concretos)
-    ]
-    
-    combined_text = (title + " " + content).lower()
-    
-    # Contar indicadores
-    hype_count = sum(1 for pattern in hype_indicators if re.search(pattern, combined_text, re.IGNORECASE))
-    substance_count = sum(1 for pattern in substance_indicators if re.search(pattern, combined_text, re.IGNORECASE))
-    
-    # Scoring simple basado en indicadores
-    hype_score_simple = min(10, hype_count * 2)
-    substance_score_simple = min(10, substance_count * 2)
+    import http_client
     
-    # Análisis con LLM para más precisión
+    client = _get_client()
+    options = {k: v for k, v in (("timeout", timeout), ("max_retries", max_retries)) if v is not None}
+    if options:
+        client = client.with_options(**options)
+    with http_client.limit("api.openai.com"):
+        return client.chat.completions.create(**kwargs)
+
+
+# ==========================================
+# 1. ANÁLISIS DE HYPE VS SUSTANCIA
+# ==========================================
+
+_HYPE_INDICATORS = [
+    r'\b(revolucion|revolucionar|cambiar el mundo|game changer)\b',
+    r'\b(nunca antes visto|histórico|sin precedentes)\b',
+    r'\b(pronto|muy pronto|inminente)\b',
+    r'\b(rumor|se dice|podría|posiblemente)\b',
+    r'[!]{2,}',  # Múltiples signos de exclamación
+]
+
+_SUBSTANCE_INDICATORS = [
+    r'\b(paper|estudio|investigación|research)\b',
+    r'\b(benchmark|resultado|métrica|performance)\b',
+    r'\b(código|github|open source|implementación)\b',
+    r'\b(técnica|arquitectura|algoritmo|método)\b',
+    r'\d+%',  # Porcentajes (datos concretos)
+]
+
+
+def hype_request(title: str, content: str) -> Dict[str, Any]:
+    """Petición de chat de analyze_hype_vs_substance (también para Batch API)"""
     prompt = f"""Analiza este tema de IA y determina si tiene contenido sustancial o es principalmente hype:
 
 Título: {title}
@@ -97,21 +94,35 @@ Responde en JSON:
     "red_flags": ["flag1", "flag2"],
     "green_flags": ["flag1", "flag2"]
 }}"""
+    return {
+        'system': "Eres un analista experto en detectar hype vs contenido sustancial en noticias de IA.",
+        'user': prompt,
+        'temperature': 0.3,
+        'max_tokens': 400,
+    }
 
+
+def hype_from_response(title: str, content: str, text: Optional[str],
+                       error: Optional[BaseException] = None) -> Dict[str, Any]:
+    """
+    Combina la respuesta JSON del LLM con el scoring por indicadores; sin
+    respuesta válida usa solo los indicadores
+    """
+    combined_text = (title + " " + content).lower()
+    
+    # Contar indicadores
+    hype_count = sum(1 for pattern in _HYPE_INDICATORS if re.search(pattern, combined_text, re.IGNORECASE))
+    substance_count = sum(1 for pattern in _SUBSTANCE_INDICATORS if re.search(pattern, combined_text, re.IGNORECASE))
+    
+    # Scoring simple basado en indicadores
+    hype_score_simple = min(10, hype_count * 2)
+    substance_score_simple = min(10, substance_count * 2)
+    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Eres un analista experto en detectar hype vs contenido sustancial en noticias de IA."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=400,
-            response_format={"type": "json_object"}
-        )
-        
+        if text is None:
+            raise error or ValueError("empty response")
         import json
-        result = json.loads(response.choices[0].message.content)
+        result = json.loads(text)
         
         # Combinar con scoring simple
         result['substance_score'] = (result['substance_score'] + substance_score_simple) / 2
@@ -131,6 +142,51 @@ Responde en JSON:
         }
 
 
+def analyze_hype_vs_substance(
+    title: str,
+    content: str,
+    sources: List[str] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Detecta si un tema tiene contenido real o es solo hype/ruido
+    
+    Args:
+        title: Título del artículo/tema
+        content: Contenido del artículo
+        sources: Lista de URLs fuente (opcional)
+        timeout: Segundos máximos de la llamada al LLM (ADVANCED_CALL_TIMEOUT)
+        
+    Returns:
+        {
+            'substance_score': float (0-10),
+            'hype_score': float (0-10),
+            'verdict': 'substance' | 'hype' | 'mixed',
+            'reasoning': str,
+            'red_flags': [str],
+            'green_flags': [str]
+        }
+    """
+    # Análisis con LLM para más precisión (indicadores textuales como respaldo)
+    req = hype_request(title, content)
+    try:
+        response = _chat(
+            timeout=timeout or ADVANCED_CALL_TIMEOUT,
+            max_retries=ADVANCED_MAX_RETRIES,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": req['system']},
+                {"role": "user", "content": req['user']}
+            ],
+            temperature=req['temperature'],
+            max_tokens=req['max_tokens'],
+            response_format={"type": "json_object"}
+        )
+        return hype_from_response(title, content, response.choices[0].message.content)
+    except Exception as e:
+        return hype_from_response(title, content, None, e)
+
+
 # ==========================================
 # 2. ANÁLISIS DE COMPETENCIA
 # ==========================================
@@ -177,7 +233,7 @@ Responde en JSON:
 }}"""
 
     try:
-        response = client.chat.completions.create(
+        response = _chat(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Eres un analista de contenido de YouTube especializado en IA."},
@@ -205,32 +261,12 @@ Responde en JSON:
 # 3. GENERACIÓN DE TÍTULOS Y THUMBNAILS
 # ==========================================
 
-def generate_video_titles(
+def titles_request(
     topic: str,
     target_audience: str = "desarrolladores y entusiastas de IA",
     style: str = "informativo y atractivo"
 ) -> Dict[str, Any]:
-    """
-    Genera títulos atractivos para videos de YouTube
-    
-    Args:
-        topic: Tema del video
-        target_audience: Audiencia objetivo
-        style: Estilo del título
-        
-    Returns:
-        {
-            'titles': [
-                {
-                    'title': str,
-                    'hook': str,
-                    'viral_potential': float (0-10),
-                    'reasoning': str
-                }
-            ],
-            'thumbnail_ideas': [str]
-        }
-    """
+    """Petición de chat de generate_video_titles (también para Batch API)"""
     prompt = f"""Genera 5 títulos atractivos para un video de YouTube sobre:
 
 Tema: {topic}
@@ -257,21 +293,22 @@ Responde en JSON:
     ],
     "thumbnail_ideas": ["idea1", "idea2", "idea3"]
 }}"""
+    return {
+        'system': "Eres un experto en títulos virales para YouTube especializado en contenido tech/IA.",
+        'user': prompt,
+        'temperature': 0.7,
+        'max_tokens': 800,
+    }
+
 
+def titles_from_response(topic: str, text: Optional[str],
+                         error: Optional[BaseException] = None) -> Dict[str, Any]:
+    """Parsea la respuesta JSON del LLM; sin respuesta válida devuelve un título genérico"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Eres un experto en títulos virales para YouTube especializado en contenido tech/IA."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800,
-            response_format={"type": "json_object"}
-        )
-        
+        if text is None:
+            raise error or ValueError("empty response")
         import json
-        return json.loads(response.choices[0].message.content)
+        return json.loads(text)
         
     except Exception as e:
         return {
@@ -287,6 +324,53 @@ Responde en JSON:
         }
 
 
+def generate_video_titles(
+    topic: str,
+    target_audience: str = "desarrolladores y entusiastas de IA",
+    style: str = "informativo y atractivo",
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Genera títulos atractivos para videos de YouTube
+    
+    Args:
+        topic: Tema del video
+        target_audience: Audiencia objetivo
+        style: Estilo del título
+        timeout: Segundos máximos de la llamada al LLM (ADVANCED_CALL_TIMEOUT)
+        
+    Returns:
+        {
+            'titles': [
+                {
+                    'title': str,
+                    'hook': str,
+                    'viral_potential': float (0-10),
+                    'reasoning': str
+                }
+            ],
+            'thumbnail_ideas': [str]
+        }
+    """
+    req = titles_request(topic, target_audience, style)
+    try:
+        response = _chat(
+            timeout=timeout or ADVANCED_CALL_TIMEOUT,
+            max_retries=ADVANCED_MAX_RETRIES,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": req['system']},
+                {"role": "user", "content": req['user']}
+            ],
+            temperature=req['temperature'],
+            max_tokens=req['max_tokens'],
+            response_format={"type": "json_object"}
+        )
+        return titles_from_response(topic, response.choices[0].message.content)
+    except Exception as e:
+        return titles_from_response(topic, None, e)
+
+
 # ==========================================
 # 4. SISTEMA DE SCORING INTELIGENTE
 # ==========================================
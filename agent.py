@@ -1,11 +1,13 @@
 import json
 import os
 import re
+import time
 from typing import List, Dict, Any, Optional
 from llm_providers import get_default_llm
 from tools import tool_catalog_text, call_tool
 from tools import TOOLS  # para validar nombres de herramientas
 from prompts_optimized import AGENT_SYSTEM_PROMPT_COT, select_prompt_for_task, add_step_counter
+import metrics
 
 # Prompt optimizado con Chain of Thought - mejor razonamiento, menos pasos
 SYSTEM_PROMPT = AGENT_SYSTEM_PROMPT_COT
@@ -91,10 +93,13 @@ class Agent:
         results = ws["data"]["results"]
         # 2) Leer top 2-3 URLs
         pre_obs: List[Dict[str, Any]] = [{"tool": "web_search", "result": ws}]
+        import domain_health
+
         urls = []
         for r in results:
             u = r.get("url")
-            if u and u not in urls:
+            # Dominios con el circuito abierto (lentos o sin texto) no cuentan
+            if u and u not in urls and not domain_health.is_open(u):
                 urls.append(u)
             if len(urls) >= 3:
                 break
@@ -135,16 +140,33 @@ class Agent:
         return None
 
     def run(self, task: str) -> str:
+        # Métricas por ejecución (local: la instancia se comparte entre requests)
+        stats: Dict[str, Any] = {"steps": 0, "outcome": "final"}
+        start = time.perf_counter()
+        try:
+            return self._run(task, stats)
+        except Exception:
+            stats["outcome"] = "error"
+            raise
+        finally:
+            metrics.AGENT_RUN_SECONDS.observe(time.perf_counter() - start)
+            metrics.AGENT_RUN_STEPS.observe(stats["steps"])
+            metrics.AGENT_RUNS.inc(outcome=stats["outcome"])
+
+    def _run(self, task: str, stats: Dict[str, Any]) -> str:
         # Intento previo: auto-web si aplica
         if getattr(self, "auto_web", False) and self._looks_factual(task):
             try:
                 auto = self._auto_web_preflight(task)
+                metrics.AGENT_PREFLIGHT.inc(result="hit" if auto else "miss")
                 if auto:
+                    stats["outcome"] = "preflight"
                     return auto
             except Exception:
-                pass
+                metrics.AGENT_PREFLIGHT.inc(result="error")
         observations: List[Dict[str, Any]] = []
         for step in range(self.max_steps):
+            stats["steps"] = step + 1
             messages = self._messages(task, observations, current_step=step)
             raw = self.llm.generate(messages)
             parsed = self._parse_json(raw)
@@ -154,7 +176,10 @@ class Agent:
                 raw = self.llm.generate(messages)
                 parsed = self._parse_json(raw)
                 if not parsed:
+                    metrics.AGENT_PARSE_FAILURES.inc(outcome="fatal")
+                    stats["outcome"] = "parse_error"
                     return f"[agent] No pude parsear JSON del modelo: {raw[:500]}"
+                metrics.AGENT_PARSE_FAILURES.inc(outcome="recovered")
             # Final directo
             if isinstance(parsed, dict) and "final" in parsed:
                 return str(parsed.get("final", ""))
@@ -215,6 +240,8 @@ class Agent:
             observations.append({"tool": "(parser)", "result": {"ok": False, "data": None, "error": f"Formato no reconocido: {parsed}"}})
             # En el último paso, devuelve el error
             if step == self.max_steps - 1:
+                stats["outcome"] = "parse_error"
                 return f"[agent] Formato no reconocido: {parsed}"
             continue
+        stats["outcome"] = "max_steps"
         return "[agent] Se alcanzó el máximo de pasos sin respuesta final."
@@ -13,16 +13,13 @@ import json
 import smtplib
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
 from collections import Counter
 
-from duckduckgo_search import DDGS
-import trafilatura
-import feedparser
-
 
 def _ok(ok: bool, data: Any, error: str = "") -> Dict[str, Any]:
     return {"ok": ok, "data": data, "error": error}
@@ -81,92 +78,250 @@ RSS_SOURCES = {
 }
 
 
-def fetch_all_rss_feeds(hours=48, categories=None):
+def _parse_feed_entries(content: bytes, max_entries: int = 10) -> List[Dict[str, Any]]:
+    """
+    Parsea un feed (bytes) a entradas planas JSON-serializables, listas
+    para cachear: el HTML del resumen ya viene limpio y la fecha en ISO.
     """
-    Obtiene posts de todos los RSS feeds
+    import feedparser
+
+    feed = feedparser.parse(content)
+    entries = []
+    for entry in feed.entries[:max_entries]:  # Max 10 por feed
+        pub_date = None
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            pub_date = datetime(*entry.published_parsed[:6])
+        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+            pub_date = datetime(*entry.updated_parsed[:6])
+        
+        summary = entry.get('summary', entry.get('description', ''))
+        if '<' in summary:
+            from bs4 import BeautifulSoup
+            summary = BeautifulSoup(summary, 'html.parser').get_text()
+        
+        entries.append({
+            'id': entry.get('id') or entry.get('link', ''),
+            'title': entry.get('title', ''),
+            'link': entry.get('link', ''),
+            'summary': summary[:300],
+            'published': pub_date.isoformat() if pub_date else None,
+        })
+    return entries
+
+
+def fetch_all_rss_feeds(hours=48, categories=None, timeout=None, deadline=None):
+    """
+    Obtiene posts de todos los RSS feeds (descarga concurrente + GET condicional)
+    
+    Ingestión incremental: cada entrada se registra una sola vez en el índice
+    persistente (entry_store). Solo las entradas nuevas se procesan; el resto
+    se toma de la ventana guardada, incluso si un feed falla en esta corrida.
+    Un artículo que ya llegó por otro feed o por la búsqueda web (misma URL
+    canónica en url_canon con fuente 'rss' o 'web') no se vuelve a agregar;
+    que el agente lo haya leído ('read') o indexado en el RAG no cuenta.
     
     Args:
         hours: Filtrar últimas N horas
         categories: ['substacks', 'communities', ...] o None para todas
+        timeout: Timeout por feed en segundos (FEED_TIMEOUT por defecto)
+        deadline: Tiempo máximo total de descarga (FEED_DEADLINE por defecto)
     
     Returns:
         {
-            'all_posts': [...],
+            'all_posts': [...],          # ventana completa (guardado + nuevo)
+            'new_posts': [...],          # vistos por primera vez en esta corrida
+            'unprocessed_posts': [...],  # de la ventana, aún no procesados por el digest
             'by_category': {'substacks': [...], ...},
             'stats': {...}
         }
     """
+    import entry_store
+    import feed_fetcher
+    import text_index
+    import url_canon
+
     if categories is None:
         categories = list(RSS_SOURCES.keys())
     
     cutoff_time = datetime.now() - timedelta(hours=hours)
-    all_posts = []
     by_category = {cat: [] for cat in categories}
-    stats = {'total': 0, 'by_source': {}, 'errors': []}
+    new_posts = []
+    stats = {
+        'total': 0, 'new': 0, 'duplicates': 0, 'by_source': {}, 'errors': [], 'fetch_seconds': {},
+        'not_modified': [], 'bytes_downloaded': {}, 'bytes_saved': {},
+    }
     
-    for category in categories:
-        if category not in RSS_SOURCES:
-            continue
+    sources = [
+        (category, source)
+        for category in categories if category in RSS_SOURCES
+        for source in RSS_SOURCES[category]
+    ]
+    store = entry_store.EntryStore()
+    ingested = {}  # clave canónica -> URL, se registran en url_canon tras guardar
+    
+    # Descarga en paralelo: el total lo marca el feed más lento, no la suma.
+    # Los feeds sin cambios (304) reutilizan el parseo cacheado.
+    start = time.monotonic()
+    feeds = feed_fetcher.fetch_feeds_cached(
+        [source['rss'] for _, source in sources],
+        parse=_parse_feed_entries,
+        timeout=timeout or feed_fetcher.FEED_TIMEOUT,
+        deadline=deadline or feed_fetcher.FEED_DEADLINE,
+    )
+    stats['fetch_wall_seconds'] = round(time.monotonic() - start, 2)
+    
+    for category, source in sources:
+        source_name = source.get('name', source['rss'])
+        try:
+            res = feeds.get(source['rss']) or {'ok': False, 'error': 'no descargado'}
+            stats['fetch_seconds'][source_name] = round(res.get('elapsed', 0.0), 2)
+            if not res['ok']:
+                raise RuntimeError(res['error'])
+            stats['bytes_downloaded'][source_name] = res['bytes_downloaded']
+            stats['bytes_saved'][source_name] = res['bytes_saved']
+            if res['from_cache']:
+                stats['not_modified'].append(source_name)
             
-        for source in RSS_SOURCES[category]:
-            try:
-                feed = feedparser.parse(source['rss'])
-                source_name = source.get('name', source['rss'])
+            for entry in res['entries']:
+                key = entry_store.entry_key(source['rss'], entry.get('id') or entry.get('link', ''))
+                if key in store:
+                    continue  # ya procesada en una corrida anterior
                 
-                for entry in feed.entries[:10]:  # Max 10 por feed
-                    # Parse fecha
-                    pub_date = None
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        pub_date = datetime(*entry.published_parsed[:6])
-                    elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                        pub_date = datetime(*entry.updated_parsed[:6])
-                    else:
-                        pub_date = datetime.now()
-                    
-                    if pub_date < cutoff_time:
+                # Mismo artículo por otra fuente (redirecciones de feedproxy
+                # y acortadores se resuelven una vez y quedan cacheadas)
+                link = entry.get('link', '')
+                if link:
+                    resolved = url_canon.resolve(link)
+                    canonical = url_canon.key(resolved)
+                    if canonical in ingested or {'rss', 'web'} & set(url_canon.sources(resolved)):
+                        stats['duplicates'] += 1
                         continue
-                    
-                    # Extraer contenido
-                    summary = entry.get('summary', entry.get('description', ''))
-                    if '<' in summary:
-                        from bs4 import BeautifulSoup
-                        summary = BeautifulSoup(summary, 'html.parser').get_text()
-                    
-                    post = {
-                        'title': entry.get('title', ''),
-                        'link': entry.get('link', ''),
-                        'summary': summary[:300],
-                        'published': pub_date.isoformat(),
-                        'source_name': source_name,
-                        'author': source.get('author', ''),
-                        'category': category
-                    }
-                    
-                    all_posts.append(post)
-                    by_category[category].append(post)
-                    stats['total'] += 1
-                
-                stats['by_source'][source_name] = len(by_category[category])
-                time.sleep(0.1)  # Rate limiting cortés
                 
-            except Exception as e:
-                stats['errors'].append({'source': source.get('name', '?'), 'error': str(e)})
-                continue
+                # Sin fecha en el feed: se toma el momento en que se vio por primera vez
+                post = {
+                    'title': entry.get('title', ''),
+                    'link': link,
+                    'canonical_url': canonical if link else '',
+                    'summary': entry.get('summary', ''),
+                    'published': entry.get('published') or datetime.now().isoformat(),
+                    'source_name': source_name,
+                    'author': source.get('author', ''),
+                    'category': category
+                }
+                new_posts.append(store.add(key, source['rss'], post)['post'])
+                if link:
+                    ingested[canonical] = resolved
+                text_index.index_document(link, post['title'], post['summary'], f"rss:{source_name}")
+            
+        except Exception as e:
+            stats['errors'].append({'source': source.get('name', '?'), 'error': str(e)})
+            continue
+    
+    # Ventana = lo guardado + lo nuevo, filtrado por fecha
+    all_posts = store.window(cutoff_time, sources=[source['rss'] for _, source in sources])
+    for post in all_posts:
+        if post.get('category') in by_category:
+            by_category[post['category']].append(post)
+        stats['by_source'][post['source_name']] = stats['by_source'].get(post['source_name'], 0) + 1
+    new_posts = [p for p in new_posts if p['published'] >= cutoff_time.isoformat()]
+    
+    stats['total'] = len(all_posts)
+    stats['new'] = len(new_posts)
+    stats['total_bytes_saved'] = sum(stats['bytes_saved'].values())
+    
+    try:
+        store.save()
+    except Exception as e:
+        print(f"Warning: Could not save entry store: {e}")
+    else:
+        # Solo con la entrada ya guardada: si se cae antes, se reingesta
+        for url in ingested.values():
+            url_canon.register(url, 'rss')
+    url_canon.save()
     
     # Ordenar por fecha
     all_posts.sort(key=lambda x: x['published'], reverse=True)
+    new_posts.sort(key=lambda x: x['published'], reverse=True)
     
     return {
         'all_posts': all_posts,
+        'new_posts': new_posts,
+        'unprocessed_posts': [p for p in all_posts if not store.is_processed(p['entry_key'])],
         'by_category': by_category,
         'stats': stats
     }
 
 
+# Pipeline de noticias web: búsquedas concurrentes (ritmo de DDG acotado por
+# http_client) + descarga/extracción en un pool de hilos
+NEWS_SEARCH_WORKERS = int(os.getenv("NEWS_SEARCH_WORKERS", "4"))
+NEWS_FETCH_WORKERS = int(os.getenv("NEWS_FETCH_WORKERS", "8"))
+NEWS_DEADLINE = float(os.getenv("NEWS_DEADLINE", "60"))
+
+# Scoring ponderado de relevancia
+_NEWS_TIERS = (
+    ({'gpt-5', 'claude 4', 'breakthrough', 'agi', 'open source'}, 3, 2),
+    ({'openai', 'anthropic', 'deepmind', 'launch', 'funding', 'gpt-4'}, 2, 1),
+    ({'ai', 'llm', 'generative', 'machine learning', 'chatgpt'}, 1, 0),
+)
+
+
+_news_matcher = None
+
+
+def _news_keywords():
+    """Matcher de los keywords de relevancia (palabras completas, se compila una vez)"""
+    global _news_matcher
+    if _news_matcher is None:
+        from entity_matcher import EntityMatcher
+
+        _news_matcher = EntityMatcher({
+            kw: {'patterns': [r'\s+'.join(map(re.escape, kw.split()))], 'categories': [f'tier{i}']}
+            for i, (keywords, _, _) in enumerate(_NEWS_TIERS, 1)
+            for kw in keywords
+        })
+    return _news_matcher
+
+
+def _news_relevance(item: Dict[str, Any]) -> float:
+    matcher = _news_keywords()
+    in_body = set(matcher.iter_entities(item['title'] + ' ' + item['full_text']))
+    in_title = set(matcher.iter_entities(item['title']))
+    
+    score = 0
+    for keywords, text_points, title_points in _NEWS_TIERS:
+        for kw in keywords & in_body:
+            score += text_points
+            if kw in in_title:
+                score += title_points
+    return min(score / 30, 1.0)
+
+
+def _news_full_text(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Descarga + extracción vía read_url_clean (cache de 24h compartida con
+    el agente) y scoring en cuanto llega el texto. Devuelve una copia: el
+    original puede puntuarse en paralelo si vence el deadline.
+    """
+    from tools import read_url_clean
+
+    item = dict(item)
+    res = read_url_clean({'url': item['url'], 'max_chars': 4000})
+    if res['ok'] and res['data']['text']:
+        item['full_text'] = res['data']['text'][:2000]
+    item['relevance_score'] = _news_relevance(item)
+    return item
+
+
 def search_ai_news_advanced(hours=24, k=15):
     """
     Búsqueda avanzada de noticias de IA con queries optimizados
     
+    Pipeline: búsquedas DDG en paralelo (límite por dominio de http_client),
+    dedupe de URLs a medida que llegan, descarga/extracción con cache en un
+    pool de hilos y scoring por artículo apenas termina su extracción.
+    Lo que no termine antes de NEWS_DEADLINE se puntúa con el snippet.
+    
     Returns:
         [
             {
@@ -180,6 +335,12 @@ def search_ai_news_advanced(hours=24, k=15):
             ...
         ]
     """
+    try:
+        from duckduckgo_search import DDGS
+    except Exception:
+        return []
+    import domain_health
+
     # Queries avanzados por categoría
     query_sets = {
         'breakthrough': [
@@ -200,76 +361,80 @@ def search_ai_news_advanced(hours=24, k=15):
         ],
     }
     
-    all_results = []
-    seen_urls = set()
-    
-    # Seleccionar top 2 queries por categoría
+    # Seleccionar top query por categoría
     selected_queries = []
     for cat, qs in query_sets.items():
         selected_queries.extend(qs[:1])
+    per_query = max(1, k // len(selected_queries))
     
+    def run_query(query):
+        import http_client
+
+        with http_client.limit("duckduckgo.com"), DDGS() as ddgs:
+            return list(ddgs.news(query, max_results=per_query, safesearch='moderate', timelimit='d'))
+    
+    import url_canon
+
+    all_results = []
+    seen_urls = set()
+    fetch_futures = {}
+    collected = set()
+    deadline_at = time.monotonic() + NEWS_DEADLINE
+    search_pool = ThreadPoolExecutor(max_workers=NEWS_SEARCH_WORKERS, thread_name_prefix="news-search")
+    fetch_pool = ThreadPoolExecutor(max_workers=NEWS_FETCH_WORKERS, thread_name_prefix="news-fetch")
     try:
-        with DDGS() as ddgs:
-            for query in selected_queries:
-                try:
-                    for r in ddgs.news(query, max_results=k//len(selected_queries), safesearch='moderate', timelimit='d'):
-                        url = r.get('url') or r.get('href')
-                        if url and url not in seen_urls:
-                            seen_urls.add(url)
-                            
-                            # Intentar leer contenido completo
-                            full_text = ''
-                            try:
-                                downloaded = trafilatura.fetch_url(url, timeout=10)
-                                if downloaded:
-                                    full_text = trafilatura.extract(
-                                        downloaded,
-                                        include_comments=False,
-                                        include_tables=False
-                                    ) or ''
-                            except:
-                                pass
-                            
-                            all_results.append({
-                                'title': r.get('title', ''),
-                                'url': url,
-                                'snippet': r.get('body', '')[:300],
-                                'full_text': full_text[:2000] if full_text else r.get('body', ''),
-                                'source': 'DDG News',
-                                'date': r.get('date', '')
-                            })
-                    
-                    time.sleep(0.5)  # Rate limiting
-                except Exception:
+        search_futures = [search_pool.submit(run_query, q) for q in selected_queries]
+        # Cada hit nuevo pasa a descarga sin esperar al resto de búsquedas
+        for fut in as_completed(search_futures, timeout=NEWS_DEADLINE):
+            try:
+                hits = fut.result()
+            except Exception:
+                continue
+            for r in hits:
+                url = r.get('url') or r.get('href')
+                # Dedupe por URL canónica (tracking, AMP, www/m., redirecciones conocidas)
+                if not url or url_canon.key(url) in seen_urls:
                     continue
-    except Exception as e:
-        return []
-    
-    # Calcular relevancia con scoring ponderado
-    tier1 = {'gpt-5', 'claude 4', 'breakthrough', 'agi', 'open source'}
-    tier2 = {'openai', 'anthropic', 'deepmind', 'launch', 'funding', 'gpt-4'}
-    tier3 = {'ai', 'llm', 'generative', 'machine learning', 'chatgpt'}
-    
-    for item in all_results:
-        text_lower = (item['title'] + ' ' + item['full_text']).lower()
-        title_lower = item['title'].lower()
-        
-        score = 0
-        for kw in tier1:
-            if kw in text_lower:
-                score += 3
-                if kw in title_lower:
-                    score += 2
-        for kw in tier2:
-            if kw in text_lower:
-                score += 2
-                if kw in title_lower:
-                    score += 1
-        for kw in tier3:
-            if kw in text_lower:
-                score += 1
+                seen_urls.add(url_canon.key(url))
+                item = {
+                    'title': r.get('title', ''),
+                    'url': url,
+                    'snippet': r.get('body', '')[:300],
+                    'full_text': r.get('body', ''),
+                    'source': 'DDG News',
+                    'date': r.get('date', '')
+                }
+                if domain_health.is_open(url):
+                    # Circuito abierto: ni se intenta, se queda con el snippet
+                    item['relevance_score'] = _news_relevance(item)
+                    all_results.append(item)
+                    continue
+                fetch_futures[fetch_pool.submit(_news_full_text, item)] = item
         
-        item['relevance_score'] = min(score / 30, 1.0)
+        for fut in as_completed(fetch_futures, timeout=max(0.0, deadline_at - time.monotonic())):
+            collected.add(fut)
+            try:
+                all_results.append(fut.result())
+            except Exception:
+                item = fetch_futures[fut]
+                item['relevance_score'] = _news_relevance(item)
+                all_results.append(item)
+    except FuturesTimeout:
+        # Deadline: lo pendiente se queda con el snippet (copia: el worker
+        # puede seguir corriendo con el original)
+        for fut, item in fetch_futures.items():
+            if fut not in collected:
+                item = dict(item)
+                item['relevance_score'] = _news_relevance(item)
+                all_results.append(item)
+    finally:
+        search_pool.shutdown(wait=False, cancel_futures=True)
+        fetch_pool.shutdown(wait=False, cancel_futures=True)
+    
+    # Los que se quedaron con el snippet también quedan buscables localmente
+    import text_index
+    for item in all_results:
+        text_index.index_document(item['url'], item['title'], item.get('full_text', ''), 'news')
     
     # Ordenar por relevancia
     all_results.sort(key=lambda x: x['relevance_score'], reverse=True)
@@ -277,10 +442,16 @@ def search_ai_news_advanced(hours=24, k=15):
     return all_results[:10]  # Top 10
 
 
-def analyze_trends(rss_posts, news_articles):
+def analyze_trends(rss_posts, news_articles, record_history=True):
     """
     Analiza tendencias combinando RSS feeds y noticias
     
+    Args:
+        rss_posts: Posts RSS
+        news_articles: Noticias
+        record_history: Si True, guarda los conteos del día en la serie
+            temporal (trend_series) y calcula qué entidades aceleran
+    
     Returns:
         {
             'trending_topics': [{topic, mentions, sources}, ...],
@@ -288,56 +459,65 @@ def analyze_trends(rss_posts, news_articles):
             'hot_models': [...],
             'research_areas': [...],
             'tools_mentioned': [...],
-            'emerging_topics': [...]
+            'emerging_topics': [...],
+            'rising_topics': [{name, mentions, baseline, velocity, zscore, categories}, ...]
         }
     """
-    # Combinar todo el texto
-    all_text = ""
-    for post in rss_posts:
-        all_text += " " + post['title'] + " " + post.get('summary', '')
-    for article in news_articles:
-        all_text += " " + article['title'] + " " + article.get('full_text', '')
-    
-    text_lower = all_text.lower()
-    
-    # Detectar entidades
-    companies = re.findall(
-        r'\b(OpenAI|Anthropic|Google|Microsoft|Meta|DeepMind|Mistral|Cohere|'
-        r'Hugging\s*Face|Stability\s*AI|Midjourney|Perplexity)\b',
-        all_text, re.IGNORECASE
-    )
-    
-    models = re.findall(
-        r'\b(GPT-[0-9o]+|Claude\s*[0-9.]*|Gemini|LLaMA|Llama|Mistral|'
-        r'DALL-E|Stable\s*Diffusion|Midjourney)\b',
-        all_text, re.IGNORECASE
-    )
-    
-    research_terms = re.findall(
-        r'\b(RAG|fine-tuning|RLHF|prompt\s*engineering|multimodal|'
-        r'alignment|reasoning|agents?|transformers?|embeddings?)\b',
-        all_text, re.IGNORECASE
-    )
-    
-    tools = re.findall(
-        r'\b(LangChain|LlamaIndex|Ollama|AutoGPT|Cursor|Copilot|'
-        r'Pinecone|Weaviate|Chroma|FAISS)\b',
-        all_text, re.IGNORECASE
+    from entity_matcher import default_matcher
+
+    # Una pasada por documento con el matcher compilado (sin concatenar textos)
+    matcher = default_matcher()
+    docs = (
+        [post['title'] + " " + post.get('summary', '') for post in rss_posts]
+        + [article['title'] + " " + article.get('full_text', '') for article in news_articles]
     )
-    
-    # Contar menciones
-    company_counts = Counter([c.lower() for c in companies])
-    model_counts = Counter([m.lower() for m in models])
-    research_counts = Counter([r.lower() for r in research_terms])
-    tool_counts = Counter([t.lower() for t in tools])
+    scan = matcher.scan(docs)
+    by_cat = matcher.by_category(scan['mentions'])
+    
+    company_counts = by_cat.get('companies', Counter())
+    model_counts = by_cat.get('models', Counter())
+    research_counts = by_cat.get('research', Counter())
+    tool_counts = by_cat.get('tools', Counter())
+    
+    def _display(key):
+        # Dinámicas (gpt-4o, claude 3.5) vienen en minúsculas
+        return key if key in matcher.entities else key.title()
+    
+    # Serie temporal: compara hoy contra los días anteriores sin releer contenido
+    rising = []
+    if record_history:
+        try:
+            import trend_series
+            rising = trend_series.record_run(scan['mentions'])
+        except Exception as e:
+            print(f"⚠️  Serie de tendencias no disponible: {e}")
+    rising_topics = [
+        {
+            'name': _display(r['key']),
+            'mentions': scan['mentions'].get(r['key'], 0),
+            'baseline': r['baseline'],
+            'velocity': r['velocity'],
+            'zscore': r['zscore'],
+            'categories': matcher.category_of(r['key']),
+        }
+        for r in rising
+    ]
+    # Emergentes: temas de research en ascenso; sin historia suficiente,
+    # los mencionados pero no saturados
+    emerging = [r['key'] for r in rising if 'research' in matcher.category_of(r['key'])][:5]
+    if not rising:
+        emerging = [
+            t[0] for t in research_counts.most_common(15)
+            if t[1] >= 2 and t[1] <= 5
+        ][:5]
     
     return {
         'hot_companies': [
-            {'name': c[0].title(), 'mentions': c[1]} 
+            {'name': _display(c[0]), 'mentions': c[1]} 
             for c in company_counts.most_common(8)
         ],
         'hot_models': [
-            {'name': m[0].title(), 'mentions': m[1]}
+            {'name': _display(m[0]), 'mentions': m[1]}
             for m in model_counts.most_common(8)
         ],
         'research_areas': [
@@ -345,13 +525,11 @@ def analyze_trends(rss_posts, news_articles):
             for r in research_counts.most_common(10)
         ],
         'tools_mentioned': [
-            {'tool': t[0].title(), 'mentions': t[1]}
+            {'tool': _display(t[0]), 'mentions': t[1]}
             for t in tool_counts.most_common(8)
         ],
-        'emerging_topics': [
-            t[0] for t in research_counts.most_common(15)
-            if t[1] >= 2 and t[1] <= 5  # Mencionados pero no saturados
-        ][:5]
+        'emerging_topics': emerging,
+        'rising_topics': rising_topics
     }
 
 
@@ -386,6 +564,18 @@ def generate_video_ideas(trends, top_posts, top_news):
             'sources': [main_news['url']]
         })
     
+    # Idea 1b: Tema que más acelera respecto a su línea base
+    if trends.get('rising_topics'):
+        rising = trends['rising_topics'][0]
+        ideas.append({
+            'title': f"Por qué todos hablan de {rising['name']} esta semana",
+            'reason': f"En ascenso: {rising['mentions']} menciones hoy vs {rising['baseline']:.1f}/día de media (z={rising['zscore']:.1f})",
+            'difficulty': 'beginner',
+            'format': 'trend explainer',
+            'angle': 'Qué cambió, quién lo impulsa y si va a durar',
+            'sources': []
+        })
+    
     # Idea 2: Modelo/herramienta trending
     if trends['hot_models']:
         model = trends['hot_models'][0]
@@ -10,12 +10,19 @@ import os
 import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 BATCH_DIR = os.getenv("BATCH_DIR", "batches")
-os.makedirs(BATCH_DIR, exist_ok=True)
+
+_client = None
+
+
+def _get_client():
+    """Cliente de OpenAI diferido (importar batch_processor no carga el SDK)"""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
 
 
 def create_batch_request(
@@ -28,7 +35,9 @@ def create_batch_request(
     Crea un archivo JSONL para batch processing
     
     Args:
-        prompts: Lista de dicts con {'id': str, 'system': str, 'user': str}
+        prompts: Lista de dicts con {'id': str, 'system': str, 'user': str};
+            opcionalmente 'temperature', 'max_tokens' y 'json' (respuesta JSON)
+            por petición
         model: Modelo a usar
         temperature: Temperatura
         max_tokens: Máximo de tokens
@@ -36,7 +45,9 @@ def create_batch_request(
     Returns:
         Path al archivo JSONL creado
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Con microsegundos: el digest puede crear dos batches en el mismo segundo
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    os.makedirs(BATCH_DIR, exist_ok=True)
     jsonl_file = os.path.join(BATCH_DIR, f"batch_{timestamp}.jsonl")
     
     with open(jsonl_file, 'w', encoding='utf-8') as f:
@@ -51,10 +62,12 @@ def create_batch_request(
                         {"role": "system", "content": prompt.get('system', '')},
                         {"role": "user", "content": prompt['user']}
                     ],
-                    "temperature": temperature,
-                    "max_tokens": max_tokens
+                    "temperature": prompt.get('temperature', temperature),
+                    "max_tokens": prompt.get('max_tokens', max_tokens)
                 }
             }
+            if prompt.get('json'):
+                request["body"]["response_format"] = {"type": "json_object"}
             f.write(json.dumps(request) + '\n')
     
     print(f"📝 Created batch file: {jsonl_file} with {len(prompts)} requests")
@@ -74,7 +87,7 @@ def submit_batch(jsonl_file: str, description: str = "AI Content Research Batch"
     """
     # Subir archivo
     with open(jsonl_file, 'rb') as f:
-        batch_input_file = client.files.create(
+        batch_input_file = _get_client().files.create(
             file=f,
             purpose="batch"
         )
@@ -82,7 +95,7 @@ def submit_batch(jsonl_file: str, description: str = "AI Content Research Batch"
     print(f"📤 Uploaded file: {batch_input_file.id}")
     
     # Crear batch
-    batch = client.batches.create(
+    batch = _get_client().batches.create(
         input_file_id=batch_input_file.id,
         endpoint="/v1/chat/completions",
         completion_window="24h",
@@ -117,7 +130,7 @@ def check_batch_status(batch_id: str) -> dict:
     Returns:
         Dict con status info
     """
-    batch = client.batches.retrieve(batch_id)
+    batch = _get_client().batches.retrieve(batch_id)
     
     return {
         'id': batch.id,
@@ -143,7 +156,7 @@ def retrieve_batch_results(batch_id: str) -> Optional[List[Dict[str, Any]]]:
     Returns:
         Lista de resultados o None si no está listo
     """
-    batch = client.batches.retrieve(batch_id)
+    batch = _get_client().batches.retrieve(batch_id)
     
     if batch.status != "completed":
         print(f"⏳ Batch not ready yet. Status: {batch.status}")
@@ -154,7 +167,7 @@ def retrieve_batch_results(batch_id: str) -> Optional[List[Dict[str, Any]]]:
         return None
     
     # Descargar resultados
-    file_response = client.files.content(batch.output_file_id)
+    file_response = _get_client().files.content(batch.output_file_id)
     
     # Parsear JSONL
     results = []
@@ -169,6 +182,7 @@ def retrieve_batch_results(batch_id: str) -> Optional[List[Dict[str, Any]]]:
     print(f"✅ Retrieved {len(results)} results from batch {batch_id}")
     
     # Guardar resultados localmente
+    os.makedirs(BATCH_DIR, exist_ok=True)
     results_file = os.path.join(BATCH_DIR, f"results_{batch_id}.json")
     with open(results_file, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
@@ -214,7 +228,7 @@ def list_batches() -> List[dict]:
     Returns:
         Lista de batch info
     """
-    batches = client.batches.list(limit=100)
+    batches = _get_client().batches.list(limit=100)
     return [
         {
             'id': batch.id,
@@ -227,13 +241,16 @@ def list_batches() -> List[dict]:
 
 
 # Helper para crear batch de análisis de artículos
-def analyze_articles_batch(articles: List[Dict[str, str]], focus: str = "AI trends") -> str:
+def analyze_articles_batch(articles: List[Dict[str, str]], focus: str = "AI trends",
+                           extra_prompts: Optional[List[Dict[str, Any]]] = None) -> str:
     """
     Crea un batch para analizar múltiples artículos
     
     Args:
         articles: Lista de dicts con {'url': str, 'title': str, 'content': str}
         focus: Enfoque del análisis
+        extra_prompts: Peticiones adicionales en el mismo batch (mismo
+            formato que create_batch_request), p.ej. el análisis avanzado
         
     Returns:
         Batch ID
@@ -257,6 +274,7 @@ Contenido:
 Analiza este artículo siguiendo el formato solicitado."""
         })
     
+    prompts.extend(extra_prompts or [])
     jsonl_file = create_batch_request(prompts, model="gpt-4o-mini", max_tokens=300)
     batch_id = submit_batch(jsonl_file, f"Article Analysis: {focus}")
     
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks offline del proyecto (sin red ni API keys)
+- load_test: generador de carga asyncio contra server.app
+- stub: LLM y herramientas web deterministas con latencia configurable
+"""
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de proveedores de embeddings (embeddings.py)
+
+1. Throughput: textos/s del backend local por tamaño de lote (y de OpenAI
+   con --openai, que hace llamadas reales a la API)
+2. Acuerdo de decisiones de novedad: check_novelty_batch con el backend
+   local vs las decisiones de referencia, más un barrido de umbrales para
+   elegir LOCAL_NOVELTY_THRESHOLD. La referencia es OpenAI (umbral 0.75)
+   si hay OPENAI_API_KEY y --openai; si no, etiquetas a mano del conjunto
+   sintético (misma noticia reformulada = repetido), que es lo que la
+   decisión de OpenAI aproxima.
+
+Uso:
+    python -m bench.embed_bench
+    python -m bench.embed_bench --openai --out embed_bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# (tema ya cubierto, misma noticia contada de otra forma)
+_PAIRS = [
+    ("OpenAI lanza GPT-4o con voz en tiempo real", "GPT-4o de OpenAI ya conversa por voz en tiempo real"),
+    ("Meta publica Llama 3.1 405B como modelo abierto", "Llama 3.1 de 405B parámetros: Meta libera su modelo más grande"),
+    ("La Unión Europea aprueba la ley de inteligencia artificial", "Aprobada la AI Act: Europa regula la inteligencia artificial"),
+    ("Nvidia presenta los chips Blackwell B200", "Blackwell B200, los nuevos chips de Nvidia para IA"),
+    ("Anthropic lanza Claude 3.5 Sonnet", "Claude 3.5 Sonnet ya disponible: lo nuevo de Anthropic"),
+    ("Google anuncia Gemini 1.5 Pro con un millón de tokens de contexto", "Gemini 1.5 Pro de Google llega a 1M de tokens de contexto"),
+    ("Mistral libera Mixtral 8x22B bajo licencia Apache", "Mixtral 8x22B: el nuevo modelo abierto de Mistral con licencia Apache 2.0"),
+    ("Apple integra ChatGPT en Siri con Apple Intelligence", "Apple Intelligence: Siri usará ChatGPT de OpenAI"),
+    ("Microsoft presenta Copilot+ PC con NPU", "Los Copilot+ PC de Microsoft traen NPU para IA local"),
+    ("Stability AI publica Stable Diffusion 3", "Stable Diffusion 3 ya es público, anuncia Stability AI"),
+    ("OpenAI presenta Sora, su modelo de texto a video", "Sora: OpenAI genera video a partir de texto"),
+    ("Hugging Face lanza un leaderboard de modelos abiertos renovado", "Nuevo Open LLM Leaderboard de Hugging Face"),
+    ("DeepMind presenta AlphaFold 3 para predecir proteínas", "AlphaFold 3 de DeepMind predice estructuras de proteínas y moléculas"),
+    ("Perplexity recauda 250 millones de dólares", "Perplexity cierra una ronda de 250 millones"),
+    ("GitHub Copilot Workspace entra en vista previa", "Vista previa de Copilot Workspace en GitHub"),
+    ("OpenAI reduce el precio de la API de GPT-4 Turbo", "Baja el precio de GPT-4 Turbo en la API de OpenAI"),
+    ("Cursor recauda fondos para su editor de código con IA", "El editor con IA Cursor levanta una nueva ronda"),
+    ("Ollama añade soporte para modelos de visión", "Modelos de visión llegan a Ollama"),
+    ("LangChain lanza LangGraph para agentes", "LangGraph: la nueva librería de LangChain para construir agentes"),
+    ("Samsung integra Galaxy AI en sus teléfonos", "Galaxy AI llega a los teléfonos de Samsung"),
+]
+# Noticias distintas con el mismo vocabulario (empresas y modelos)
+_NOVEL = [
+    "OpenAI despide a su equipo de superalineamiento",
+    "Meta entrena Llama 4 con 100 mil GPUs",
+    "La Unión Europea multa a Google por competencia desleal",
+    "Nvidia supera a Apple como empresa más valiosa",
+    "Anthropic publica investigación sobre interpretabilidad de Claude",
+    "Google retira las respuestas de IA de su buscador tras errores",
+    "Mistral firma un acuerdo de distribución con Microsoft",
+    "Apple abre un centro de investigación de IA en Zúrich",
+    "Microsoft invierte en centros de datos en España",
+    "Stability AI cambia de CEO tras la salida de su fundador",
+    "OpenAI firma acuerdo de licencias con medios de noticias",
+    "Hugging Face sufre una filtración de tokens en Spaces",
+    "DeepMind gana la olimpiada de matemáticas con AlphaProof",
+    "Perplexity es acusada de copiar artículos sin permiso",
+    "GitHub reporta caída del servicio de Actions",
+    "OpenAI prepara un buscador propio llamado SearchGPT",
+    "Cursor añade modo agente para refactorizar proyectos",
+    "Ollama corre en Raspberry Pi con modelos cuantizados",
+    "LangChain publica un informe sobre agentes en producción",
+    "Samsung desarrolla memoria HBM4 para chips de IA",
+]
+_FILLER = (
+    "the new release improves latency for developers while researchers compare results across "
+    "benchmarks and companies announce partnerships la compañía publicó documentación y ejemplos "
+    "mientras la comunidad compara resultados en foros"
+).split()
+
+
+def make_texts(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    heads = [t for pair in _PAIRS for t in pair] + _NOVEL
+    return [rng.choice(heads) + " " + " ".join(rng.choice(_FILLER) for _ in range(rng.randint(20, 200)))
+            for _ in range(n)]
+
+
+def throughput(embedder, texts: List[str], batch: int) -> float:
+    start = time.perf_counter()
+    for s in range(0, len(texts), batch):
+        embedder.embed(texts[s:s + batch])
+    return len(texts) / (time.perf_counter() - start)
+
+
+def _decisions(embedder, history: List[str], topics: List[str], threshold: Optional[float]) -> List[Dict[str, Any]]:
+    import novelty_checker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original = novelty_checker.HISTORY_FILE
+        novelty_checker.HISTORY_FILE = os.path.join(tmp, "history.json")
+        try:
+            entries = [{"topic": t, "covered_date": datetime.now().isoformat()} for t in history]
+            if not embedder.local:
+                for entry, vec in zip(entries, embedder.embed(history)):
+                    entry.update(embedding=vec, embed_provider=embedder.signature)
+            with open(novelty_checker.HISTORY_FILE, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            return novelty_checker.check_novelty_batch(topics, threshold, max_history=len(history), embedder=embedder)
+        finally:
+            novelty_checker.HISTORY_FILE = original
+
+
+def agreement(reference: List[bool], similarities: List[float], threshold: float) -> Dict[str, float]:
+    decided = [s < threshold for s in similarities]
+    repeated_ref = [not r for r in reference]
+    tp = sum(1 for d, r in zip(decided, repeated_ref) if not d and r)
+    fp = sum(1 for d, r in zip(decided, repeated_ref) if not d and not r)
+    fn = sum(1 for d, r in zip(decided, repeated_ref) if d and r)
+    return {
+        "threshold": threshold,
+        "agreement": round(sum(1 for d, r in zip(decided, reference) if d == r) / len(reference), 4),
+        "repeated_precision": round(tp / (tp + fp), 4) if tp + fp else 0.0,
+        "repeated_recall": round(tp / (tp + fn), 4) if tp + fn else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Benchmark de embeddings: throughput y acuerdo de novedad")
+    parser.add_argument("--texts", type=int, default=2000, help="Textos sintéticos para throughput")
+    parser.add_argument("--openai", action="store_true", help="Incluir OpenAI (llamadas reales a la API)")
+    parser.add_argument("--fit", action="store_true", help="Ajustar IDF/SVD sobre embeddings.fit_corpus() antes")
+    parser.add_argument("--out", default=None, help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    import embeddings
+
+    model_path = os.path.join(tempfile.mkdtemp(), "local_embedder.npz")
+    variants = {"local_hashing": embeddings.LocalEmbedder(path=model_path)}
+    if args.fit:
+        corpus = embeddings.fit_corpus()
+        fitted = embeddings.LocalEmbedder(path=os.path.join(tempfile.mkdtemp(), "fitted.npz"))
+        info = fitted.fit(corpus)
+        print(f"🧮 Ajustado sobre {info['documents']} textos ({info['signature']})", file=sys.stderr)
+        variants["local_fitted"] = fitted
+
+    texts = make_texts(args.texts)
+    results: Dict[str, Any] = {"throughput": {}, "novelty": {}}
+    for name, embedder in variants.items():
+        for batch in (1, 32, 256):
+            tps = throughput(embedder, texts if batch > 1 else texts[:200], batch)
+            results["throughput"][f"{name}@{batch}"] = round(tps, 1)
+            print(f"⚡ {name:14s} lote {batch:4d}: {tps:9.1f} textos/s", file=sys.stderr)
+    openai = None
+    if args.openai and os.getenv("OPENAI_API_KEY"):
+        openai = embeddings.OpenAIEmbedder()
+        tps = throughput(openai, texts[:256], 256)
+        results["throughput"]["openai@256"] = round(tps, 1)
+        print(f"⚡ openai         lote  256: {tps:9.1f} textos/s", file=sys.stderr)
+
+    history = [a for a, _ in _PAIRS]
+    topics = [b for _, b in _PAIRS] + _NOVEL
+    if openai is not None:
+        ref = _decisions(openai, history, topics, embeddings.OPENAI_NOVELTY_THRESHOLD)
+        reference = [r["is_novel"] for r in ref]
+        results["reference"] = f"openai@{embeddings.OPENAI_NOVELTY_THRESHOLD}"
+    else:
+        reference = [False] * len(_PAIRS) + [True] * len(_NOVEL)
+        results["reference"] = "labels"
+    print(f"🎯 Referencia de novedad: {results['reference']} ({len(topics)} temas)", file=sys.stderr)
+
+    for name, embedder in variants.items():
+        sims = [1.0 - r["novelty_score"] for r in _decisions(embedder, history, topics, None)]
+        sweep = [agreement(reference, sims, t / 100) for t in range(20, 95, 5)]
+        best = max(sweep, key=lambda r: (r["agreement"], -abs(r["threshold"] - embedder.novelty_threshold)))
+        current = agreement(reference, sims, embedder.novelty_threshold)
+        results["novelty"][name] = {"current": current, "best": best, "sweep": sweep}
+        print(f"   {name:14s} acuerdo {current['agreement']:.3f} @ {current['threshold']:.2f}  "
+              f"(mejor {best['agreement']:.3f} @ {best['threshold']:.2f})", file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "local_dim": embeddings.LOCAL_EMBED_DIM,
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+        print(f"💾 Resultados guardados en {args.out}", file=sys.stderr)
+    else:
+        print(payload)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark del matcher de entidades (entity_matcher.py)
+
+Compara el esquema anterior de analyze_trends (concatenar todo + cuatro
+re.findall) con una sola pasada por documento del matcher compilado,
+sobre artículos sintéticos. No usa la red.
+
+Uso:
+    python -m bench.entity_bench --articles 10000 --out entity_bench.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+_FILLER = (
+    "the new release improves latency for developers while researchers compare results "
+    "across benchmarks and companies announce partnerships with startups in europe"
+).split()
+_MENTIONS = [
+    "OpenAI", "Anthropic", "Google", "Mistral", "Hugging Face", "Midjourney", "GPT-4o", "GPT-5",
+    "Claude 3.5", "Gemini", "LLaMA", "Stable Diffusion", "RAG", "fine-tuning", "agents",
+    "reasoning", "embeddings", "LangChain", "Ollama", "Cursor", "FAISS",
+]
+
+
+def make_articles(n: int, seed: int = 0) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    articles = []
+    for i in range(n):
+        words = [rng.choice(_FILLER) for _ in range(rng.randint(120, 300))]
+        for _ in range(rng.randint(2, 12)):
+            words.insert(rng.randrange(len(words)), rng.choice(_MENTIONS))
+        articles.append({"title": f"Article {i} about {rng.choice(_MENTIONS)}", "full_text": " ".join(words)})
+    return articles
+
+
+def legacy_scan(articles: List[Dict[str, str]]) -> Dict[str, Counter]:
+    """Reproducción del analyze_trends original (concatenación + 4 findall)"""
+    all_text = ""
+    for a in articles:
+        all_text += " " + a["title"] + " " + a.get("full_text", "")
+    patterns = {
+        "companies": r'\b(OpenAI|Anthropic|Google|Microsoft|Meta|DeepMind|Mistral|Cohere|'
+                     r'Hugging\s*Face|Stability\s*AI|Midjourney|Perplexity)\b',
+        "models": r'\b(GPT-[0-9o]+|Claude\s*[0-9.]*|Gemini|LLaMA|Llama|Mistral|'
+                  r'DALL-E|Stable\s*Diffusion|Midjourney)\b',
+        "research": r'\b(RAG|fine-tuning|RLHF|prompt\s*engineering|multimodal|'
+                    r'alignment|reasoning|agents?|transformers?|embeddings?)\b',
+        "tools": r'\b(LangChain|LlamaIndex|Ollama|AutoGPT|Cursor|Copilot|'
+                 r'Pinecone|Weaviate|Chroma|FAISS)\b',
+    }
+    return {cat: Counter(m.lower() for m in re.findall(p, all_text, re.IGNORECASE)) for cat, p in patterns.items()}
+
+
+def matcher_scan(articles: List[Dict[str, str]]) -> Dict[str, Counter]:
+    from entity_matcher import default_matcher
+
+    matcher = default_matcher()
+    scan = matcher.scan(a["title"] + " " + a.get("full_text", "") for a in articles)
+    return matcher.by_category(scan["mentions"])
+
+
+def _time(fn, articles, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(articles)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Benchmark: matcher de entidades vs re.findall sobre texto concatenado")
+    parser.add_argument("--articles", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    articles = make_articles(args.articles, args.seed)
+    mb = sum(len(a["title"]) + len(a["full_text"]) for a in articles) / (1024 * 1024)
+    print(f"📄 {len(articles)} artículos, {mb:.1f} MB de texto", file=sys.stderr)
+
+    legacy = _time(legacy_scan, articles, args.repeat)
+    single = _time(matcher_scan, articles, args.repeat)
+    totals_legacy = {cat: sum(c.values()) for cat, c in legacy_scan(articles).items()}
+    totals_matcher = {cat: sum(c.values()) for cat, c in matcher_scan(articles).items()}
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "articles": len(articles),
+        "text_mb": round(mb, 2),
+        "legacy": {"seconds": round(legacy, 3), "articles_per_second": round(len(articles) / legacy, 1)},
+        "matcher": {"seconds": round(single, 3), "articles_per_second": round(len(articles) / single, 1)},
+        "speedup": round(legacy / single, 2) if single else 0.0,
+        "mentions_by_category": {"legacy": totals_legacy, "matcher": totals_matcher},
+    }
+    print(f"   legacy  {report['legacy']['articles_per_second']:10.1f} art/s\n"
+          f"   matcher {report['matcher']['articles_per_second']:10.1f} art/s  x{report['speedup']}",
+          file=sys.stderr)
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+        print(f"💾 Resultados guardados en {args.out}", file=sys.stderr)
+    else:
+        print(payload)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark del servicio de extracción (extractor.py) sobre HTML guardado
+
+Compara la extracción en el hilo actual (baseline) contra el pool de
+procesos con distinta cantidad de workers. No usa la red.
+
+Uso:
+    python -m bench.extract_bench --corpus saved_pages/ --workers 1,2,4,8
+    python -m bench.extract_bench --generate 200      # corpus sintético
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+_WORDS = (
+    "modelo agente datos lenguaje entrenamiento inferencia gpu benchmark "
+    "openai anthropic mistral llama difusión embeddings vectores búsqueda "
+    "latencia throughput contexto tokens razonamiento evaluación dataset"
+).split()
+
+
+def generate_corpus(directory: str, n: int, seed: int = 0) -> List[str]:
+    """Escribe `n` páginas tipo artículo (con nav, sidebar y footer) en `directory`"""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(n):
+        paragraphs = "\n".join(
+            "<p>" + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(40, 120))) + ".</p>"
+            for _ in range(rng.randint(8, 40))
+        )
+        nav = "".join(f'<li><a href="/s/{j}">Sección {j}</a></li>' for j in range(30))
+        html = (
+            f"<html><head><title>Artículo {i}</title></head><body>"
+            f"<nav><ul>{nav}</ul></nav><aside>Relacionados {nav}</aside>"
+            f"<article><h1>Artículo {i}</h1>{paragraphs}</article>"
+            f"<footer>© {i} — {nav}</footer></body></html>"
+        )
+        path = os.path.join(directory, f"page_{i:05d}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        paths.append(path)
+    return paths
+
+
+def _load(paths: List[str]) -> List[bytes]:
+    docs = []
+    for p in paths:
+        with open(p, "rb") as f:
+            docs.append(f.read())
+    return docs
+
+
+def _measure(fn, docs: List[bytes], repeat: int) -> Dict[str, Any]:
+    best = None
+    chars = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        texts = fn(docs)
+        elapsed = time.perf_counter() - start
+        chars = sum(len(t) for t in texts)
+        best = elapsed if best is None else min(best, elapsed)
+    mb = sum(len(d) for d in docs) / (1024 * 1024)
+    return {
+        "seconds": round(best, 3),
+        "docs_per_second": round(len(docs) / best, 1) if best else 0.0,
+        "mb_per_second": round(mb / best, 2) if best else 0.0,
+        "chars_extracted": chars,
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    import extractor
+
+    if args.corpus:
+        paths = sorted(glob.glob(os.path.join(args.corpus, "**", "*.htm*"), recursive=True))
+        if not paths:
+            raise SystemExit(f"No hay archivos .html en {args.corpus}")
+    else:
+        paths = generate_corpus(tempfile.mkdtemp(prefix="extract_corpus_"), args.generate, args.seed)
+    docs = _load(paths)
+    print(f"📄 {len(docs)} documentos, {sum(map(len, docs)) / 1e6:.1f} MB", file=sys.stderr)
+
+    results = []
+    # Baseline: todo en el hilo actual (EXTRACT_WORKERS=0)
+    extractor.EXTRACT_WORKERS = 0
+    baseline = _measure(lambda ds: [extractor.extract_text(d) for d in ds], docs, args.repeat)
+    results.append(dict(mode="inline", workers=0, **baseline))
+
+    # Baseline con hilos: paraleliza la espera pero no lxml (GIL)
+    threads = max(int(w) for w in args.workers.split(","))
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        threaded = _measure(lambda ds: list(pool.map(extractor.extract_text, ds)), docs, args.repeat)
+    results.append(dict(mode="threads", workers=threads, **threaded))
+
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        extractor.shutdown()
+        extractor.EXTRACT_WORKERS = workers
+        extractor.warm()
+        res = _measure(extractor.extract_many, docs, args.repeat)
+        results.append(dict(mode="processes", workers=workers, **res))
+    extractor.shutdown()
+
+    for r in results:
+        r["speedup"] = round(baseline["seconds"] / r["seconds"], 2) if r["seconds"] else 0.0
+        print(f"   {r['mode']:9s} w={r['workers']:<3d} {r['docs_per_second']:8.1f} docs/s  "
+              f"{r['mb_per_second']:6.2f} MB/s  x{r['speedup']}", file=sys.stderr)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "documents": len(docs),
+        "corpus": args.corpus or f"synthetic:{args.generate}",
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    cpus = os.cpu_count() or 1
+    default_workers = ",".join(str(w) for w in sorted({1, 2, 4, cpus}) if w <= cpus)
+    parser = argparse.ArgumentParser(description="Benchmark de extracción HTML -> texto (pool de procesos)")
+    parser.add_argument("--corpus", default=None, help="Directorio con páginas .html guardadas")
+    parser.add_argument("--generate", type=int, default=200, help="Páginas sintéticas si no hay --corpus")
+    parser.add_argument("--workers", default=default_workers, help="Niveles de workers, separados por comas")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por nivel (se toma la mejor)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+        print(f"💾 Resultados guardados en {args.out}", file=sys.stderr)
+    else:
+        print(payload)
+    return report
+
+
+if __name__ == "__main__":
+    main()
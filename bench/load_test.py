@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Generador de carga asyncio para la API HTTP (server.app)
+
+Modos:
+  - inprocess: httpx + ASGITransport contra server.app (sin sockets)
+  - localhost: levanta uvicorn en 127.0.0.1 dentro del proceso y mide por TCP
+  - --url:     apunta a un despliegue existente (sin stubs)
+
+En inprocess/localhost el LLM y las herramientas web se reemplazan por
+stubs deterministas (bench/stub.py), así que corre 100% offline.
+
+Uso:
+    python -m bench.load_test --concurrency 1,4,16,64 --requests 200 \\
+        --llm-latency lognormal:-3,0.5 --tool-latency uniform:0.01,0.05 \\
+        --out bench_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+ENDPOINTS = {
+    "run": ("POST", "/run", {"task": "Resume las novedades del proyecto", "session_id": None, "reset": False}),
+    "health": ("GET", "/health", None),
+    "metrics": ("GET", "/metrics", None),
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil nearest-rank sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def _run_level(client, endpoint: str, concurrency: int, total: int) -> Dict[str, Any]:
+    method, path, body = ENDPOINTS[endpoint]
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                if method == "POST":
+                    resp = await client.post(path, json=body)
+                else:
+                    resp = await client.get(path)
+                failed = resp.status_code >= 400
+                if not failed and endpoint == "run":
+                    # /run nunca devuelve 500: los errores del agente van en el texto
+                    failed = resp.json().get("result", "").startswith(("Error al ejecutar", "[agent]"))
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            if failed:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 2),
+            "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2),
+            "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+            "max": round(ms[-1], 2) if ms else 0.0,
+        },
+    }
+
+
+def _load_app(args):
+    """Importa server.app con stubs instalados y CHAT_DIR temporal"""
+    os.environ.setdefault("CHAT_DIR", tempfile.mkdtemp(prefix="bench_chats_"))
+    os.environ.setdefault("AGENT_AUTO_WEB", "0")
+    import server
+    from bench.stub import install_stubs
+
+    install_stubs(
+        server.agent,
+        llm_latency=args.llm_latency,
+        tool_latency=args.tool_latency,
+        tool_steps=args.tool_steps,
+        seed=args.seed,
+    )
+    return server.app
+
+
+def _start_localhost(app, port: int):
+    """Arranca uvicorn en un hilo y espera a que acepte conexiones"""
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    srv = uvicorn.Server(config)
+    thread = threading.Thread(target=srv.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not srv.started and time.time() < deadline:
+        time.sleep(0.05)
+    if not srv.started:
+        raise RuntimeError("uvicorn no arrancó a tiempo")
+    return srv, thread
+
+
+async def run_sweep(args) -> Dict[str, Any]:
+    import httpx
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    for e in endpoints:
+        if e not in ENDPOINTS:
+            raise SystemExit(f"Endpoint desconocido: {e} (opciones: {', '.join(ENDPOINTS)})")
+
+    srv = None
+    if args.url:
+        client_kwargs = {"base_url": args.url}
+        mode = "remote"
+    else:
+        app = _load_app(args)
+        if args.mode == "localhost":
+            srv, _ = _start_localhost(app, args.port)
+            client_kwargs = {"base_url": f"http://127.0.0.1:{args.port}"}
+        else:
+            client_kwargs = {"transport": httpx.ASGITransport(app=app), "base_url": "http://bench"}
+        mode = args.mode
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    results = []
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits, **client_kwargs) as client:
+            for endpoint in endpoints:
+                # Calentamiento: rutas, imports diferidos y pools
+                await _run_level(client, endpoint, 1, min(5, args.requests))
+                for c in levels:
+                    res = await _run_level(client, endpoint, c, args.requests)
+                    results.append(res)
+                    print(
+                        f"   {endpoint:8s} c={c:<4d} {res['throughput_rps']:8.1f} req/s  "
+                        f"p50={res['latency_ms']['p50']:.1f}ms p95={res['latency_ms']['p95']:.1f}ms "
+                        f"p99={res['latency_ms']['p99']:.1f}ms err={res['error_rate']:.2%}",
+                        file=sys.stderr,
+                    )
+    finally:
+        if srv is not None:
+            srv.should_exit = True
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "mode": mode,
+        "python": platform.python_version(),
+        "config": {
+            "concurrency": levels,
+            "requests_per_level": args.requests,
+            "endpoints": endpoints,
+            "llm_latency": None if args.url else args.llm_latency,
+            "tool_latency": None if args.url else args.tool_latency,
+            "tool_steps": args.tool_steps,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Load test offline de la API (/run, /health, /metrics)")
+    parser.add_argument("--mode", choices=("inprocess", "localhost"), default="inprocess")
+    parser.add_argument("--url", default=None, help="Despliegue existente (desactiva stubs)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--endpoints", default="run,health", help="Lista separada por comas")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Niveles de concurrencia")
+    parser.add_argument("--requests", type=int, default=100, help="Requests por nivel")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--llm-latency", default="lognormal:-3,0.5", help="Latencia del LLM stub (s)")
+    parser.add_argument("--tool-latency", default="uniform:0.01,0.05", help="Latencia de herramientas stub (s)")
+    parser.add_argument("--tool-steps", type=int, default=1, help="Herramientas por /run antes de finalizar")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_sweep(args))
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+        print(f"💾 Resultados guardados en {args.out}", file=sys.stderr)
+    else:
+        print(payload)
+    return report
+
+
+if __name__ == "__main__":
+    main()
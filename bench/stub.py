@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Stubs deterministas para benchmarks offline
+- StubLLM: sustituye al LLM (OpenAI/Ollama) con respuestas guionizadas
+- Herramientas web falsas (web_search, read_url_clean, web_trend_scan)
+- Latencias configurables: "const:0.05", "uniform:0.01,0.2",
+  "lognormal:-3,0.5", "exp:0.05" (segundos)
+"""
+
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from llm_providers import BaseLLM
+
+
+class LatencyDist:
+    """Distribución de latencias a partir de un spec 'tipo:parámetros'."""
+
+    def __init__(self, spec: str = "const:0", seed: int = 0):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        if self.kind not in ("const", "uniform", "lognormal", "exp"):
+            raise ValueError(f"Distribución desconocida: {spec}")
+
+    def sample(self) -> float:
+        p = self.params
+        with self._lock:
+            if self.kind == "const":
+                value = p[0] if p else 0.0
+            elif self.kind == "uniform":
+                value = self._rng.uniform(p[0], p[1])
+            elif self.kind == "lognormal":
+                value = self._rng.lognormvariate(p[0], p[1])
+            else:
+                value = self._rng.expovariate(1.0 / p[0]) if p and p[0] > 0 else 0.0
+        return max(0.0, value)
+
+    def sleep(self) -> None:
+        delay = self.sample()
+        if delay:
+            time.sleep(delay)
+
+
+class StubLLM(BaseLLM):
+    """
+    LLM determinista: pide `tool_steps` herramientas (web_search) y luego
+    finaliza. Pasa por BaseLLM.generate, así que también alimenta /metrics.
+    """
+    provider = "stub"
+
+    def __init__(self, latency: LatencyDist, tool_steps: int = 1, model: str = "stub-1"):
+        self.latency = latency
+        self.tool_steps = tool_steps
+        self.model = model
+
+    def _generate(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Tuple[str, Dict[str, int]]:
+        self.latency.sleep()
+        user = messages[-1]["content"] if messages else ""
+        done = user.count("- obs#")
+        if done < self.tool_steps:
+            text = json.dumps({"tool": "web_search", "args": {"query": "stub query", "k": 3}})
+        else:
+            text = json.dumps({"final": f"Respuesta stub tras {done} observaciones."})
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        return text, {"prompt": prompt_tokens, "completion": len(text) // 4}
+
+
+def _stub_tools(latency: LatencyDist) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+    def web_search(args):
+        latency.sleep()
+        k = int(args.get("k", 5))
+        return {"ok": True, "error": "", "data": {"results": [
+            {"title": f"Stub result {i}", "url": f"https://example.com/{i}", "snippet": "lorem ipsum " * 10}
+            for i in range(k)
+        ]}}
+
+    def read_url_clean(args):
+        latency.sleep()
+        max_chars = int(args.get("max_chars", 4000))
+        return {"ok": True, "error": "", "data": {"text": ("texto de prueba " * 400)[:max_chars]}}
+
+    def web_trend_scan(args):
+        latency.sleep()
+        return {"ok": True, "error": "", "data": {
+            "results": [], "articles": [], "keywords": [{"term": "stub", "count": 1}], "top_domains": [],
+        }}
+
+    return {"web_search": web_search, "read_url_clean": read_url_clean, "web_trend_scan": web_trend_scan}
+
+
+def install_stubs(agent, llm_latency: str = "const:0.05", tool_latency: str = "const:0.02",
+                  tool_steps: int = 1, seed: int = 0) -> None:
+    """
+    Sustituye el LLM del agente y las herramientas web del registro TOOLS
+    por stubs deterministas (nada sale a la red).
+    """
+    import tools
+
+    agent.llm = StubLLM(LatencyDist(llm_latency, seed), tool_steps=tool_steps)
+    tool_dist = LatencyDist(tool_latency, seed + 1)
+    for name, fn in _stub_tools(tool_dist).items():
+        desc = tools.TOOLS[name][0] if name in tools.TOOLS else name
+        tools.TOOLS[name] = (desc, fn)
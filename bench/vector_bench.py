@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark del almacén cuantizado (vector_store.py)
+
+Compara contra la búsqueda float32 exacta: recall@10, latencia por
+consulta, memoria residente y disco, y el tamaño del mismo conjunto como
+JSON (formato anterior de rag_store.jsonl / topics_history.json).
+Vectores sintéticos agrupados (temas) con consultas cercanas a documentos,
+o --vectors con un .npy real.
+
+Uso:
+    python -m bench.vector_bench --n 20000 --dim 1536
+    python -m bench.vector_bench --vectors embeddings.npy --out vector_bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+def synthetic(n: int, dim: int, topics: int, seed: int = 0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    x = centers[rng.integers(0, topics, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Benchmark: almacén int8/PQ vs float exacto")
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--vectors", default=None, help=".npy (n, dim) con embeddings reales")
+    parser.add_argument("--rescore", type=int, default=None, help="Candidatos re-puntuados (VECTOR_RESCORE)")
+    parser.add_argument("--out", default=None, help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    import numpy as np
+    import vector_store
+
+    x = np.load(args.vectors).astype(np.float32) if args.vectors else synthetic(args.n, args.dim, args.topics)
+    x /= np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+    rng = np.random.default_rng(1)
+    q = x[rng.choice(len(x), args.queries, replace=False)] + 0.5 * rng.standard_normal((args.queries, x.shape[1])).astype(np.float32) / np.sqrt(x.shape[1]) * 8
+    truth = np.argsort(-(q @ x.T), axis=1)[:, :10]
+    keys = [str(i) for i in range(len(x))]
+    rescore = vector_store.VECTOR_RESCORE if args.rescore is None else args.rescore
+    json_bytes = len(json.dumps([round(float(v), 8) for v in x[0]])) * len(x)
+    print(f"📚 {len(x)} vectores de {x.shape[1]} dims, {args.queries} consultas", file=sys.stderr)
+
+    start = time.perf_counter()
+    for row in q:
+        np.argsort(-(x @ row))[:10]
+    exact_ms = (time.perf_counter() - start) / len(q) * 1000
+    results: Dict[str, Any] = {
+        "float32_exact": {"recall@10": 1.0, "ms_per_query": round(exact_ms, 2),
+                          "memory_bytes": int(x.nbytes), "disk_bytes_json": json_bytes},
+    }
+
+    for mode in ("int8", "pq"):
+        for rs in (0, rescore):
+            path = os.path.join(tempfile.mkdtemp(), mode)
+            store = vector_store.VectorStore(path, mode=mode)
+            start = time.perf_counter()
+            store.add(keys, x)
+            if mode == "pq" and store.centroids is None:
+                store.train()
+            store.save()
+            build_s = time.perf_counter() - start
+            start = time.perf_counter()
+            hits = [store.search(row, k=10, rescore=rs) for row in q]
+            ms = (time.perf_counter() - start) / len(q) * 1000
+            recall = float(np.mean([len(set(int(k) for k, _ in h) & set(t.tolist())) / 10 for h, t in zip(hits, truth)]))
+            stats = store.stats()
+            name = f"{mode}" + (f"+rescore{rs}" if rs else "")
+            results[name] = {
+                "recall@10": round(recall, 4),
+                "ms_per_query": round(ms, 2),
+                "build_s": round(build_s, 2),
+                "memory_bytes": stats["memory_bytes"],
+                "disk_bytes": stats["disk_bytes"],
+                "memory_reduction_vs_float32": round(x.nbytes / stats["memory_bytes"], 1),
+                "disk_reduction_vs_json": round(json_bytes / stats["disk_bytes"], 1),
+                "meets_target": recall >= vector_store.RECALL_TARGET,
+            }
+            r = results[name]
+            print(f"   {name:16s} recall@10 {r['recall@10']:.3f}  {r['ms_per_query']:6.2f} ms  "
+                  f"mem ÷{r['memory_reduction_vs_float32']}  disco ÷{r['disk_reduction_vs_json']} (vs JSON)",
+                  file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "vectors": len(x),
+        "dim": int(x.shape[1]),
+        "recall_target": vector_store.RECALL_TARGET,
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+        print(f"💾 Resultados guardados en {args.out}", file=sys.stderr)
+    else:
+        print(payload)
+    return report
+
+
+if __name__ == "__main__":
+    main()
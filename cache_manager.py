@@ -10,9 +10,10 @@ import os
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
+import metrics
+
 
 CACHE_DIR = os.getenv("CACHE_DIR", "cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
 
 
 def cache_key(data: dict) -> str:
@@ -82,6 +83,8 @@ def set_cache(key: str, data: Any) -> None:
     cache_file = os.path.join(CACHE_DIR, f"{key}.json")
     
     try:
+        # El directorio se crea en la primera escritura (no al importar)
+        os.makedirs(CACHE_DIR, exist_ok=True)
         with open(cache_file, 'w', encoding='utf-8') as f:
             json.dump({
                 'timestamp': datetime.now().isoformat(),
@@ -176,6 +179,14 @@ def cache_stats() -> dict:
     }
 
 
+def _cache_size(key: str) -> int:
+    """Tamaño en bytes de una entrada de cache (0 si no existe)"""
+    try:
+        return os.path.getsize(os.path.join(CACHE_DIR, f"{key}.json"))
+    except OSError:
+        return 0
+
+
 # Decorador para funciones cacheables
 def cacheable(max_age_hours=24):
     """
@@ -201,14 +212,18 @@ def cacheable(max_age_hours=24):
             cached_result = get_cached(key, max_age_hours)
             if cached_result is not None:
                 print(f"✅ Cache hit: {func.__name__}")
+                metrics.CACHE_REQUESTS.inc(function=func.__name__, result="hit")
+                metrics.CACHE_BYTES.inc(_cache_size(key), function=func.__name__, direction="read")
                 return cached_result
             
             # Cache miss - ejecutar función
             print(f"🔄 Cache miss: {func.__name__} - ejecutando...")
+            metrics.CACHE_REQUESTS.inc(function=func.__name__, result="miss")
             result = func(*args, **kwargs)
             
             # Guardar en cache
             set_cache(key, result)
+            metrics.CACHE_BYTES.inc(_cache_size(key), function=func.__name__, direction="written")
             
             return result
         
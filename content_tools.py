@@ -11,13 +11,11 @@ import json
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, List
 from collections import Counter
 
-from duckduckgo_search import DDGS
-import trafilatura
-
 
 def _ok(ok: bool, data: Any, error: str = "") -> Dict[str, Any]:
     return {"ok": ok, "data": data, "error": error}
@@ -54,6 +52,11 @@ def ai_news_digest(args: Dict[str, Any]) -> Dict[str, Any]:
             'trending_topics': ['...']
         }
     """
+    from duckduckgo_search import DDGS
+    import http_client
+    import raw_store
+    import url_canon
+
     k = int(args.get('k', 10))
     timelimit = args.get('timelimit', 'd')
     
@@ -73,10 +76,12 @@ def ai_news_digest(args: Dict[str, Any]) -> Dict[str, Any]:
         with DDGS() as ddgs:
             for query in queries[:2]:  # Solo top 2 queries para no saturar
                 try:
-                    for r in ddgs.news(query, max_results=k//2, safesearch='moderate', timelimit=timelimit):
+                    with http_client.limit("duckduckgo.com"):
+                        hits = list(ddgs.news(query, max_results=k//2, safesearch='moderate', timelimit=timelimit))
+                    for r in hits:
                         url = r.get('url') or r.get('href')
-                        if url and url not in seen_urls:
-                            seen_urls.add(url)
+                        if url and url_canon.key(url) not in seen_urls:
+                            seen_urls.add(url_canon.key(url))
                             all_results.append({
                                 'title': r.get('title', ''),
                                 'url': url,
@@ -93,24 +98,18 @@ def ai_news_digest(args: Dict[str, Any]) -> Dict[str, Any]:
         return _ok(False, None, "No se encontraron noticias de IA")
     
     # Leer contenido completo de las top 5-7 noticias
-    enriched_news = []
-    for item in all_results[:7]:
+    # (descarga en hilos vía raw_store; la extracción va al pool de procesos)
+    def _enrich(item):
         try:
-            downloaded = trafilatura.fetch_url(item['url'], timeout=15)
-            if downloaded:
-                text = trafilatura.extract(
-                    downloaded,
-                    include_comments=False,
-                    include_tables=False,
-                    favor_recall=True
-                ) or ""
-                item['full_text'] = text[:2000] if text else item['snippet']
-            else:
-                item['full_text'] = item['snippet']
+            text = raw_store.extract_text(item['url'], favor_recall=True, timeout=15)
+            item['full_text'] = text[:2000] if text else item['snippet']
         except Exception:
             item['full_text'] = item['snippet']
-        
-        enriched_news.append(item)
+        return item
+    
+    top_items = all_results[:7]
+    with ThreadPoolExecutor(max_workers=len(top_items)) as pool:
+        enriched_news = list(pool.map(_enrich, top_items))
     
     # Calcular relevancia (heurística simple basada en keywords de IA)
     ai_keywords = [
@@ -142,6 +141,28 @@ def ai_news_digest(args: Dict[str, Any]) -> Dict[str, Any]:
     }, "")
 
 
+# Temas que se cuentan en social_trends_ai (clave -> patrón, palabra completa)
+_SOCIAL_TOPICS = {
+    'chatgpt': 'chatgpt', 'gpt-4': 'gpt-4', 'claude': 'claude', 'gemini': 'gemini',
+    'llm': 'llms?', 'prompt': 'prompts?', 'rag': 'rag', 'fine-tuning': 'fine-tuning',
+    'agents': 'agents?', 'multimodal': 'multimodal', 'reasoning': 'reasoning',
+    'open source': r'open[\s-]+source', 'local llm': r'local\s+llms?', 'ollama': 'ollama'
+}
+_social = None
+
+
+def _social_matcher():
+    global _social
+    if _social is None:
+        from entity_matcher import EntityMatcher
+
+        _social = EntityMatcher({
+            topic: {'patterns': [pattern], 'categories': ['social']}
+            for topic, pattern in _SOCIAL_TOPICS.items()
+        })
+    return _social
+
+
 def social_trends_ai(args: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analiza tendencias de IA en redes sociales (simulado con búsquedas web).
@@ -168,6 +189,9 @@ def social_trends_ai(args: Dict[str, Any]) -> Dict[str, Any]:
             'key_influencers': ['...']  # si se pueden identificar
         }
     """
+    from duckduckgo_search import DDGS
+    import http_client
+
     platforms = args.get('platforms', ['twitter', 'reddit', 'hackernews'])
     k = int(args.get('k', 15))
     
@@ -187,7 +211,9 @@ def social_trends_ai(args: Dict[str, Any]) -> Dict[str, Any]:
                     continue
                 query = platform_queries[platform]
                 try:
-                    for r in ddgs.text(query, max_results=k, safesearch='moderate'):
+                    with http_client.limit("duckduckgo.com"):
+                        hits = list(ddgs.text(query, max_results=k, safesearch='moderate'))
+                    for r in hits:
                         all_discussions.append({
                             'platform': platform,
                             'title': r.get('title', ''),
@@ -202,20 +228,11 @@ def social_trends_ai(args: Dict[str, Any]) -> Dict[str, Any]:
     if not all_discussions:
         return _ok(False, None, "No se encontraron discusiones")
     
-    # Extraer temas mencionados
-    all_text = ' '.join([d['title'] + ' ' + d['snippet'] for d in all_discussions])
-    
-    # Temas de IA comunes
-    ai_topics = {
-        'chatgpt': 0, 'gpt-4': 0, 'claude': 0, 'gemini': 0,
-        'llm': 0, 'prompt': 0, 'rag': 0, 'fine-tuning': 0,
-        'agents': 0, 'multimodal': 0, 'reasoning': 0,
-        'open source': 0, 'local llm': 0, 'ollama': 0
-    }
-    
-    text_lower = all_text.lower()
-    for topic in ai_topics:
-        ai_topics[topic] = text_lower.count(topic)
+    # Temas de IA comunes: una pasada por discusión con el matcher compilado
+    mentions = _social_matcher().scan(
+        d['title'] + ' ' + d['snippet'] for d in all_discussions
+    )['mentions']
+    ai_topics = {topic: mentions.get(topic, 0) for topic in _SOCIAL_TOPICS}
     
     # Ordenar por menciones
     trending = sorted(ai_topics.items(), key=lambda x: x[1], reverse=True)
@@ -11,12 +11,13 @@ Sistema de Digest Diario Optimizado con todas las Quick Wins:
 import os
 import json
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Union
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from cache_manager import cacheable
+from pipeline import Pipeline
 from batch_processor import analyze_articles_batch, wait_for_batch
 from novelty_checker import filter_novel_topics, add_to_history
 from ai_content_research import fetch_all_rss_feeds, search_ai_news_advanced
@@ -25,43 +26,143 @@ from advanced_features import (
     analyze_competition,
     generate_video_titles,
     calculate_content_score,
-    comprehensive_topic_analysis
+    comprehensive_topic_analysis,
+    hype_request,
+    hype_from_response,
+    titles_request,
+    titles_from_response
 )
 
+# Análisis avanzado (hype/títulos) de los top artículos
+ENRICH_LIMIT = int(os.getenv("ENRICH_LIMIT", "5"))
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "10"))
+ENRICH_CALL_TIMEOUT = float(os.getenv("ENRICH_CALL_TIMEOUT", "30"))
+
 
 @cacheable(max_age_hours=6)  # Cache 6 horas (se refresca 4x al día)
-def fetch_daily_content(hours_back: int = 24) -> Dict[str, Any]:
-    """
-    Recopila contenido de múltiples fuentes (con cache)
-    
-    Returns:
-        {
-            'rss_posts': [...],
-            'web_articles': [...],
-            'timestamp': str
-        }
-    """
-    print(f"📰 Fetching content from last {hours_back} hours...")
-    
-    # 1. RSS Feeds (múltiples fuentes)
+def _search_web_cached(hours_back: int = 24) -> List[Dict[str, Any]]:
+    """Web search avanzado (con cache)"""
+    return search_ai_news_advanced(hours=hours_back, k=20)
+
+
+def fetch_rss(hours_back: int = 24) -> Dict[str, Any]:
+    """RSS feeds de todas las categorías (incremental: GET condicional + índice)"""
     print("   - Fetching RSS feeds...")
     rss_data = fetch_all_rss_feeds(
         hours=hours_back,
         categories=['substacks', 'company_blogs', 'communities', 'research', 'tech_media']
     )
-    
-    # 2. Web search avanzado
+    print(f"     {rss_data['stats']['new']} new entries, {len(rss_data['unprocessed_posts'])} pending")
+    return rss_data
+
+
+def fetch_web(hours_back: int = 24) -> List[Dict[str, Any]]:
+    """Web search avanzado (cacheado), top 20"""
     print("   - Searching web for recent news...")
-    web_articles = search_ai_news_advanced(hours=hours_back, k=20)
+    return _search_web_cached(hours_back)[:20]
+
+
+def merge_content(rss_data: Dict[str, Any], web_articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Une RSS y web. Los artículos web también pasan por el índice (clave =
+    URL canónica); los que ya llegaron por RSS no se duplican
+    """
+    import entry_store
+    import url_canon
+
+    store = entry_store.EntryStore()
+    deduped = []
+    for article in web_articles:
+        url = article.get('url', '')
+        if 'rss' in url_canon.sources(url):
+            continue
+        canonical, _ = url_canon.register(url, 'web')
+        key = entry_store.entry_key('web', canonical)
+        store.add(key, 'web', {'title': article.get('title', ''), 'url': url,
+                               'published': datetime.now().isoformat()})
+        deduped.append(dict(article, entry_key=key, canonical_url=canonical))
+    web_articles = deduped
+    store.save()
+    url_canon.save()
     
     return {
         'rss_posts': rss_data['all_posts'][:30],  # Top 30 RSS
-        'web_articles': web_articles[:20],  # Top 20 web
+        'web_articles': web_articles,
+        'new_rss_posts': rss_data['unprocessed_posts'][:30],
+        'new_web_articles': [a for a in web_articles if not store.is_processed(a['entry_key'])],
         'timestamp': datetime.now().isoformat(),
         'total_sources': len(rss_data['all_posts']) + len(web_articles)
     }
 
 
+def fetch_daily_content(hours_back: int = 24) -> Dict[str, Any]:
+    """
+    Recopila contenido de múltiples fuentes
+    
+    Los RSS son incrementales (GET condicional + índice de entradas vistas),
+    así que ya no se cachea el resultado completo: solo la búsqueda web.
+    generate_daily_digest usa las mismas etapas (RSS y web en paralelo).
+    
+    Returns:
+        {
+            'rss_posts': [...],
+            'web_articles': [...],
+            'new_rss_posts': [...],     # aún no procesados por un digest
+            'new_web_articles': [...],  # idem
+            'timestamp': str
+        }
+    """
+    print(f"📰 Fetching content from last {hours_back} hours...")
+    return merge_content(fetch_rss(hours_back), fetch_web(hours_back))
+
+
+def content_delta(content_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Vista de content_data con solo lo que ningún digest procesó todavía;
+    es lo que reciben novelty y batch analysis
+    """
+    return dict(
+        content_data,
+        rss_posts=content_data.get('new_rss_posts', content_data.get('rss_posts', [])),
+        web_articles=content_data.get('new_web_articles', content_data.get('web_articles', [])),
+    )
+
+
+def collapse_stories(content_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Agrupa casi-duplicados (misma noticia en varios medios) con MinHash + LSH
+    sobre título + resumen. Cada cluster queda representado por su versión
+    más completa, con la lista de fuentes en 'sources'; así novelty y batch
+    pagan una vez por historia y no una por medio.
+    """
+    from urllib.parse import urlparse
+    import near_dup
+
+    pool = (
+        [dict(p, _kind='rss') for p in content_data.get('rss_posts', [])]
+        + [dict(a, _kind='web') for a in content_data.get('web_articles', [])]
+    )
+
+    def text_of(item):
+        return f"{item.get('title', '')} {item.get('summary') or item.get('snippet', '')}"
+
+    def richness(item):
+        return len(item.get('full_text') or item.get('summary') or item.get('snippet', ''))
+
+    def source_of(item):
+        url = item.get('link') or item.get('url', '')
+        name = item.get('source_name') or urlparse(url).netloc.replace('www.', '') or item.get('source', '')
+        return {'name': name, 'url': url, 'title': item.get('title', '')}
+
+    stories = near_dup.collapse(pool, text_of, richness, source_of)
+    return dict(
+        content_data,
+        rss_posts=[{k: v for k, v in s.items() if k != '_kind'} for s in stories if s['_kind'] == 'rss'],
+        web_articles=[{k: v for k, v in s.items() if k != '_kind'} for s in stories if s['_kind'] == 'web'],
+        near_duplicates=len(pool) - len(stories),
+    )
+
+
 def extract_topics(content_data: Dict[str, Any]) -> List[str]:
     """
     Extrae títulos/temas de todo el contenido
@@ -85,10 +186,9 @@ def filter_and_rank_topics(topics: List[str], max_topics: int = 20, use_advanced
     """
     print(f"\n🎯 Filtering {len(topics)} topics for novelty...")
     
-    # Filtrar novedosos (threshold 0.75 = bastante estricto)
+    # Filtrar novedosos (umbral del proveedor de embeddings: 0.75 en OpenAI = bastante estricto)
     novel_topics = filter_novel_topics(
         topics,
-        threshold=0.75,
         return_details=True
     )
     
@@ -130,13 +230,18 @@ def prepare_batch_analysis(content_data: Dict[str, Any], novel_topics: List[Dict
     novel_titles = {t['topic'] for t in novel_topics}
     
     # Encontrar artículos completos para los temas novedosos
+    def _sources(item, default):
+        # Historias agrupadas: todas las fuentes que la cubrieron
+        names = [s['name'] for s in item.get('sources', []) if s.get('name')]
+        return ", ".join(dict.fromkeys(names)) if len(names) > 1 else default
+    
     for post in content_data.get('rss_posts', []):
         if post.get('title') in novel_titles:
             articles_to_analyze.append({
                 'title': post['title'],
                 'content': post.get('summary', '')[:2000],
                 'url': post.get('link', ''),
-                'source': post.get('source_name', 'RSS')
+                'source': _sources(post, post.get('source_name', 'RSS'))
             })
     
     for article in content_data.get('web_articles', []):
@@ -145,93 +250,240 @@ def prepare_batch_analysis(content_data: Dict[str, Any], novel_topics: List[Dict
                 'title': article['title'],
                 'content': article.get('full_text', article.get('snippet', ''))[:2000],
                 'url': article.get('url', ''),
-                'source': 'Web Search'
+                'source': _sources(article, 'Web Search')
             })
     
     return articles_to_analyze[:20]  # Max 20 para batch
 
 
-def analyze_articles_batch_sync(articles: List[Dict[str, str]], 
-                                 use_advanced_analysis: bool = True) -> List[Dict[str, Any]]:
+def _article_index(result: Dict[str, Any]) -> Optional[int]:
+    """Posición del artículo en el batch (custom_id 'article-<idx>-<url>')"""
+    parts = result.get('id', '').split('-', 2)
+    if len(parts) >= 2 and parts[0] == 'article' and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+def enrich_in_batch(two_phase: bool = False) -> bool:
     """
-    Analiza artículos usando Batch API (50% más barato) + análisis avanzado
+    ¿El análisis avanzado va dentro del batch (50% más barato, sin prisa)?
+    ENRICH_MODE: 'auto' (solo en dos fases, donde nadie espera el resultado),
+    'batch' (siempre que haya batch) o 'concurrent' (llamadas directas)
     """
-    if not articles:
-        return []
+    mode = os.getenv("ENRICH_MODE", "auto").lower()
+    if mode not in ("auto", "batch", "concurrent"):
+        raise ValueError(f"ENRICH_MODE must be auto, batch or concurrent (got {mode!r})")
+    return mode == "batch" or (mode == "auto" and two_phase)
+
+
+def enrichment_prompts(articles: List[Dict[str, str]], limit: int = ENRICH_LIMIT) -> List[Dict[str, Any]]:
+    """Peticiones de hype/títulos para la Batch API (ids 'hype-<i>' / 'titles-<i>')"""
+    prompts = []
+    for i, article in enumerate(articles[:limit]):
+        prompts.append(dict(hype_request(article['title'], article['content']), id=f"hype-{i}", json=True))
+        prompts.append(dict(titles_request(article['title']), id=f"titles-{i}", json=True))
+    return prompts
+
+
+def submit_analysis_batch(articles: List[Dict[str, str]], manifest=None, enrich: bool = False) -> str:
+    """
+    Envía el análisis a la Batch API (50% más barato) y devuelve el batch_id
     
+    Con enrich el análisis avanzado (hype/títulos) va en el mismo batch.
+    Con manifest (RunManifest) el batch_id queda registrado al enviarlo; al
+    retomar una ejecución interrumpida se reusa ese mismo batch en lugar de
+    enviar (y pagar) uno nuevo.
+    """
     print(f"\n📊 Analyzing {len(articles)} articles with Batch API...")
     print("   (This is 50% cheaper than regular API)")
     
+    batch_id = manifest.batch('analysis') if manifest else None
+    if batch_id:
+        print(f"   🔗 Reattaching to pending batch: {batch_id}")
+        return batch_id
+    
+    extra = enrichment_prompts(articles) if enrich else None
+    batch_id = analyze_articles_batch(articles, focus="AI and technology trends", extra_prompts=extra)
+    print(f"   ✅ Batch submitted: {batch_id}" + (" (with advanced analysis)" if extra else ""))
+    if manifest:
+        manifest.set_batch('analysis', batch_id, articles=len(articles), enrich=bool(extra))
+    return batch_id
+
+
+def wait_analysis_batch(batch_id: str, check_interval: int = 30, max_wait: int = 1800) -> List[Dict[str, Any]]:
+    """Espera los resultados del batch; [] en timeout o error"""
+    print("   ⏳ Waiting for analysis (usually 2-10 minutes)...")
+    results = wait_for_batch(batch_id, check_interval=check_interval, max_wait=max_wait)
+    if results:
+        print(f"   ✅ Analysis complete: {len(results)} results")
+        return results
+    print("   ⚠️ Batch timeout or error - using fallback")
+    return []
+
+
+def submit_and_wait_batch(articles: List[Dict[str, str]], manifest=None,
+                          enrich: bool = False) -> List[Dict[str, Any]]:
+    """
+    Envía el análisis a la Batch API y espera los resultados (máximo 30 min).
+    Devuelve [] en timeout o error.
+    """
+    if not articles:
+        return []
     try:
-        # Enviar batch
-        batch_id = analyze_articles_batch(articles, focus="AI and technology trends")
-        print(f"   ✅ Batch submitted: {batch_id}")
-        
-        # Esperar resultados (máximo 30 min)
-        print("   ⏳ Waiting for analysis (usually 2-10 minutes)...")
-        results = wait_for_batch(batch_id, check_interval=30, max_wait=1800)
-        
-        if results:
-            print(f"   ✅ Analysis complete: {len(results)} articles analyzed")
-            
-            # Análisis avanzado adicional
-            if use_advanced_analysis:
-                print("   🔬 Running advanced analysis (hype detection, titles)...")
-                for i, result in enumerate(results[:5]):  # Solo top 5 para no hacer demasiadas llamadas
-                    try:
-                        # Extraer título y contenido del resultado
-                        article_title = result.get('id', '').split('_')[-1] if '_' in result.get('id', '') else 'Unknown'
-                        article_content = result.get('content', '')
-                        
-                        # Encontrar artículo original
-                        original_article = next(
-                            (a for a in articles if a['title'] in result.get('id', '')),
-                            None
-                        )
-                        
-                        if original_article:
-                            # Análisis de hype
-                            hype_result = analyze_hype_vs_substance(
-                                title=original_article['title'],
-                                content=original_article['content']
-                            )
-                            result['hype_analysis'] = hype_result
-                            
-                            # Generar títulos virales
-                            titles_result = generate_video_titles(
-                                topic=original_article['title']
-                            )
-                            result['video_titles'] = titles_result.get('titles', [])[:3]  # Top 3
-                            result['thumbnail_ideas'] = titles_result.get('thumbnail_ideas', [])
-                            
-                            print(f"      ✅ Enhanced article {i+1}/{min(5, len(results))}")
-                    except Exception as e:
-                        print(f"      ⚠️ Error enhancing article {i+1}: {e}")
-            
-            return results
-        else:
-            print("   ⚠️ Batch timeout or error - using fallback")
-            return []
-            
+        return wait_analysis_batch(submit_analysis_batch(articles, manifest, enrich))
     except Exception as e:
         print(f"   ⚠️ Batch processing error: {e}")
         return []
 
 
+def _enrichment_entry(hype: Optional[Dict[str, Any]], titles: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    entry: Dict[str, Any] = {}
+    if hype is not None:
+        entry['hype_analysis'] = hype
+    if titles is not None:
+        entry['video_titles'] = titles.get('titles', [])[:3]  # Top 3
+        entry['thumbnail_ideas'] = titles.get('thumbnail_ideas', [])
+    return entry or None
+
+
+def enrich_articles(articles: List[Dict[str, str]], limit: int = ENRICH_LIMIT,
+                    concurrency: Optional[int] = None,
+                    timeout: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Análisis avanzado (hype vs sustancia + títulos de video) de los primeros
+    'limit' artículos. No depende del resultado del batch, así que en el
+    digest corre mientras se espera a la Batch API.
+    
+    Las 2 llamadas por artículo van a un pool acotado (ENRICH_CONCURRENCY)
+    con timeout por llamada (ENRICH_CALL_TIMEOUT) y el límite compartido de
+    api.openai.com de http_client: el total se acerca a la latencia de una
+    llamada. Una llamada que no termina a tiempo se descarta.
+    
+    Returns:
+        Lista alineada con articles: {'hype_analysis', 'video_titles',
+        'thumbnail_ideas'} (lo que terminó a tiempo) o None
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+    
+    if not articles:
+        return []
+    
+    timeout = timeout or ENRICH_CALL_TIMEOUT
+    targets = articles[:limit]  # Solo top 5 para no hacer demasiadas llamadas
+    calls = [(i, kind) for i in range(len(targets)) for kind in ('hype', 'titles')]
+    workers = max(1, min(concurrency or ENRICH_CONCURRENCY, len(calls)))
+    print(f"   🔬 Running advanced analysis (hype detection, titles): {len(calls)} calls, {workers} at a time...")
+    
+    def call(i, kind):
+        article = targets[i]
+        if kind == 'hype':
+            return analyze_hype_vs_substance(title=article['title'], content=article['content'], timeout=timeout)
+        return generate_video_titles(topic=article['title'], timeout=timeout)
+    
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich")
+    futures = {pool.submit(call, i, kind): (i, kind) for i, kind in calls}
+    # Cada llamada tiene su timeout; el plazo global cubre las tandas del pool
+    rounds = -(-len(calls) // workers)
+    done, late = wait_futures(futures, timeout=timeout * rounds + 5)
+    pool.shutdown(wait=False, cancel_futures=True)
+    
+    parts: Dict[tuple, Dict[str, Any]] = {}
+    for future in done:
+        i, kind = futures[future]
+        try:
+            parts[(i, kind)] = future.result()
+        except Exception as e:
+            print(f"      ⚠️ Error enhancing article {i+1} ({kind}): {e}")
+    for future in late:
+        i, kind = futures[future]
+        print(f"      ⚠️ Timeout enhancing article {i+1} ({kind})")
+    
+    enrichment = [_enrichment_entry(parts.get((i, 'hype')), parts.get((i, 'titles')))
+                  for i in range(len(targets))]
+    print(f"      ✅ Enhanced {sum(1 for e in enrichment if e)}/{len(targets)} articles")
+    return enrichment
+
+
+def enrichment_from_batch(batch_raw: List[Dict[str, Any]],
+                          articles: List[Dict[str, str]]) -> List[Optional[Dict[str, Any]]]:
+    """Análisis avanzado que llegó dentro del batch (ids 'hype-<i>' / 'titles-<i>')"""
+    parts: Dict[tuple, Dict[str, Any]] = {}
+    for result in batch_raw:
+        kind, _, idx = result.get('id', '').partition('-')
+        if kind not in ('hype', 'titles') or not idx.isdigit() or int(idx) >= len(articles):
+            continue
+        article = articles[int(idx)]
+        if kind == 'hype':
+            parts[(int(idx), kind)] = hype_from_response(article['title'], article['content'], result.get('content'))
+        else:
+            parts[(int(idx), kind)] = titles_from_response(article['title'], result.get('content'))
+    if not parts:
+        return []
+    size = max(i for i, _ in parts) + 1
+    return [_enrichment_entry(parts.get((i, 'hype')), parts.get((i, 'titles'))) for i in range(size)]
+
+
+def attach_analysis(batch_raw: List[Dict[str, Any]], articles: List[Dict[str, str]],
+                    enrichment: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Asocia cada resultado del batch con su artículo (título) y con el
+    análisis avanzado correspondiente (el calculado aparte o el que vino
+    en el mismo batch)
+    """
+    enrichment = enrichment or enrichment_from_batch(batch_raw, articles)
+    results = []
+    for result in batch_raw:
+        idx = _article_index(result)
+        if idx is None:
+            continue  # hype/títulos del batch: ya están en enrichment
+        result = dict(result)
+        if idx < len(articles):
+            result['title'] = articles[idx]['title']
+            if idx < len(enrichment) and enrichment[idx]:
+                result.update(enrichment[idx])
+        results.append(result)
+    return results
+
+
+def analyze_articles_batch_sync(articles: List[Dict[str, str]], 
+                                 use_advanced_analysis: bool = True) -> List[Dict[str, Any]]:
+    """
+    Analiza artículos usando Batch API (50% más barato) + análisis avanzado
+    
+    Versión secuencial; generate_daily_digest ejecuta el batch y el análisis
+    avanzado como etapas independientes en paralelo.
+    """
+    in_batch = use_advanced_analysis and enrich_in_batch()
+    results = submit_and_wait_batch(articles, enrich=in_batch)
+    if not results:
+        return []
+    enrichment = enrich_articles(articles) if use_advanced_analysis and not in_batch else []
+    return attach_analysis(results, articles, enrichment)
+
+
 def format_digest(novel_topics: List[Dict[str, Any]], 
                   batch_results: List[Dict[str, Any]],
-                  content_data: Dict[str, Any]) -> str:
+                  content_data: Dict[str, Any],
+                  generated_at: Optional[str] = None,
+                  analysis_pending: bool = False) -> str:
     """
     Formatea el digest final en markdown con análisis avanzado
+    
+    generated_at (ISO) fija la fecha al re-generar un digest ya publicado;
+    analysis_pending avisa de que el análisis del batch llegará después
     """
-    date_str = datetime.now().strftime("%Y-%m-%d")
+    generated = datetime.fromisoformat(generated_at) if generated_at else datetime.now()
+    date_str = generated.strftime("%Y-%m-%d")
     
     digest = f"""# 🤖 AI Digest - {date_str}
 
 **Fuentes analizadas:** {content_data.get('total_sources', 0)}
 **Temas novedosos:** {len(novel_topics)}
 **Artículos analizados:** {len(batch_results)}
-
+"""
+    if analysis_pending:
+        digest += "**Análisis:** ⏳ en curso (Batch API); se añadirá automáticamente al llegar\n"
+    digest += """
 ---
 
 ## 🔥 Top Trending Topics
@@ -255,6 +507,11 @@ def format_digest(novel_topics: List[Dict[str, Any]],
         if topic_data.get('recommendation'):
             digest += f"💡 {topic_data['recommendation']}\n\n"
         
+        # Historia cubierta por varios medios
+        if len(topic_data.get('sources', [])) > 1:
+            names = list(dict.fromkeys(s['name'] for s in topic_data['sources']))
+            digest += f"📰 Cubierto por {len(topic_data['sources'])} fuentes: {', '.join(names[:5])}\n\n"
+        
         # Buscar análisis correspondiente en batch results
         analysis = None
         hype_data = None
@@ -262,7 +519,7 @@ def format_digest(novel_topics: List[Dict[str, Any]],
         thumbnail_ideas = None
         
         for result in batch_results:
-            if topic in result.get('id', ''):
+            if result.get('title') == topic or topic in result.get('id', ''):
                 analysis = result.get('content', '')
                 hype_data = result.get('hype_analysis')
                 video_titles = result.get('video_titles')
@@ -303,7 +560,7 @@ def format_digest(novel_topics: List[Dict[str, Any]],
     
     # Footer con fuentes
     digest += "\n---\n\n"
-    digest += f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+    digest += f"**Generated:** {generated.strftime('%Y-%m-%d %H:%M:%S')}\n"
     digest += f"**Next update:** In 6 hours (cached)\n"
     digest += f"\n💡 *This digest used optimized processing:*\n"
     digest += f"- ✅ Batch API (50% cost savings)\n"
@@ -326,18 +583,312 @@ def save_digest(digest: str, filename: str = None) -> str:
     
     filepath = os.path.join(output_dir, filename)
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(digest)
+    _write_atomic(filepath, digest)
     
     return filepath
 
 
+def _write_atomic(path: str, text: str) -> None:
+    # El poller re-escribe digests ya publicados: nunca dejar uno a medias
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def digest_json_path(filepath: str) -> str:
+    """Forma JSON de un digest: mismo nombre con extensión .json"""
+    return os.path.splitext(filepath)[0] + ".json"
+
+
+def save_digest_json(filepath: str, novel_topics: List[Dict[str, Any]],
+                     batch_results: List[Dict[str, Any]], content_data: Dict[str, Any],
+                     articles: List[Dict[str, str]], batch_id: Optional[str] = None,
+                     use_advanced_features: bool = True,
+                     generated_at: Optional[str] = None,
+                     enrichment_in_batch: bool = False) -> str:
+    """
+    Guarda la forma JSON del digest junto al .md. Con un batch pendiente
+    (analysis.status = 'pending') es lo que usa el poller para completarlo.
+    """
+    if batch_id and not batch_results:
+        status = 'pending'
+    else:
+        status = 'complete' if batch_results else 'none'
+    data = {
+        'generated_at': generated_at or datetime.now().isoformat(),
+        'total_sources': content_data.get('total_sources', 0),
+        'novel_topics': novel_topics,
+        'articles': articles,
+        'batch_results': batch_results,
+        'analysis': {
+            'status': status,
+            'batch_id': batch_id,
+            'use_advanced_features': use_advanced_features,
+            'enrichment_in_batch': enrichment_in_batch,
+            'updated_at': datetime.now().isoformat(),
+        },
+    }
+    path = digest_json_path(filepath)
+    _write_atomic(path, json.dumps(data, ensure_ascii=False, indent=2, default=str))
+    return path
+
+
+def poll_digest_analysis(json_path: str, check_interval: int = 60,
+                         max_wait: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Fase dos del digest: espera el batch de un digest ya publicado y, cuando
+    llegan los resultados, re-genera el .md y su JSON con el análisis (más
+    hype/títulos). Sin resultados en max_wait (DIGEST_POLL_MAX_HOURS, 24h =
+    ventana del batch) el análisis queda como 'failed'. Si al terminar el
+    JSON ya tiene otro batch_id (un digest posterior del mismo día) no se toca.
+    """
+    with open(json_path, encoding='utf-8') as f:
+        data = json.load(f)
+    analysis = data['analysis']
+    if analysis['status'] != 'pending':
+        print(f"   ℹ️ Nothing to poll for {json_path} (status: {analysis['status']})")
+        return data
+    
+    if max_wait is None:
+        max_wait = int(float(os.getenv("DIGEST_POLL_MAX_HOURS", "24")) * 3600)
+    articles = data.get('articles', [])
+    print(f"🔭 Polling batch {analysis['batch_id']} for {json_path}")
+    in_batch = analysis.get('enrichment_in_batch', False)
+    enrichment = enrich_articles(articles) if analysis.get('use_advanced_features') and not in_batch else []
+    try:
+        raw = wait_analysis_batch(analysis['batch_id'], check_interval=check_interval, max_wait=max_wait)
+    except Exception as e:
+        print(f"   ⚠️ Batch processing error: {e}")
+        raw = []
+    
+    if raw:
+        data['batch_results'] = attach_analysis(raw, articles, enrichment)
+    analysis['status'] = 'complete' if raw else 'failed'
+    analysis['updated_at'] = datetime.now().isoformat()
+    
+    digest = format_digest(data['novel_topics'], data['batch_results'],
+                           {'total_sources': data.get('total_sources', 0)},
+                           generated_at=data['generated_at'])
+    # El nombre es por día y el cron corre cada 6h: si otra ejecución ha
+    # publicado un digest más nuevo mientras esperábamos, no pisarlo
+    current = _digest_batch_id(json_path)
+    if current != analysis['batch_id']:
+        print(f"   ⏭️ {json_path} now belongs to batch {current} - not overwriting it with {analysis['batch_id']}")
+        return data
+    md_path = os.path.splitext(json_path)[0] + ".md"
+    _write_atomic(md_path, digest)
+    _write_atomic(json_path, json.dumps(data, ensure_ascii=False, indent=2, default=str))
+    print(f"   ✅ Digest updated: {md_path} ({analysis['status']})")
+    return data
+
+
+def _digest_batch_id(json_path: str) -> Optional[str]:
+    try:
+        with open(json_path, encoding='utf-8') as f:
+            return json.load(f).get('analysis', {}).get('batch_id')
+    except (OSError, ValueError):
+        return None
+
+
+def poll_pending_digests(output_dir: str = "digests", **kwargs) -> List[str]:
+    """Completa los digests que siguen con análisis pendiente (p.ej. si el poller murió)"""
+    import glob
+    
+    polled = []
+    for json_path in sorted(glob.glob(os.path.join(output_dir, "digest_*.json"))):
+        try:
+            with open(json_path, encoding='utf-8') as f:
+                pending = json.load(f).get('analysis', {}).get('status') == 'pending'
+        except (OSError, ValueError):
+            continue
+        if pending:
+            poll_digest_analysis(json_path, **kwargs)
+            polled.append(json_path)
+    return polled
+
+
+def start_background_poller(json_path: str) -> int:
+    """
+    Lanza la fase dos en un proceso aparte, que sobrevive al final del
+    digest y del script de cron. Log en logs/poller_<digest>.log
+    """
+    import subprocess
+    import sys
+    
+    os.makedirs("logs", exist_ok=True)
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    with open(os.path.join("logs", f"poller_{name}.log"), 'a', encoding='utf-8') as log:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--poll', json_path],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    print(f"\n🔭 Background poller started (pid {proc.pid}): batch analysis will be patched into the digest")
+    return proc.pid
+
+
+# Etapas del digest: cada función recibe sus entradas por nombre del contexto
+
+def _stage_delta(content_data: Dict[str, Any], incremental: bool) -> Dict[str, Any]:
+    return content_delta(content_data) if incremental else content_data
+
+
+def _stage_stories(work_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Agrupar casi-duplicados: una historia por cluster
+    story_data = collapse_stories(work_data)
+    if story_data['near_duplicates']:
+        print(f"\n🧬 Collapsed {story_data['near_duplicates']} near-duplicates")
+    return story_data
+
+
+def _stage_topics(story_data: Dict[str, Any]) -> List[str]:
+    # Solo el delta en modo incremental
+    all_topics = extract_topics(story_data)
+    print(f"\n📝 Extracted {len(all_topics)} total topics")
+    return all_topics
+
+
+def _stage_novelty(all_topics: List[str], story_data: Dict[str, Any], max_topics: int,
+                   use_advanced_features: bool) -> List[Dict[str, Any]]:
+    novel_topics = filter_and_rank_topics(
+        all_topics,
+        max_topics,
+        use_advanced_scoring=use_advanced_features
+    )
+    sources_by_title = {
+        item.get('title'): item.get('sources', [])
+        for item in story_data['rss_posts'] + story_data['web_articles']
+    }
+    for topic_data in novel_topics:
+        topic_data['sources'] = sources_by_title.get(topic_data['topic'], [])
+    return novel_topics
+
+
+def _stage_articles(story_data: Dict[str, Any], novel_topics: List[Dict[str, Any]],
+                    use_batch: bool) -> List[Dict[str, str]]:
+    if not (use_batch and novel_topics):
+        return []
+    return prepare_batch_analysis(story_data, novel_topics)
+
+
+def _stage_batch(articles: List[Dict[str, str]], manifest, two_phase: bool,
+                 use_advanced_features: bool) -> Dict[str, Any]:
+    enrich = use_advanced_features and enrich_in_batch(two_phase)
+    if not two_phase:
+        return {'batch_raw': submit_and_wait_batch(articles, manifest, enrich), 'batch_id': None}
+    # Dos fases: solo enviar; el poller completa el digest cuando llegue
+    batch_id = None
+    if articles:
+        try:
+            batch_id = submit_analysis_batch(articles, manifest, enrich)
+        except Exception as e:
+            print(f"   ⚠️ Batch processing error: {e}")
+    return {'batch_raw': [], 'batch_id': batch_id}
+
+
+def _stage_enrich(articles: List[Dict[str, str]], use_advanced_features: bool,
+                  two_phase: bool) -> List[Optional[Dict[str, Any]]]:
+    # En dos fases el análisis avanzado va en la fase dos (son llamadas a la API);
+    # con ENRICH_MODE=batch viaja dentro del batch
+    if not use_advanced_features or two_phase or enrich_in_batch(two_phase):
+        return []
+    return enrich_articles(articles)
+
+
+def _stage_format(novel_topics: List[Dict[str, Any]], batch_results: List[Dict[str, Any]],
+                  content_data: Dict[str, Any], batch_id: Optional[str]) -> str:
+    print("\n📄 Formatting digest...")
+    return format_digest(novel_topics, batch_results, content_data,
+                         analysis_pending=bool(batch_id) and not batch_results)
+
+
+def _stage_save(digest: str, save_to_file: bool, novel_topics: List[Dict[str, Any]],
+                batch_results: List[Dict[str, Any]], content_data: Dict[str, Any],
+                articles: List[Dict[str, str]], batch_id: Optional[str],
+                use_advanced_features: bool) -> Optional[str]:
+    if not save_to_file:
+        return None
+    filepath = save_digest(digest)
+    save_digest_json(filepath, novel_topics, batch_results, content_data, articles,
+                     batch_id=batch_id, use_advanced_features=use_advanced_features,
+                     enrichment_in_batch=bool(batch_id) and use_advanced_features and enrich_in_batch(True))
+    print(f"\n💾 Saved to: {filepath}")
+    return filepath
+
+
+def _stage_history(novel_topics: List[Dict[str, Any]], filepath: Optional[str]) -> int:
+    # Temas al historial (evita repetirlos en futuros digests); tras guardar
+    print("\n📊 Updating history...")
+    top = novel_topics[:5]  # Solo top 5 al historial
+    for topic_data in top:
+        add_to_history(
+            topic=topic_data['topic'],
+            video_title=None,
+            metadata={'digest_date': datetime.now().isoformat()}
+        )
+    return len(top)
+
+
+def _stage_mark(work_data: Dict[str, Any], incremental: bool, filepath: Optional[str]) -> int:
+    # Marcar el delta como procesado: el próximo digest no lo re-analiza
+    if not incremental:
+        return 0
+    import entry_store
+    entries = work_data['rss_posts'] + work_data['web_articles']
+    entry_store.mark_processed(entries)
+    return len(entries)
+
+
+def build_digest_pipeline() -> Pipeline:
+    """
+    El digest como grafo de etapas. Corren en paralelo: RSS y búsqueda web;
+    la espera de la Batch API y el análisis avanzado (hype/títulos) de los
+    mismos artículos; historial de novedad y marcado de entradas procesadas.
+    
+    Entradas de configuración: hours_back, max_topics, use_batch,
+    use_advanced_features, save_to_file, incremental, two_phase; y manifest
+    (RunManifest o None) para registrar el batch enviado
+    
+    Con two_phase el batch solo se envía: el digest se publica con las
+    señales locales (novelty + score) y start_background_poller lo completa.
+    """
+    p = Pipeline("digest")
+    p.add("rss", fetch_rss, ["hours_back"], ["rss_data"])
+    p.add("web", fetch_web, ["hours_back"], ["web_articles"])
+    p.add("content", merge_content, ["rss_data", "web_articles"], ["content_data"])
+    p.add("delta", _stage_delta, ["content_data", "incremental"], ["work_data"], pool="cpu")
+    p.add("stories", _stage_stories, ["work_data"], ["story_data"], pool="cpu")
+    p.add("topics", _stage_topics, ["story_data"], ["all_topics"], pool="cpu")
+    p.add("novelty", _stage_novelty, ["all_topics", "story_data", "max_topics", "use_advanced_features"],
+          ["novel_topics"])
+    p.add("articles", _stage_articles, ["story_data", "novel_topics", "use_batch"], ["articles"], pool="cpu")
+    p.add("batch", _stage_batch, ["articles", "manifest", "two_phase", "use_advanced_features"],
+          ["batch_raw", "batch_id"])
+    p.add("enrich", _stage_enrich, ["articles", "use_advanced_features", "two_phase"], ["enrichment"])
+    p.add("analysis", attach_analysis, ["batch_raw", "articles", "enrichment"], ["batch_results"], pool="cpu")
+    p.add("format", _stage_format, ["novel_topics", "batch_results", "content_data", "batch_id"],
+          ["digest"], pool="cpu")
+    p.add("save", _stage_save, ["digest", "save_to_file", "novel_topics", "batch_results", "content_data",
+                                "articles", "batch_id", "use_advanced_features"], ["filepath"])
+    p.add("history", _stage_history, ["novel_topics", "filepath"], ["history_added"])
+    p.add("mark", _stage_mark, ["work_data", "incremental", "filepath"], ["processed"])
+    return p
+
+
 def generate_daily_digest(
     hours_back: int = 24,
     max_topics: int = 20,
     use_batch: bool = True,
     use_advanced_features: bool = True,
-    save_to_file: bool = True
+    save_to_file: bool = True,
+    incremental: bool = True,
+    context: Optional[Dict[str, Any]] = None,
+    rerun: Iterable[str] = (),
+    targets: Optional[Iterable[str]] = None,
+    resume: Union[bool, str] = False,
+    checkpoint: bool = True,
+    two_phase: bool = False
 ) -> Dict[str, Any]:
     """
     Función principal: genera el digest diario completo
@@ -348,72 +899,107 @@ def generate_daily_digest(
         use_batch: Usar batch API (más barato pero tarda más)
         use_advanced_features: Usar análisis avanzado (hype, títulos, scoring)
         save_to_file: Guardar resultado en archivo
+        incremental: Analizar solo entradas no procesadas por digests anteriores
+        context: Contexto de una ejecución anterior (result['context']); sus
+            etapas ya resueltas no se repiten
+        rerun: Etapas a repetir (y todo lo que depende de ellas), p.ej. ['format']
+        targets: Limitar la ejecución a lo necesario para estas etapas/salidas
+        resume: Retomar la última ejecución interrumpida (o la indicada por
+            run_id) desde la primera etapa sin terminar, reusando su batch y
+            su configuración; si no hay ninguna, empieza una nueva
+        checkpoint: Guardar el manifiesto de la ejecución (salidas por etapa
+            y batches enviados) en DIGEST_RUNS_DIR
+        two_phase: Publicar enseguida con señales locales y completar el
+            análisis del batch en segundo plano (mismo descuento del 50%)
         
     Returns:
         {
             'digest': str (markdown),
             'filepath': str,
-            'stats': {...}
+            'stats': {...},      # incluye 'pipeline' con tiempos por etapa
+            'context': {...},    # salidas de todas las etapas
+            'run_id': str        # manifiesto de la ejecución (None sin checkpoint)
         }
     """
+    import run_manifest
+    
     print("="*70)
     print("🚀 GENERATING OPTIMIZED DAILY DIGEST")
     print("="*70)
     
     start_time = datetime.now()
     
-    # 1. Fetch content (cached)
-    content_data = fetch_daily_content(hours_back)
-    
-    # 2. Extract topics
-    all_topics = extract_topics(content_data)
-    print(f"\n📝 Extracted {len(all_topics)} total topics")
-    
-    # 3. Filter for novelty and rank with advanced scoring
-    novel_topics = filter_and_rank_topics(
-        all_topics, 
-        max_topics,
-        use_advanced_scoring=use_advanced_features
-    )
+    config = {
+        'hours_back': hours_back,
+        'max_topics': max_topics,
+        'use_batch': use_batch,
+        'use_advanced_features': use_advanced_features,
+        'save_to_file': save_to_file,
+        'incremental': incremental,
+        'two_phase': two_phase,
+    }
+    ctx = dict(context or {})
+    manifest = None
+    if resume:
+        manifest = (run_manifest.RunManifest(resume) if isinstance(resume, str)
+                    else run_manifest.latest_incomplete())
+        if manifest is not None:
+            # La configuración es la de la ejecución original
+            config.update(manifest.config)
+            ctx.update(manifest.outputs())
+            manifest.resume()
+            pending = manifest.batch('analysis')
+            print(f"♻️ Resuming run {manifest.run_id} (attempt {manifest.attempts}): "
+                  f"{len(manifest.completed_stages())} stages done"
+                  + (f", pending batch {pending}" if pending else ""))
+        else:
+            print("♻️ Nothing to resume - starting a new run")
+    if manifest is None and checkpoint:
+        manifest = run_manifest.RunManifest(config=config)
     
-    # 4. Prepare for batch analysis
-    batch_results = []
-    if use_batch and novel_topics:
-        articles = prepare_batch_analysis(content_data, novel_topics)
-        batch_results = analyze_articles_batch_sync(
-            articles,
-            use_advanced_analysis=use_advanced_features
-        )
+    print(f"📰 Fetching content from last {config['hours_back']} hours...")
+    pipeline = build_digest_pipeline()
+    ctx.update(config, manifest=manifest)
     
-    # 5. Format digest
-    print("\n📄 Formatting digest...")
-    digest = format_digest(novel_topics, batch_results, content_data)
+    def on_stage_done(name, outputs):
+        if manifest is not None:
+            manifest.record_stage(name, outputs, pipeline.timings[name]['seconds'])
     
-    # 6. Save to file
-    filepath = None
-    if save_to_file:
-        filepath = save_digest(digest)
-        print(f"\n💾 Saved to: {filepath}")
+    try:
+        ctx = pipeline.run(ctx, rerun=rerun, targets=targets, on_stage_done=on_stage_done)
+    except BaseException as e:
+        # Interrumpida o fallida: queda para --resume
+        if manifest is not None:
+            manifest.finish('failed', f"{type(e).__name__}: {e}")
+            print(f"\n💾 Checkpoint saved - resume with: python daily_digest_optimized.py --resume {manifest.run_id}")
+        raise
+    if manifest is not None:
+        manifest.finish('complete')
     
-    # 7. Add novel topics to history (to avoid repetition in future)
-    print("\n📊 Updating history...")
-    for topic_data in novel_topics[:5]:  # Solo top 5 al historial
-        add_to_history(
-            topic=topic_data['topic'],
-            video_title=None,
-            metadata={'digest_date': datetime.now().isoformat()}
-        )
+    # Fase dos: el análisis del batch se añade al digest ya publicado
+    if config.get('two_phase') and ctx.get('batch_id') and ctx.get('filepath'):
+        start_background_poller(digest_json_path(ctx['filepath']))
     
     elapsed = (datetime.now() - start_time).total_seconds()
     
+    content_data = ctx.get('content_data', {})
+    work_data = ctx.get('work_data', {})
+    story_data = ctx.get('story_data', {})
+    batch_results = ctx.get('batch_results', [])
+    
     stats = {
         'total_sources': content_data.get('total_sources', 0),
-        'topics_analyzed': len(all_topics),
-        'novel_topics_found': len(novel_topics),
+        'new_entries': len(work_data.get('rss_posts', [])) + len(work_data.get('web_articles', [])),
+        'near_duplicates': story_data.get('near_duplicates', 0),
+        'topics_analyzed': len(ctx.get('all_topics', [])),
+        'novel_topics_found': len(ctx.get('novel_topics', [])),
         'articles_in_batch': len(batch_results),
         'time_elapsed': elapsed,
-        'cache_used': True,  # Si fetch_daily_content usó cache
-        'batch_used': use_batch
+        'incremental': config['incremental'],
+        'batch_used': config['use_batch'],
+        'two_phase': config.get('two_phase', False),
+        'analysis_pending': bool(ctx.get('batch_id')) and not batch_results,
+        'pipeline': pipeline.summary()
     }
     
     print("\n" + "="*70)
@@ -421,9 +1007,12 @@ def generate_daily_digest(
     print("="*70)
     print(f"\n📊 Statistics:")
     print(f"   Sources: {stats['total_sources']}")
+    print(f"   New entries: {stats['new_entries']}")
+    print(f"   Near-duplicates collapsed: {stats['near_duplicates']}")
     print(f"   Topics analyzed: {stats['topics_analyzed']}")
     print(f"   Novel topics: {stats['novel_topics_found']}")
     print(f"   Time: {stats['time_elapsed']:.1f}s")
+    pipeline.report()
     print(f"\n💰 Cost savings:")
     print(f"   Batch API: 50% cheaper")
     print(f"   Cache: 70-80% savings on repeated queries")
@@ -431,22 +1020,34 @@ def generate_daily_digest(
     print()
     
     return {
-        'digest': digest,
-        'filepath': filepath,
-        'stats': stats
+        'digest': ctx.get('digest', ''),
+        'filepath': ctx.get('filepath'),
+        'stats': stats,
+        'context': ctx,
+        'run_id': manifest.run_id if manifest is not None else None
     }
 
 
 if __name__ == '__main__':
     import sys
     
+    # Fase dos: --poll [digests/digest_YYYYMMDD.json] completa digests pendientes
+    if '--poll' in sys.argv:
+        idx = sys.argv.index('--poll')
+        if idx + 1 < len(sys.argv):
+            poll_digest_analysis(sys.argv[idx + 1])
+        else:
+            poll_pending_digests()
+        sys.exit(0)
+    
     # Configuración por defecto
     config = {
         'hours_back': 24,
         'max_topics': 20,
         'use_batch': True,
         'use_advanced_features': True,
-        'save_to_file': True
+        'save_to_file': True,
+        'incremental': True
     }
     
     # Parse argumentos simples
@@ -459,10 +1060,24 @@ if __name__ == '__main__':
             config['use_advanced_features'] = False
             print("⚠️ Advanced features disabled (faster but less detailed)")
         
+        if '--full' in sys.argv:
+            config['incremental'] = False
+            print("⚠️ Incremental mode disabled (re-analyzing the whole window)")
+        
         if '--hours' in sys.argv:
             idx = sys.argv.index('--hours')
             if idx + 1 < len(sys.argv):
                 config['hours_back'] = int(sys.argv[idx + 1])
+        
+        if '--two-phase' in sys.argv:
+            config['two_phase'] = True
+            print("⚡ Two-phase mode: publishing now, batch analysis patched in the background")
+        
+        if '--resume' in sys.argv:
+            # --resume [run_id]: retoma la última ejecución interrumpida
+            idx = sys.argv.index('--resume')
+            run_id = sys.argv[idx + 1] if idx + 1 < len(sys.argv) and not sys.argv[idx + 1].startswith('--') else None
+            config['resume'] = run_id or True
     
     # Generar digest
     result = generate_daily_digest(**config)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Salud por dominio para la lectura de artículos
+- EWMA de latencia y de tasa de éxito, persistidas en JSON entre corridas
+  ("éxito" = se descargó y se extrajo texto)
+- Circuit breaker: tras varios fallos seguidos el dominio se salta durante
+  un cooldown; luego pasa a half-open y deja pasar una sola prueba
+- Timeout adaptativo: p95 observado del dominio (con margen), acotado por
+  el timeout por defecto del llamador
+- Compartido entre procesos: al guardar se toma un lock de archivo y, si
+  otro proceso guardó antes, se parte de su versión y se sobrescriben solo
+  los dominios que este proceso registró desde su último guardado
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import file_lock
+import metrics
+
+DOMAIN_HEALTH_PATH = os.getenv("DOMAIN_HEALTH_PATH", os.path.join("cache", "domain_health.json"))
+DOMAIN_EWMA_ALPHA = float(os.getenv("DOMAIN_EWMA_ALPHA", "0.3"))
+DOMAIN_FAIL_THRESHOLD = int(os.getenv("DOMAIN_FAIL_THRESHOLD", "3"))
+DOMAIN_COOLDOWN_SECONDS = float(os.getenv("DOMAIN_COOLDOWN_SECONDS", "1800"))
+DOMAIN_MAX_COOLDOWN_SECONDS = float(os.getenv("DOMAIN_MAX_COOLDOWN_SECONDS", str(24 * 3600)))
+DOMAIN_MIN_TIMEOUT = float(os.getenv("DOMAIN_MIN_TIMEOUT", "3"))
+DOMAIN_TIMEOUT_FACTOR = float(os.getenv("DOMAIN_TIMEOUT_FACTOR", "1.5"))
+# Muestras mínimas antes de adaptar el timeout
+DOMAIN_MIN_SAMPLES = 5
+_LATENCY_WINDOW = 50
+_SAVE_INTERVAL = 5.0
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_lock = threading.Lock()
+_state: Optional[Dict[str, Dict[str, Any]]] = None
+_probing: set = set()
+_touched: set = set()  # dominios con record() desde el último guardado
+_stamp = None  # versión en disco de la última lectura/escritura
+_dirty = False
+_last_save = 0.0
+
+
+def domain_of(url: str) -> str:
+    host = (urlparse(url).hostname or url).lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _read() -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(DOMAIN_HEALTH_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    global _state, _stamp
+    if _state is None:
+        _stamp = file_lock.stamp(DOMAIN_HEALTH_PATH)
+        _state = _read()
+    return _state
+
+
+def _entry(domain: str) -> Dict[str, Any]:
+    return _load().setdefault(domain, {
+        "state": CLOSED, "samples": 0, "consecutive_failures": 0,
+        "ewma_latency": None, "ewma_success": 1.0, "latencies": [],
+        "opened_at": 0.0, "cooldown": DOMAIN_COOLDOWN_SECONDS,
+    })
+
+
+def _p95(latencies) -> float:
+    lat = sorted(latencies)
+    return lat[min(len(lat) - 1, int(0.95 * len(lat)))] if lat else 0.0
+
+
+def is_open(url: str) -> bool:
+    """True si el dominio está en pausa (sin efectos: no reserva la prueba half-open)"""
+    domain = domain_of(url)
+    with _lock:
+        e = _load().get(domain)
+        if not e or e["state"] == CLOSED:
+            return False
+        if e["state"] == OPEN:
+            return time.time() - e["opened_at"] < e["cooldown"]
+        # half-open: bloqueado solo mientras hay una prueba en curso
+        return domain in _probing
+
+
+def allow(url: str) -> bool:
+    """
+    ¿Se puede pedir esta URL ahora? En half-open solo pasa una request
+    de prueba a la vez; su resultado (record) cierra o reabre el circuito.
+    """
+    domain = domain_of(url)
+    with _lock:
+        e = _load().get(domain)
+        if not e or e["state"] == CLOSED:
+            return True
+        if e["state"] == OPEN and time.time() - e["opened_at"] < e["cooldown"]:
+            metrics.DOMAIN_CIRCUIT.inc(event="skipped")
+            return False
+        if domain in _probing:
+            metrics.DOMAIN_CIRCUIT.inc(event="skipped")
+            return False
+        e["state"] = HALF_OPEN
+        _probing.add(domain)
+        metrics.DOMAIN_CIRCUIT.inc(event="probe")
+        return True
+
+
+def timeout_for(url: str, default: float) -> float:
+    """Timeout según el p95 del dominio (con margen), nunca mayor que `default`"""
+    with _lock:
+        e = _load().get(domain_of(url))
+        if not e or len(e["latencies"]) < DOMAIN_MIN_SAMPLES:
+            return default
+        return max(DOMAIN_MIN_TIMEOUT, min(default, _p95(e["latencies"]) * DOMAIN_TIMEOUT_FACTOR + 1.0))
+
+
+def record(url: str, ok: bool, seconds: float) -> None:
+    """Registra el resultado de una lectura (descarga + extracción)"""
+    global _dirty
+    domain = domain_of(url)
+    a = DOMAIN_EWMA_ALPHA
+    with _lock:
+        e = _entry(domain)
+        e["samples"] += 1
+        e["ewma_success"] = (1 - a) * e["ewma_success"] + a * (1.0 if ok else 0.0)
+        if ok:
+            e["ewma_latency"] = seconds if e["ewma_latency"] is None else (1 - a) * e["ewma_latency"] + a * seconds
+            e["latencies"] = (e["latencies"] + [round(seconds, 3)])[-_LATENCY_WINDOW:]
+            e["consecutive_failures"] = 0
+            if e["state"] != CLOSED:
+                metrics.DOMAIN_CIRCUIT.inc(event="closed")
+            e["state"] = CLOSED
+            e["cooldown"] = DOMAIN_COOLDOWN_SECONDS
+        else:
+            e["consecutive_failures"] += 1
+            if e["state"] == HALF_OPEN:
+                # La prueba falló: cooldown más largo (backoff)
+                e["cooldown"] = min(DOMAIN_MAX_COOLDOWN_SECONDS, e["cooldown"] * 2)
+                e["state"], e["opened_at"] = OPEN, time.time()
+                metrics.DOMAIN_CIRCUIT.inc(event="opened")
+            elif e["state"] == CLOSED and e["consecutive_failures"] >= DOMAIN_FAIL_THRESHOLD:
+                e["state"], e["opened_at"] = OPEN, time.time()
+                metrics.DOMAIN_CIRCUIT.inc(event="opened")
+        _probing.discard(domain)
+        _touched.add(domain)
+        _dirty = True
+    if time.monotonic() - _last_save > _SAVE_INTERVAL:
+        save()
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """{dominio: {'state', 'samples', 'consecutive_failures', 'ewma_success', 'ewma_latency', 'p95', ...}}"""
+    with _lock:
+        return {
+            d: dict({k: v for k, v in e.items() if k != "latencies"}, p95=round(_p95(e["latencies"]), 3))
+            for d, e in _load().items()
+        }
+
+
+def save() -> None:
+    """
+    Escritura atómica del estado (se llama sola cada pocos segundos y al
+    salir), bajo lock de archivo y fusionando lo que otro proceso guardó
+    """
+    global _state, _stamp, _dirty, _last_save
+    with _lock:
+        if not _dirty or _state is None:
+            return
+        try:
+            with file_lock.locked(DOMAIN_HEALTH_PATH):
+                if file_lock.stamp(DOMAIN_HEALTH_PATH) != _stamp:
+                    # Las EWMA no se pueden sumar: por dominio gana el último que lo registró
+                    merged = _read()
+                    merged.update({d: _state[d] for d in _touched if d in _state})
+                    _state = merged
+                tmp = f"{DOMAIN_HEALTH_PATH}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(_state, f)
+                os.replace(tmp, DOMAIN_HEALTH_PATH)
+                _stamp = file_lock.stamp(DOMAIN_HEALTH_PATH)
+            _touched.clear()
+            _dirty = False
+        except Exception as e:
+            print(f"Warning: Could not save domain health: {e}")
+        _last_save = time.monotonic()
+
+
+atexit.register(save)
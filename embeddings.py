@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+Proveedores de embeddings intercambiables
+- 'openai': API de OpenAI (EMBED_MODEL), en lotes de EMBED_BATCH textos por
+  llamada
+- 'local': NumPy puro, sin red. Features hasheadas (n-gramas de caracteres
+  3-4 y palabras/bigramas del analizador de text_index) en LOCAL_EMBED_DIM
+  cubetas con signo, tf sublineal, IDF y proyección SVD opcionales
+  ajustadas con `python embeddings.py fit` sobre lo ya leído
+- 'auto': openai si hay OPENAI_API_KEY, si no local
+- Selección por subsistema: NOVELTY_EMBED_PROVIDER, RAG_EMBED_PROVIDER
+  (por defecto EMBED_PROVIDER)
+- Cada proveedor tiene una firma ('openai:<modelo>', 'local:<dim>:<svd>:<fit>'):
+  solo se comparan vectores con la misma firma
+"""
+
+import hashlib
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+EMBED_PROVIDER = os.getenv("EMBED_PROVIDER", "auto")  # auto | openai | local
+EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "256"))
+LOCAL_EMBED_DIM = int(os.getenv("LOCAL_EMBED_DIM", "2048"))
+LOCAL_EMBED_SVD_DIM = int(os.getenv("LOCAL_EMBED_SVD_DIM", "256"))
+LOCAL_EMBED_MODEL_PATH = os.getenv("LOCAL_EMBED_MODEL_PATH", os.path.join("cache", "local_embedder.npz"))
+# Los cosenos del backend local son más bajos que los de OpenAI para el
+# mismo par de textos: cada proveedor trae su umbral (bench/embed_bench.py)
+OPENAI_NOVELTY_THRESHOLD = float(os.getenv("OPENAI_NOVELTY_THRESHOLD", "0.75"))
+LOCAL_NOVELTY_THRESHOLD = float(os.getenv("LOCAL_NOVELTY_THRESHOLD", "0.4"))
+
+PROVIDERS = ("auto", "openai", "local")
+# Firma de los vectores guardados antes de que existieran los proveedores
+LEGACY_SIGNATURE = f"openai:{EMBED_MODEL}"
+
+_CHAR_NGRAMS = (3, 4)
+_WORD_WEIGHT = 2.0
+# Hashes de palabras/bigramas ya vistos (el vocabulario se repite mucho)
+_WORD_CACHE = 200000
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+class OpenAIEmbedder:
+    """Embeddings de la API de OpenAI (cliente diferido)"""
+
+    local = False
+
+    def __init__(self, model: str = EMBED_MODEL):
+        self.model = model
+        self.signature = f"openai:{model}"
+        self.novelty_threshold = OPENAI_NOVELTY_THRESHOLD
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            try:
+                from openai import OpenAI  # type: ignore
+            except Exception as e:
+                raise RuntimeError(f"OpenAI SDK no disponible: {e}")
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        out: List[List[float]] = []
+        for start in range(0, len(texts), EMBED_BATCH):
+            batch = [(t or " ").replace("\n", " ").strip() or " " for t in texts[start:start + EMBED_BATCH]]
+            response = self._get_client().embeddings.create(input=batch, model=self.model)
+            out.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+        return out
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+
+class LocalEmbedder:
+    """
+    Hashing trick + TF-IDF (+ SVD) en NumPy, todo el lote vectorizado.
+    Sin ajustar (no hay modelo en disco) el IDF es 1 y no hay proyección.
+    """
+
+    local = True
+
+    def __init__(self, dim: int = LOCAL_EMBED_DIM, svd_dim: int = LOCAL_EMBED_SVD_DIM,
+                 path: Optional[str] = None):
+        self.dim = dim
+        self.svd_dim = svd_dim
+        self.path = path or LOCAL_EMBED_MODEL_PATH
+        self.novelty_threshold = LOCAL_NOVELTY_THRESHOLD
+        self.idf = None
+        self.components = None
+        self.fit_id = "0"
+        self._word_hashes: Dict[str, int] = {}
+        self._load()
+
+    @property
+    def signature(self) -> str:
+        k = 0 if self.components is None else self.components.shape[0]
+        return f"local:{self.dim}:{k}:{self.fit_id}"
+
+    def _load(self) -> None:
+        import numpy as np
+
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if int(data["dim"]) != self.dim:
+                    return  # ajustado con otro LOCAL_EMBED_DIM
+                self.idf = data["idf"].astype(np.float32)
+                components = data["components"].astype(np.float32)
+                self.fit_id = str(data["fit_id"])
+        except Exception as e:
+            print(f"Warning: Could not load local embedder: {e}")
+            return
+        self.components = components[:self.svd_dim] if self.svd_dim and components.size else None
+
+    # --- features ---
+
+    def _mix(self, h):
+        """Dispersa hashes (uint64) -> (cubeta, signo)"""
+        import numpy as np
+
+        h = h * np.uint64(_GOLDEN)
+        buckets = ((h >> np.uint64(32)) % np.uint64(self.dim)).astype(np.int64)
+        signs = ((h >> np.uint64(31)) & np.uint64(1)).astype(np.float32) * 2 - 1
+        return buckets, signs
+
+    def _counts(self, texts: Sequence[str]):
+        """Matriz (n, dim) de conteos con signo de todas las features"""
+        import numpy as np
+        from text_index import _fold, analyze
+
+        n = len(texts)
+        rows, cols, vals = [], [], []
+
+        # n-gramas de caracteres: todo el lote concatenado, hash rodante vectorizado
+        padded = [" " + _NON_ALNUM.sub(" ", _fold(t or "")).strip() + " " for t in texts]
+        raw = np.frombuffer("\x00".join(padded).encode("ascii", "ignore"), dtype=np.uint8)
+        doc_of = np.repeat(np.arange(n), [len(p) + 1 for p in padded])[:len(raw)]
+        is_sep = np.concatenate(([0], np.cumsum(raw == 0)))
+        b = raw.astype(np.uint64)
+        with np.errstate(over="ignore"):
+            for g in _CHAR_NGRAMS:
+                if len(raw) < g:
+                    continue
+                m = len(raw) - g + 1
+                h = np.full(m, g, dtype=np.uint64)
+                for j in range(g):
+                    h = h * np.uint64(257) + b[j:j + m]
+                ok = (is_sep[g:g + m] - is_sep[:m]) == 0
+                buckets, signs = self._mix(h[ok])
+                rows.append(doc_of[:m][ok])
+                cols.append(buckets)
+                vals.append(signs)
+
+            # Palabras analizadas (acentos, stopwords, plural) y bigramas
+            w_rows, w_hashes = [], []
+            cache = self._word_hashes
+            if len(cache) > _WORD_CACHE:
+                cache.clear()
+            for i, t in enumerate(texts):
+                terms = analyze(t or "")
+                feats = terms + [f"{a} {b_}" for a, b_ in zip(terms, terms[1:])]
+                w_rows.extend([i] * len(feats))
+                for f in feats:
+                    h = cache.get(f)
+                    if h is None:
+                        h = cache[f] = zlib.crc32(f.encode("utf-8"))
+                    w_hashes.append(h)
+            if w_hashes:
+                buckets, signs = self._mix(np.asarray(w_hashes, dtype=np.uint64) + np.uint64(1 << 40))
+                rows.append(np.asarray(w_rows, dtype=np.int64))
+                cols.append(buckets)
+                vals.append(signs * _WORD_WEIGHT)
+
+        if not rows:
+            return np.zeros((n, self.dim), dtype=np.float32)
+        flat = np.concatenate(rows) * self.dim + np.concatenate(cols)
+        counts = np.bincount(flat, weights=np.concatenate(vals), minlength=n * self.dim)
+        return counts.reshape(n, self.dim).astype(np.float32)
+
+    def _tfidf(self, texts: Sequence[str]):
+        import numpy as np
+
+        x = self._counts(texts)
+        x = np.sign(x) * np.log1p(np.abs(x))
+        if self.idf is not None:
+            x *= self.idf
+        return _normalize(x)
+
+    def embed_matrix(self, texts: Sequence[str]):
+        """Matriz (n, d) float32 normalizada; d = svd_dim si hay proyección"""
+        import numpy as np
+
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        out = []
+        for start in range(0, len(texts), EMBED_BATCH):
+            x = self._tfidf(texts[start:start + EMBED_BATCH])
+            if self.components is not None:
+                x = _normalize(x @ self.components.T)
+            out.append(x)
+        return np.vstack(out)
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return self.embed_matrix(texts).round(5).tolist()
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    # --- ajuste ---
+
+    def fit(self, texts: Sequence[str], seed: int = 0) -> Dict[str, Any]:
+        """
+        Ajusta IDF por cubeta y, si hay documentos suficientes, la proyección
+        SVD (randomizada: dos iteraciones de potencia). Guarda el modelo.
+        """
+        import numpy as np
+
+        texts = [t for t in texts if t and t.strip()]
+        if not texts:
+            raise ValueError("No hay textos para ajustar")
+        self.idf, self.components = None, None
+        df = np.zeros(self.dim, dtype=np.float64)
+        for start in range(0, len(texts), EMBED_BATCH):
+            df += (self._counts(texts[start:start + EMBED_BATCH]) != 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+
+        k = min(self.svd_dim, len(texts) - 1, self.dim)
+        if k >= 2:
+            x = np.vstack([self._tfidf(texts[s:s + EMBED_BATCH]) for s in range(0, len(texts), EMBED_BATCH)])
+            rng = np.random.default_rng(seed)
+            q, _ = np.linalg.qr(x @ rng.standard_normal((self.dim, k + 10)).astype(np.float32))
+            for _ in range(2):
+                q, _ = np.linalg.qr(x @ (x.T @ q))
+            _, _, vt = np.linalg.svd(q.T @ x, full_matrices=False)
+            self.components = vt[:k].astype(np.float32)
+
+        digest = hashlib.sha1(self.idf.tobytes())
+        if self.components is not None:
+            digest.update(self.components.tobytes())
+        self.fit_id = digest.hexdigest()[:8]
+        self.save(len(texts))
+        return {"documents": len(texts), "dim": self.dim,
+                "svd_dim": 0 if self.components is None else self.components.shape[0],
+                "signature": self.signature}
+
+    def save(self, documents: int = 0) -> None:
+        """Escritura atómica del modelo (.npz)"""
+        import numpy as np
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    dim=np.int64(self.dim),
+                    idf=self.idf,
+                    components=self.components if self.components is not None else np.zeros((0, self.dim), np.float32),
+                    fit_id=np.array(self.fit_id),
+                    documents=np.int64(documents),
+                    fitted_at=np.array(datetime.now().isoformat()),
+                )
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Warning: Could not save local embedder: {e}")
+
+
+def _normalize(x):
+    import numpy as np
+
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms == 0, 1.0, norms)
+
+
+# ---------- Selección por subsistema ----------
+
+_embedders: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def provider_for(subsystem: Optional[str] = None) -> str:
+    """Proveedor configurado ('openai' | 'local') para 'novelty', 'rag', ..."""
+    name = EMBED_PROVIDER
+    if subsystem:
+        name = os.getenv(f"{subsystem.upper()}_EMBED_PROVIDER", name)
+    name = (name or "auto").lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Proveedor de embeddings desconocido: {name} (opciones: {PROVIDERS})")
+    if name == "auto":
+        name = "openai" if os.getenv("OPENAI_API_KEY") else "local"
+    return name
+
+
+def get_embedder(subsystem: Optional[str] = None, provider: Optional[str] = None):
+    """Embedder del proceso para el subsistema (uno por proveedor)"""
+    name = provider or provider_for(subsystem)
+    with _lock:
+        if name not in _embedders:
+            _embedders[name] = LocalEmbedder() if name == "local" else OpenAIEmbedder()
+        return _embedders[name]
+
+
+def reset() -> None:
+    """Olvida los embedders cargados (tras `fit` o cambios de configuración)"""
+    with _lock:
+        _embedders.clear()
+
+
+def signature_of(item: Dict[str, Any]) -> str:
+    return item.get("embed_provider") or LEGACY_SIGNATURE
+
+
+_reembedded: Dict[tuple, List[float]] = {}
+
+
+def align(items: Sequence[Dict[str, Any]], embedder, text_key: str = "text") -> List[Dict[str, Any]]:
+    """
+    Items con 'embedding' comparable con `embedder`: los de otra firma se
+    re-embeben si el proveedor es local (barato, con cache en memoria) y
+    quedan sin vector (None) si es remoto.
+    """
+    stale = [i for i, it in enumerate(items) if signature_of(it) != embedder.signature]
+    if not stale:
+        return list(items)
+    vectors: Dict[int, Optional[List[float]]] = {i: None for i in stale}
+    if embedder.local:
+        todo = [i for i in stale if (embedder.signature, items[i].get("id"), items[i].get(text_key, "")) not in _reembedded]
+        if todo:
+            for i, vec in zip(todo, embedder.embed([items[i].get(text_key, "") for i in todo])):
+                _reembedded[(embedder.signature, items[i].get("id"), items[i].get(text_key, ""))] = vec
+        for i in stale:
+            vectors[i] = _reembedded[(embedder.signature, items[i].get("id"), items[i].get(text_key, ""))]
+    return [dict(it, embedding=vectors[i]) if i in vectors else it for i, it in enumerate(items)]
+
+
+# ---------- Ajuste desde lo ya leído ----------
+
+def fit_corpus() -> List[str]:
+    """Títulos/snippets del índice local, temas del historial de novedad y chunks del RAG"""
+    import json
+
+    texts: List[str] = []
+    try:
+        import text_index
+
+        idx = text_index.get_index()
+        texts += [f"{d['title']} {d['snippet']}" for i, d in idx.docs.items() if i not in idx.deleted]
+    except Exception as e:
+        print(f"Warning: Could not read text index: {e}")
+    try:
+        import novelty_checker
+
+        texts += [h.get("topic", "") for h in novelty_checker.load_history()]
+    except Exception as e:
+        print(f"Warning: Could not read novelty history: {e}")
+    rag_path = os.getenv("RAG_PATH", "rag_store.jsonl")
+    if os.path.exists(rag_path):
+        with open(rag_path, "r", encoding="utf-8") as f:
+            texts += [json.loads(line).get("text", "") for line in f if line.strip()]
+    return [t for t in texts if t.strip()]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "fit":
+        corpus = fit_corpus()
+        print(f"🧮 Ajustando embedder local sobre {len(corpus)} textos...")
+        info = LocalEmbedder().fit(corpus)
+        print(f"✅ {info['signature']} guardado en {LOCAL_EMBED_MODEL_PATH}")
+    else:
+        for sub in ("novelty", "rag"):
+            print(f"   {sub}: {provider_for(sub)} ({get_embedder(sub).signature})")
+        print("\n💡 Uso: python embeddings.py fit  (ajusta IDF + SVD del backend local)")
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Matcher multi-patrón de entidades (una sola regex compilada)
+- Diccionario configurable: nombre canónico -> patrones + categorías
+  (una entidad puede estar en varias: Mistral es empresa y modelo)
+- Una pasada por documento, sin concatenar textos: conteos por documento
+  y agregados (menciones y nº de documentos)
+- Entidades "dinámicas" (p.ej. GPT-[0-9o]+) cuentan por el texto
+  normalizado que matchea: gpt-4o y gpt-4 quedan separados
+- ENTITY_DICTIONARY_PATH (JSON) extiende o pisa el diccionario por defecto
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+ENTITY_DICTIONARY_PATH = os.getenv("ENTITY_DICTIONARY_PATH", "")
+
+# nombre -> {'patterns': [regex sin grupos], 'categories': [...], 'dynamic': bool}
+DEFAULT_ENTITIES: Dict[str, Dict[str, Any]] = {
+    # Empresas
+    "OpenAI": {"patterns": ["OpenAI"], "categories": ["companies"]},
+    "Anthropic": {"patterns": ["Anthropic"], "categories": ["companies"]},
+    "Google": {"patterns": ["Google"], "categories": ["companies"]},
+    "Microsoft": {"patterns": ["Microsoft"], "categories": ["companies"]},
+    "Meta": {"patterns": ["Meta"], "categories": ["companies"]},
+    "DeepMind": {"patterns": ["DeepMind"], "categories": ["companies"]},
+    "Mistral": {"patterns": ["Mistral"], "categories": ["companies", "models"]},
+    "Cohere": {"patterns": ["Cohere"], "categories": ["companies"]},
+    "Hugging Face": {"patterns": [r"Hugging\s*Face"], "categories": ["companies"]},
+    "Stability AI": {"patterns": [r"Stability\s*AI"], "categories": ["companies"]},
+    "Midjourney": {"patterns": ["Midjourney"], "categories": ["companies", "models"]},
+    "Perplexity": {"patterns": ["Perplexity"], "categories": ["companies"]},
+    # Modelos
+    "GPT": {"patterns": [r"GPT-[0-9o]+"], "categories": ["models"], "dynamic": True},
+    "Claude": {"patterns": [r"Claude(?:\s*[0-9][0-9.]*)?"], "categories": ["models"], "dynamic": True},
+    "Gemini": {"patterns": ["Gemini"], "categories": ["models"]},
+    "Llama": {"patterns": ["LLaMA"], "categories": ["models"]},
+    "DALL-E": {"patterns": ["DALL-E"], "categories": ["models"]},
+    "Stable Diffusion": {"patterns": [r"Stable\s*Diffusion"], "categories": ["models"]},
+    # Investigación / técnicas
+    "RAG": {"patterns": ["RAG"], "categories": ["research"]},
+    "fine-tuning": {"patterns": ["fine-tuning"], "categories": ["research"]},
+    "RLHF": {"patterns": ["RLHF"], "categories": ["research"]},
+    "prompt engineering": {"patterns": [r"prompt\s*engineering"], "categories": ["research"]},
+    "multimodal": {"patterns": ["multimodal"], "categories": ["research"]},
+    "alignment": {"patterns": ["alignment"], "categories": ["research"]},
+    "reasoning": {"patterns": ["reasoning"], "categories": ["research"]},
+    "agents": {"patterns": ["agents?"], "categories": ["research"]},
+    "transformers": {"patterns": ["transformers?"], "categories": ["research"]},
+    "embeddings": {"patterns": ["embeddings?"], "categories": ["research"]},
+    # Herramientas
+    "LangChain": {"patterns": ["LangChain"], "categories": ["tools"]},
+    "LlamaIndex": {"patterns": ["LlamaIndex"], "categories": ["tools"]},
+    "Ollama": {"patterns": ["Ollama"], "categories": ["tools"]},
+    "AutoGPT": {"patterns": ["AutoGPT"], "categories": ["tools"]},
+    "Cursor": {"patterns": ["Cursor"], "categories": ["tools"]},
+    "Copilot": {"patterns": ["Copilot"], "categories": ["tools"]},
+    "Pinecone": {"patterns": ["Pinecone"], "categories": ["tools"]},
+    "Weaviate": {"patterns": ["Weaviate"], "categories": ["tools"]},
+    "Chroma": {"patterns": ["Chroma"], "categories": ["tools"]},
+    "FAISS": {"patterns": ["FAISS"], "categories": ["tools"]},
+}
+
+
+class EntityMatcher:
+    """
+    Compila el diccionario en una regex con un grupo nombrado por entidad;
+    m.lastgroup identifica la entidad en O(1) por match.
+    """
+
+    def __init__(self, entities: Dict[str, Dict[str, Any]], ignore_case: bool = True,
+                 word_boundary: bool = True):
+        self.entities = entities
+        self._group_to_name: Dict[str, str] = {}
+        self._dynamic = set()
+        self._key_categories: Dict[str, List[str]] = {}
+        self.categories: Dict[str, List[str]] = {}
+        alternatives = []
+        first_chars = set()
+        # Patrones más largos primero: "Stable Diffusion" antes que "Stable"
+        for i, (name, spec) in enumerate(sorted(entities.items(), key=lambda kv: -max(len(p) for p in kv[1]["patterns"]))):
+            group = f"e{i}"
+            self._group_to_name[group] = name
+            if spec.get("dynamic"):
+                self._dynamic.add(name)
+            for cat in spec.get("categories", []):
+                self.categories.setdefault(cat, []).append(name)
+            alternatives.append(f"(?P<{group}>{'|'.join(spec['patterns'])})")
+            for p in spec["patterns"]:
+                first_chars.add(p[0].lower() if p[:1].isalnum() else None)
+        body = "|".join(alternatives)
+        # Prefiltro por primer carácter: la mayoría de las posiciones se
+        # descartan sin probar las N alternativas (~2x más rápido)
+        if first_chars and None not in first_chars:
+            chars = "".join(sorted(first_chars))
+            body = f"(?=[{chars}{chars.upper() if ignore_case else ''}])(?:{body})"
+        pattern = rf"\b(?:{body})\b" if word_boundary else body
+        self._regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+    def iter_entities(self, text: str) -> Iterator[str]:
+        """Claves de entidad en orden de aparición (dinámicas: texto normalizado)"""
+        for m in self._regex.finditer(text or ""):
+            name = self._group_to_name[m.lastgroup]
+            if name in self._dynamic:
+                yield " ".join(m.group().lower().split())
+            else:
+                yield name
+
+    def count(self, text: str) -> Counter:
+        return Counter(self.iter_entities(text))
+
+    def scan(self, documents: Iterable[str]) -> Dict[str, Any]:
+        """
+        Recorre los documentos uno a uno (acepta generadores).
+
+        Returns:
+            {'per_document': [Counter, ...], 'mentions': Counter, 'documents': Counter}
+        """
+        per_document = []
+        mentions: Counter = Counter()
+        doc_freq: Counter = Counter()
+        for doc in documents:
+            counts = self.count(doc)
+            per_document.append(counts)
+            mentions.update(counts)
+            doc_freq.update(counts.keys())
+        return {"per_document": per_document, "mentions": mentions, "documents": doc_freq}
+
+    def category_of(self, key: str) -> List[str]:
+        """Categorías de una clave (las dinámicas heredan las de su entidad)"""
+        cats = self._key_categories.get(key)
+        if cats is None:
+            cats = []
+            if key in self.entities:
+                cats = list(self.entities[key].get("categories", []))
+            else:
+                for name in self._dynamic:
+                    if any(re.fullmatch(p, key, re.IGNORECASE) for p in self.entities[name]["patterns"]):
+                        cats = list(self.entities[name].get("categories", []))
+                        break
+            self._key_categories[key] = cats
+        return cats
+
+    def by_category(self, counts: Counter) -> Dict[str, Counter]:
+        """Reparte un Counter por categoría; una entidad suma en todas las suyas"""
+        out: Dict[str, Counter] = {cat: Counter() for cat in self.categories}
+        for key, n in counts.items():
+            for cat in self.category_of(key):
+                out[cat][key] += n
+        return out
+
+
+def load_entities(path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Diccionario por defecto + el JSON de ENTITY_DICTIONARY_PATH (si existe)"""
+    entities = dict(DEFAULT_ENTITIES)
+    path = path or ENTITY_DICTIONARY_PATH
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            entities.update(json.load(f))
+    return entities
+
+
+_default: Optional[EntityMatcher] = None
+
+
+def default_matcher() -> EntityMatcher:
+    """Matcher compartido con el diccionario configurado (se compila una vez)"""
+    global _default
+    if _default is None:
+        _default = EntityMatcher(load_entities())
+    return _default
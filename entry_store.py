@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Índice persistente de entradas ya vistas (RSS y artículos web)
+- Clave estable por fuente + GUID/link (hash corto)
+- Guarda first_seen, el post ya procesado y si pasó por el digest
+- Permite ingestión incremental: cada corrida procesa solo lo nuevo y
+  fusiona con la ventana guardada
+- Guardado bajo file_lock: el digest y el servidor escriben el mismo
+  archivo; si otro proceso guardó desde la carga se fusiona su versión
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import file_lock
+
+ENTRY_STORE_PATH = os.getenv("ENTRY_STORE_PATH", os.path.join("content_history", "entries.json"))
+ENTRY_RETENTION_DAYS = int(os.getenv("ENTRY_RETENTION_DAYS", "14"))
+
+
+def entry_key(source: str, guid: str) -> str:
+    """Clave de una entrada: hash de la fuente (URL del feed o 'web') + GUID/link"""
+    return hashlib.sha1(f"{source}|{guid}".encode("utf-8")).hexdigest()[:20]
+
+
+class EntryStore:
+    """
+    Almacén JSON de entradas:
+        {key: {'source', 'first_seen', 'processed', 'post'}}
+    """
+
+    def __init__(self, path: str = ENTRY_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = file_lock.stamp(self.path)
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    @staticmethod
+    def _merge(disk: Dict[str, Dict[str, Any]], ours: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Unión de dos versiones (la primera vez vista gana; procesada si lo está en alguna)"""
+        for key, rec in ours.items():
+            other = disk.get(key)
+            if other is None:
+                disk[key] = rec
+                continue
+            other["first_seen"] = min(filter(None, (other.get("first_seen"), rec.get("first_seen"))), default="")
+            other["processed"] = bool(other.get("processed") or rec.get("processed"))
+        return disk
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def add(self, key: str, source: str, post: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra una entrada nueva (si ya existe, devuelve la guardada)"""
+        with self._lock:
+            rec = self._entries.get(key)
+            if rec is None:
+                rec = self._entries[key] = {
+                    "source": source,
+                    "first_seen": datetime.now().isoformat(),
+                    "processed": False,
+                    "post": dict(post, entry_key=key),
+                }
+                self._dirty = True
+            return rec
+
+    def window(self, since: datetime, sources: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Posts publicados desde `since` (opcionalmente solo de ciertas fuentes)"""
+        since_iso = since.isoformat()
+        allowed = set(sources) if sources is not None else None
+        return [
+            rec["post"] for rec in list(self._entries.values())
+            if (allowed is None or rec["source"] in allowed)
+            and (rec["post"].get("published") or rec["first_seen"]) >= since_iso
+        ]
+
+    def is_processed(self, key: str) -> bool:
+        rec = self._entries.get(key)
+        return bool(rec and rec.get("processed"))
+
+    def mark_processed(self, keys: Iterable[str]) -> int:
+        n = 0
+        with self._lock:
+            for key in keys:
+                rec = self._entries.get(key)
+                if rec and not rec.get("processed"):
+                    rec["processed"] = True
+                    n += 1
+            if n:
+                self._dirty = True
+        return n
+
+    def save(self) -> None:
+        """
+        Poda entradas más viejas que la retención y escribe de forma atómica.
+        Bajo lock de archivo: si otro proceso guardó desde nuestra última
+        lectura, se fusiona su versión antes de escribir.
+        """
+        with self._lock:
+            cutoff = (datetime.now() - timedelta(days=ENTRY_RETENTION_DAYS)).isoformat()
+            before = len(self._entries)
+            self._entries = {k: v for k, v in self._entries.items() if v.get("first_seen", "") >= cutoff}
+            if not self._dirty and len(self._entries) == before:
+                return
+            with file_lock.locked(self.path):
+                if file_lock.stamp(self.path) != self._stamp:
+                    self._entries = self._merge(self._load(), self._entries)
+                    self._entries = {k: v for k, v in self._entries.items() if v.get("first_seen", "") >= cutoff}
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+                self._stamp = file_lock.stamp(self.path)
+            self._dirty = False
+
+
+def mark_processed(posts: Iterable[Dict[str, Any]], path: str = ENTRY_STORE_PATH) -> int:
+    """Marca como procesados los posts (con 'entry_key') que ya pasaron por el digest"""
+    keys = [p["entry_key"] for p in posts if p.get("entry_key")]
+    if not keys:
+        return 0
+    store = EntryStore(path)
+    n = store.mark_processed(keys)
+    store.save()
+    return n
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de extracción de texto (trafilatura) en un pool de procesos
+- trafilatura.extract es CPU (lxml): en hilos se serializa por el GIL
+- Interfaz bytes -> texto; los workers quedan vivos y con trafilatura importado
+- Tope de tamaño por documento (EXTRACT_MAX_BYTES)
+- EXTRACT_WORKERS=0 desactiva el pool y extrae en el hilo que llama
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Union
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_MAX_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", str(2 * 1024 * 1024)))
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "30"))
+# Método de arranque de los workers. El pool se crea desde hilos de un proceso
+# ya multihilo (sesión HTTP, MCP, pipeline): fork heredaría locks tomados y
+# podría colgar a los hijos, así que por defecto forkserver (spawn si no existe)
+EXTRACT_START_METHOD = os.getenv("EXTRACT_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+Html = Union[bytes, str]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker() -> None:
+    # Import en el arranque del worker: la primera extracción ya no lo paga
+    import trafilatura  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _extract(html: bytes, favor_recall: bool, include_tables: bool) -> str:
+    import trafilatura
+
+    text = trafilatura.extract(
+        html,
+        include_comments=False,
+        include_tables=include_tables,
+        favor_recall=favor_recall
+    ) or ""
+    return text.strip()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            ctx = multiprocessing.get_context(EXTRACT_START_METHOD)
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS, mp_context=ctx, initializer=_init_worker
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def shutdown() -> None:
+    """Cierra los workers (se llama también al salir del intérprete)"""
+    _reset_pool()
+
+
+atexit.register(shutdown)
+
+
+def warm() -> int:
+    """Arranca todos los workers por adelantado; devuelve cuántos respondieron"""
+    if EXTRACT_WORKERS <= 0:
+        return 0
+    pool = _get_pool()
+    pids = {f.result() for f in [pool.submit(_ping) for _ in range(EXTRACT_WORKERS * 2)]}
+    return len(pids)
+
+
+def _prepare(html: Html) -> bytes:
+    data = html.encode("utf-8", "ignore") if isinstance(html, str) else (html or b"")
+    # Tope de tamaño: lo que exceda no llega a lxml
+    return data[:EXTRACT_MAX_BYTES]
+
+
+def extract_text(html: Html, favor_recall: bool = False, include_tables: bool = False,
+                 timeout: float = EXTRACT_TIMEOUT) -> str:
+    """
+    Extrae el texto principal de un documento HTML.
+
+    Args:
+        html: HTML crudo (bytes o str)
+        favor_recall: Preferir recall a precisión (trafilatura)
+        include_tables: Incluir tablas en el texto
+        timeout: Espera máxima por el resultado (segundos)
+
+    Returns:
+        Texto extraído ('' si no hay contenido o la extracción falla)
+    """
+    data = _prepare(html)
+    if not data:
+        return ""
+    if EXTRACT_WORKERS <= 0:
+        return _extract(data, favor_recall, include_tables)
+    try:
+        return _get_pool().submit(_extract, data, favor_recall, include_tables).result(timeout=timeout)
+    except BrokenProcessPool:
+        # Un worker murió (p.ej. OOM en lxml): se recrea el pool y se extrae aquí
+        _reset_pool()
+        return _extract(data, favor_recall, include_tables)
+    except FuturesTimeout:
+        return ""
+
+
+def extract_many(docs: List[Html], favor_recall: bool = False, include_tables: bool = False,
+                 timeout: float = EXTRACT_TIMEOUT) -> List[str]:
+    """Extrae varios documentos en paralelo; respeta el orden de entrada"""
+    if EXTRACT_WORKERS <= 0:
+        return [extract_text(d, favor_recall, include_tables) for d in docs]
+    pool = _get_pool()
+    futures = [pool.submit(_extract, _prepare(d), favor_recall, include_tables) for d in docs]
+    out = []
+    for fut in futures:
+        try:
+            out.append(fut.result(timeout=timeout))
+        except BrokenProcessPool:
+            _reset_pool()
+            out.append("")
+        except Exception:
+            out.append("")
+    return out
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Descarga concurrente de feeds RSS/Atom
+- Pool de hilos; conexiones, límite por host y ritmo vía http_client
+- Timeout explícito por feed (total, no solo por lectura) y deadline global
+- Devuelve bytes: el parseo (feedparser) se hace sobre lo descargado
+- GET condicional (ETag / Last-Modified): en 304 se reutiliza el parseo
+  guardado y se contabilizan los bytes ahorrados
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+FEED_MAX_WORKERS = int(os.getenv("FEED_MAX_WORKERS", "12"))
+FEED_TIMEOUT = float(os.getenv("FEED_TIMEOUT", "10"))
+FEED_DEADLINE = float(os.getenv("FEED_DEADLINE", "30"))
+FEED_MAX_BYTES = int(os.getenv("FEED_MAX_BYTES", str(5 * 1024 * 1024)))
+
+FEED_CACHE_DIR = os.getenv("FEED_CACHE_DIR", os.path.join("cache", "feeds"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; ai-agent-starter/0.2; feed reader)"
+
+
+def download(url: str, timeout: float = FEED_TIMEOUT, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Descarga una URL respetando los límites por dominio de http_client. El
+    timeout cubre la descarga completa (conexión + cuerpo), no solo cada lectura.
+
+    Returns:
+        {'ok', 'url', 'status', 'content': bytes, 'headers': dict,
+         'elapsed': float, 'error': str}
+    """
+    import http_client
+
+    req_headers = {"User-Agent": USER_AGENT}
+    req_headers.update(headers or {})
+    start = time.monotonic()
+    try:
+        r = http_client.get(url, headers=req_headers, timeout=(min(5.0, timeout), timeout),
+                            max_bytes=FEED_MAX_BYTES, retries=1)
+        ok = r.status_code < 400 or r.status_code == 304
+        return {
+            "ok": ok,
+            "url": url,
+            "status": r.status_code,
+            "content": r.content,
+            "headers": dict(r.headers),
+            "elapsed": time.monotonic() - start,
+            "error": "" if ok else f"HTTP {r.status_code}",
+        }
+    except Exception as e:
+        return {
+            "ok": False, "url": url, "status": None, "content": b"", "headers": {},
+            "elapsed": time.monotonic() - start, "error": str(e),
+        }
+
+
+def fetch_many(
+    urls: List[str],
+    timeout: float = FEED_TIMEOUT,
+    deadline: float = FEED_DEADLINE,
+    headers_for: Optional[Dict[str, Dict[str, str]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Descarga varios feeds en paralelo. El tiempo total queda acotado por el
+    feed más lento (y por `deadline`), no por la suma.
+
+    Args:
+        urls: URLs de los feeds
+        timeout: Timeout por feed (segundos)
+        deadline: Tiempo máximo total; lo que no termine se marca como error
+        headers_for: Headers extra por URL (p.ej. validadores de cache)
+
+    Returns:
+        {url: resultado de download()}
+    """
+    headers_for = headers_for or {}
+    results: Dict[str, Dict[str, Any]] = {}
+    if not urls:
+        return results
+
+    pool = ThreadPoolExecutor(max_workers=min(FEED_MAX_WORKERS, len(urls)), thread_name_prefix="feed")
+    futures = {pool.submit(download, u, timeout, headers_for.get(u)): u for u in urls}
+    try:
+        for fut in as_completed(futures, timeout=deadline):
+            results[futures[fut]] = fut.result()
+    except FuturesTimeout:
+        for fut, u in futures.items():
+            if u not in results:
+                fut.cancel()
+                results[u] = {
+                    "ok": False, "url": u, "status": None, "content": b"", "headers": {},
+                    "elapsed": deadline, "error": f"deadline global de {deadline:.0f}s superado",
+                }
+    finally:
+        # No esperamos a los rezagados: el hilo termina solo al vencer su timeout
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+# ---------- Cache de feeds con validadores HTTP ----------
+
+def _feed_cache_path(url: str) -> str:
+    return os.path.join(FEED_CACHE_DIR, hashlib.md5(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def load_cached_feed(url: str) -> Optional[Dict[str, Any]]:
+    """
+    Lee la entrada de cache de un feed:
+        {'url', 'etag', 'last_modified', 'sha1', 'body_bytes', 'entries', 'fetched_at'}
+    """
+    try:
+        with open(_feed_cache_path(url), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def save_cached_feed(url: str, record: Dict[str, Any]) -> None:
+    """Escritura atómica (tmp + replace) para no dejar JSON a medias"""
+    try:
+        os.makedirs(FEED_CACHE_DIR, exist_ok=True)
+        path = _feed_cache_path(url)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Warning: Could not cache feed {url}: {e}")
+
+
+def conditional_headers(cached: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Headers If-None-Match / If-Modified-Since a partir de la cache"""
+    headers = {}
+    if cached and cached.get("entries") is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+
+def fetch_feeds_cached(
+    urls: List[str],
+    parse: Callable[[bytes], List[Dict[str, Any]]],
+    timeout: float = FEED_TIMEOUT,
+    deadline: float = FEED_DEADLINE,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Descarga feeds con GET condicional y devuelve sus entradas ya parseadas.
+
+    Args:
+        urls: URLs de los feeds
+        parse: Función bytes -> lista de entradas JSON-serializables
+        timeout: Timeout por feed
+        deadline: Tiempo máximo total
+
+    Returns:
+        {url: {'ok', 'entries', 'from_cache', 'status', 'bytes_downloaded',
+               'bytes_saved', 'elapsed', 'error'}}
+    """
+    cached = {u: load_cached_feed(u) for u in urls}
+    downloads = fetch_many(
+        urls, timeout=timeout, deadline=deadline,
+        headers_for={u: conditional_headers(c) for u, c in cached.items()},
+    )
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for url in urls:
+        dl = downloads.get(url) or {"ok": False, "status": None, "content": b"", "headers": {},
+                                    "elapsed": 0.0, "error": "no descargado"}
+        prev = cached.get(url)
+        res = {
+            "ok": False, "entries": [], "from_cache": False, "status": dl.get("status"),
+            "bytes_downloaded": len(dl.get("content") or b""), "bytes_saved": 0,
+            "elapsed": dl.get("elapsed", 0.0), "error": dl.get("error", ""),
+        }
+        try:
+            if dl["ok"] and dl["status"] == 304 and prev:
+                # Sin cambios: parseo guardado, cero bytes de cuerpo
+                res.update(ok=True, entries=prev["entries"], from_cache=True,
+                           bytes_saved=prev.get("body_bytes", 0), error="")
+            elif dl["ok"]:
+                content = dl["content"]
+                sha1 = hashlib.sha1(content).hexdigest()
+                if prev and prev.get("sha1") == sha1:
+                    # Servidor sin validadores pero cuerpo idéntico: no re-parsear
+                    entries = prev["entries"]
+                    res["from_cache"] = True
+                else:
+                    entries = parse(content)
+                headers = {k.lower(): v for k, v in (dl.get("headers") or {}).items()}
+                save_cached_feed(url, {
+                    "url": url,
+                    "etag": headers.get("etag"),
+                    "last_modified": headers.get("last-modified"),
+                    "sha1": sha1,
+                    "body_bytes": len(content),
+                    "entries": entries,
+                    "fetched_at": datetime.now().isoformat(),
+                })
+                res.update(ok=True, entries=entries, error="")
+        except Exception as e:
+            res.update(ok=False, entries=[], error=f"parse error: {e}")
+        out[url] = res
+    return out
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Lock de archivo entre procesos para los índices compartidos en disco
+- El servidor, el MCP, el digest y el poller guardan los mismos archivos
+  (text_index.bin, url_index.json, domain_health.json): cada guardado toma
+  el lock, relee lo que otro proceso escribió, fusiona y reemplaza
+- fcntl.flock exclusivo sobre <ruta>.lock (el archivo de datos se reemplaza
+  con os.replace, así que el lock no puede ir sobre él)
+- Sin fcntl (Windows) el lock no hace nada: la fusión por stamp sigue
+  evitando perder escrituras salvo en guardados simultáneos
+"""
+
+import contextlib
+import os
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextlib.contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Sección crítica entre procesos para guardar `path`"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    """Identidad de la versión en disco (cambia con cada os.replace); None si no existe"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartido para todo el tráfico saliente
+- Session con pool de conexiones keep-alive (requests + HTTPAdapter)
+- Por dominio: tope de conexiones simultáneas y token bucket (requests/s)
+- Reintentos con backoff exponencial y jitter (errores de red, 429, 5xx),
+  respetando Retry-After
+- Tope de tamaño de respuesta y timeout total (conexión + cuerpo)
+- Estadísticas de latencia por dominio (domain_stats y /metrics)
+
+Límites por defecto vía env (HTTP_*) y por dominio con HTTP_DOMAIN_LIMITS:
+    HTTP_DOMAIN_LIMITS='{"duckduckgo.com": {"concurrency": 1, "rate": 1, "burst": 1}}'
+"""
+
+import json as _json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import metrics
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "25"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+HTTP_PER_DOMAIN = int(os.getenv("HTTP_PER_DOMAIN", "4"))
+HTTP_RATE = float(os.getenv("HTTP_RATE", "4"))      # tokens/segundo por dominio
+HTTP_BURST = float(os.getenv("HTTP_BURST", "4"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HTTP_MAX_BACKOFF = float(os.getenv("HTTP_MAX_BACKOFF", "10"))
+HTTP_MAX_BYTES = int(os.getenv("HTTP_MAX_BYTES", str(10 * 1024 * 1024)))
+
+USER_AGENT = "Mozilla/5.0 (compatible; ai-agent-starter/0.2)"
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class HTTPError(IOError):
+    """Error HTTP (status >= 400, respuesta demasiado grande o timeout total)"""
+
+    def __init__(self, message: str, response: Optional["Response"] = None):
+        super().__init__(message)
+        self.response = response
+
+
+class Response:
+    """Respuesta ya leída (cuerpo completo en memoria, con tope de tamaño)"""
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes,
+                 encoding: Optional[str], elapsed: float):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return _json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise HTTPError(f"HTTP {self.status_code} para {self.url}", response=self)
+
+
+# ---------- Límites por dominio ----------
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Domain:
+    def __init__(self, name: str, concurrency: int, rate: float, burst: float):
+        self.name = name
+        self.sem = threading.BoundedSemaphore(max(1, concurrency))
+        self.bucket = _TokenBucket(rate, burst)
+        self.limits = {"concurrency": max(1, concurrency), "rate": rate, "burst": burst}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.latencies: deque = deque(maxlen=512)
+
+    def record(self, seconds: float, status: Optional[int]) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(seconds)
+            if status is None or status >= 400:
+                self.errors += 1
+        metrics.HTTP_REQUESTS.inc(domain=self.name, status=str(status) if status else "error")
+        metrics.HTTP_SECONDS.observe(seconds, domain=self.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self.latencies)
+            n = len(lat)
+
+            def pct(p):
+                return round(lat[min(n - 1, int(p / 100.0 * n))] * 1000, 1) if n else 0.0
+
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "in_flight": self.in_flight,
+                "p50_ms": pct(50),
+                "p95_ms": pct(95),
+                "mean_ms": round(sum(lat) / n * 1000, 1) if n else 0.0,
+                "limits": dict(self.limits),
+            }
+
+
+# Límites por defecto de servicios conocidos (HTTP_DOMAIN_LIMITS los pisa)
+_DEFAULT_DOMAIN_LIMITS = {
+    "duckduckgo.com": {"concurrency": 2, "rate": 2, "burst": 1},
+    "api.openai.com": {"concurrency": 16, "rate": 0},
+    "localhost": {"concurrency": 16, "rate": 0},
+    "127.0.0.1": {"concurrency": 16, "rate": 0},
+}
+
+
+def _load_overrides() -> Dict[str, Dict[str, float]]:
+    overrides = {k: dict(v) for k, v in _DEFAULT_DOMAIN_LIMITS.items()}
+    try:
+        overrides.update(_json.loads(os.getenv("HTTP_DOMAIN_LIMITS", "") or "{}"))
+    except ValueError:
+        pass
+    return overrides
+
+
+_OVERRIDES = _load_overrides()
+_DOMAINS: Dict[str, _Domain] = {}
+_DOMAINS_LOCK = threading.Lock()
+
+
+def _host(url_or_host: str) -> str:
+    if "://" in url_or_host:
+        url_or_host = urlparse(url_or_host).netloc
+    host = url_or_host.lower().split("@")[-1].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def _domain(url_or_host: str) -> _Domain:
+    host = _host(url_or_host)
+    with _DOMAINS_LOCK:
+        dom = _DOMAINS.get(host)
+        if dom is None:
+            conf = _OVERRIDES.get(host, {})
+            dom = _DOMAINS[host] = _Domain(
+                host,
+                int(conf.get("concurrency", HTTP_PER_DOMAIN)),
+                float(conf.get("rate", HTTP_RATE)),
+                float(conf.get("burst", HTTP_BURST)),
+            )
+        return dom
+
+
+def configure_domain(host: str, concurrency: Optional[int] = None,
+                     rate: Optional[float] = None, burst: Optional[float] = None) -> None:
+    """Fija límites para un dominio (sustituye los vigentes)"""
+    host = _host(host)
+    conf = dict(_OVERRIDES.get(host, {}))
+    for key, value in (("concurrency", concurrency), ("rate", rate), ("burst", burst)):
+        if value is not None:
+            conf[key] = value
+    _OVERRIDES[host] = conf
+    with _DOMAINS_LOCK:
+        _DOMAINS.pop(host, None)
+
+
+@contextmanager
+def limit(url_or_host: str) -> Iterator[None]:
+    """
+    Reserva un slot del dominio (concurrencia + token). Sirve también para
+    clientes que no pasan por este módulo (p.ej. DDGS).
+    """
+    dom = _domain(url_or_host)
+    dom.sem.acquire()
+    try:
+        dom.bucket.acquire()
+        with dom._lock:
+            dom.in_flight += 1
+        yield
+    finally:
+        with dom._lock:
+            dom.in_flight -= 1
+        dom.sem.release()
+
+
+def domain_stats() -> Dict[str, Dict[str, Any]]:
+    """{dominio: {'requests', 'errors', 'retries', 'in_flight', 'p50_ms', 'p95_ms', 'mean_ms', 'limits'}}"""
+    with _DOMAINS_LOCK:
+        domains = list(_DOMAINS.values())
+    return {d.name: d.snapshot() for d in domains}
+
+
+# ---------- Session compartida ----------
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """Session keep-alive compartida (se crea en el primer uso)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers["User-Agent"] = USER_AGENT
+            _session = s
+        return _session
+
+
+def _backoff(attempt: int, retry_after: Optional[str]) -> float:
+    if retry_after:
+        try:
+            return min(HTTP_MAX_BACKOFF, float(retry_after))
+        except ValueError:
+            pass
+    base = min(HTTP_MAX_BACKOFF, HTTP_BACKOFF * (2 ** attempt))
+    return base * random.uniform(0.5, 1.5)
+
+
+def _send(dom: _Domain, method: str, url: str, timeout: Timeout, max_bytes: int, **kwargs) -> Response:
+    if isinstance(timeout, tuple):
+        connect, total = timeout
+    else:
+        connect, total = min(HTTP_CONNECT_TIMEOUT, timeout), timeout
+    start = time.monotonic()
+    status = None
+    try:
+        with _get_session().request(method, url, timeout=(connect, total), stream=True, **kwargs) as r:
+            status = r.status_code
+            chunks, size = [], 0
+            for chunk in r.iter_content(chunk_size=65536):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPError(f"respuesta demasiado grande (> {max_bytes} bytes): {url}")
+                if time.monotonic() - start > total:
+                    raise TimeoutError(f"timeout de {total:.0f}s descargando {url}")
+            return Response(r.url, r.status_code, r.headers, b"".join(chunks), r.encoding,
+                            time.monotonic() - start)
+    except Exception:
+        status = None
+        raise
+    finally:
+        dom.record(time.monotonic() - start, status)
+
+
+def request(method: str, url: str, timeout: Timeout = HTTP_TIMEOUT, retries: int = HTTP_RETRIES,
+            max_bytes: int = HTTP_MAX_BYTES, **kwargs) -> Response:
+    """
+    Request con límites del dominio, reintentos y tope de tamaño.
+
+    Args:
+        method: 'GET', 'POST', ...
+        url: URL destino
+        timeout: Timeout total en segundos (o tupla (conexión, total))
+        retries: Reintentos ante errores de red, 429 y 5xx
+        max_bytes: Tope del cuerpo de la respuesta
+        **kwargs: headers, params, json, data (como requests)
+
+    Returns:
+        Response (no lanza por status; usar raise_for_status())
+    """
+    import requests
+
+    dom = _domain(url)
+    attempt = 0
+    while True:
+        resp, error = None, None
+        with limit(url):
+            try:
+                resp = _send(dom, method, url, timeout, max_bytes, **kwargs)
+            except (requests.ConnectionError, requests.Timeout, TimeoutError) as e:
+                error = e
+        if attempt >= retries or (resp is not None and resp.status_code not in RETRY_STATUSES):
+            if error is not None:
+                raise error
+            return resp
+        with dom._lock:
+            dom.retries += 1
+        metrics.HTTP_RETRIES.inc(domain=dom.name)
+        # El backoff se duerme fuera del slot del dominio
+        time.sleep(_backoff(attempt, resp.headers.get("Retry-After") if resp is not None else None))
+        attempt += 1
+
+
+def get(url: str, **kwargs) -> Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> Response:
+    return request("POST", url, **kwargs)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Recuperación híbrida para el RAG (léxica + vectorial)
+- Mismos ids de chunk en ambos índices: la posición de la línea en el JSONL
+  del RAG (el archivo es solo-append)
+- BM25 (text_index) y coseno sobre el almacén cuantizado (vector_store)
+  corren en paralelo: el léxico es local y se resuelve mientras se calcula
+  el embedding de la query
+- Fusión por Reciprocal Rank Fusion con pesos por rama
+- Re-scoring barato opcional: cobertura de términos de la query y
+  coincidencia literal de nombres/versiones ("GPT-4o", "Llama 3.1")
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "hybrid")  # hybrid | dense | lexical
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+RAG_DENSE_WEIGHT = float(os.getenv("RAG_DENSE_WEIGHT", "1.0"))
+RAG_LEXICAL_WEIGHT = float(os.getenv("RAG_LEXICAL_WEIGHT", "1.0"))
+# En unidades de RRF (1/(60+1) ~ 0.016): 0.01 reordena empates cercanos sin tapar la fusión
+RAG_RESCORE_WEIGHT = float(os.getenv("RAG_RESCORE_WEIGHT", "0.01"))
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "30"))
+
+MODES = ("hybrid", "dense", "lexical")
+
+# Nombres de modelo y versiones: llevan dígitos o guiones ("gpt-4o", "3.1")
+_EXACT = re.compile(r"[A-Za-z]*\d[\w.\-]*|[A-Za-z]+-[\w.\-]+")
+
+_lexical: Dict[str, Any] = {}
+_lexical_lock = threading.Lock()
+
+
+def lexical_index(rag_path: str, items: Sequence[Dict[str, Any]]):
+    """
+    Índice BM25 de los chunks del RAG (junto al JSONL), sincronizado de forma
+    incremental: solo se agregan las líneas que todavía no tiene.
+    """
+    import text_index
+
+    with _lexical_lock:
+        idx = _lexical.get(rag_path)
+        if idx is None:
+            idx = _lexical[rag_path] = text_index.TextIndex(rag_path + ".bm25", retention_days=0)
+        # JSONL reescrito (recortado o editado a mano): las posiciones ya no coinciden
+        last = idx.by_key.get(str(len(items) - 1))
+        if len(idx) > len(items) or (last is not None and idx.docs[last]["url"] != items[-1].get("id", "")):
+            try:
+                os.remove(idx.path)
+            except OSError:
+                pass
+            idx = _lexical[rag_path] = text_index.TextIndex(rag_path + ".bm25", retention_days=0)
+        # Sincronizar y guardar con el lock: rag_search corre en varios hilos (MCP)
+        added = 0
+        for i, it in enumerate(items):
+            if str(i) not in idx.by_key:
+                idx.add(it.get("id", ""), "", it.get("text", ""), "rag", key=str(i))
+                added += 1
+        if added:
+            idx.save()
+    return idx
+
+
+def dense_index(rag_path: str, items: Sequence[Dict[str, Any]], embedder):
+    """
+    Almacén de vectores de los chunks del RAG para la firma de `embedder`
+    (junto al JSONL). Sincroniza lo que falte: embeddings en línea del JSONL
+    con la misma firma, o re-embebido del texto si el proveedor es local.
+    """
+    import embeddings
+    import vector_store
+
+    base = rag_path + ".vec"
+    store = vector_store.open_store(base, embedder.signature)
+    # Filas de posiciones >= len(items) (JSONL recortado, o una línea escrita
+    # después de leer `items`) no se borran aquí: search() las ignora y las
+    # limpia el camino de escritura (tools.rag_upsert_url, con su lock)
+    inline, todo = [], []
+    for i, it in enumerate(items):
+        if str(i) in store:
+            continue
+        if it.get("embedding") and embeddings.signature_of(it) == embedder.signature:
+            inline.append(i)
+        elif embedder.local:
+            todo.append(i)
+    if inline:
+        store.add([str(i) for i in inline], [items[i]["embedding"] for i in inline])
+    if todo:
+        store.add([str(i) for i in todo], embedder.embed([items[i].get("text", "") for i in todo]))
+    if inline or todo:
+        store.save()
+    return store
+
+
+def dense_ranking(query_vec: Sequence[float], items: Sequence[Dict[str, Any]], n: int) -> List[Tuple[int, float]]:
+    """Top-n (posición, coseno) con una sola multiplicación matriz-vector"""
+    import numpy as np
+
+    if not items:
+        return []
+    q = np.asarray(query_vec, dtype=np.float32)
+    # Sin vector o de otra dimensión (otro proveedor): fila en cero
+    matrix = np.zeros((len(items), q.shape[0]), dtype=np.float32)
+    for i, it in enumerate(items):
+        vec = it.get("embedding")
+        if vec is not None and len(vec) == q.shape[0]:
+            matrix[i] = vec
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(q) or 1.0)
+    scores = matrix @ q / np.where(norms == 0, 1.0, norms)
+    top = np.argsort(-scores, kind="stable")[:n]
+    return [(int(i), float(scores[i])) for i in top]
+
+
+def lexical_ranking(index, query: str, n: int) -> List[Tuple[int, float]]:
+    return [(int(r["key"]), r["score"]) for r in index.search(query, k=n)]
+
+
+def rrf(rankings: Sequence[Tuple[float, Sequence[int]]], k: int = RAG_RRF_K) -> Dict[int, float]:
+    """Reciprocal Rank Fusion: sum(peso / (k + rank)) sobre las listas"""
+    fused: Dict[int, float] = {}
+    for weight, ids in rankings:
+        for rank, doc in enumerate(ids, start=1):
+            fused[doc] = fused.get(doc, 0.0) + weight / (k + rank)
+    return fused
+
+
+def rescore(query: str, text: str) -> float:
+    """
+    Señal barata en [0, 1]: mitad cobertura de términos analizados de la
+    query, mitad coincidencia literal de nombres/versiones.
+    """
+    from text_index import analyze
+
+    terms = set(analyze(query))
+    if not terms:
+        return 0.0
+    doc_terms = set(analyze(text))
+    coverage = len(terms & doc_terms) / len(terms)
+    exact = [e.lower() for e in _EXACT.findall(query)]
+    if not exact:
+        return coverage
+    lower = text.lower()
+    literal = sum(1 for e in exact if e in lower) / len(exact)
+    return 0.5 * coverage + 0.5 * literal
+
+
+def search(query: str, items: Sequence[Dict[str, Any]], embed: Optional[Callable[[str], Sequence[float]]],
+           index=None, k: int = 3, mode: str = RAG_SEARCH_MODE, rescoring: bool = True,
+           dense_weight: float = RAG_DENSE_WEIGHT, lexical_weight: float = RAG_LEXICAL_WEIGHT,
+           candidates: int = RAG_CANDIDATES, rrf_k: int = RAG_RRF_K,
+           rescore_weight: float = RAG_RESCORE_WEIGHT, vectors=None) -> List[Dict[str, Any]]:
+    """
+    Búsqueda sobre los chunks del RAG.
+
+    Args:
+        query: Consulta
+        items: Chunks [{'id', 'text', 'embedding'}, ...] (posición = id de chunk)
+        embed: Función texto -> vector (None = sin rama densa)
+        index: TextIndex con claves str(posición) (lexical_index)
+        mode: 'hybrid' | 'dense' | 'lexical'
+        rescoring: Aplicar el re-scoring barato sobre los candidatos fusionados
+        vectors: VectorStore con claves str(posición) (dense_index); sin él
+            la rama densa usa el 'embedding' de cada item
+
+    Returns:
+        [{'id', 'chunk', 'score', 'text', 'dense_rank', 'lexical_rank'}, ...]
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode debe ser uno de {MODES}")
+    if mode == "hybrid" and (embed is None or index is None):
+        mode = "lexical" if embed is None else "dense"
+    n = max(candidates, k)
+
+    def _dense() -> List[Tuple[int, float]]:
+        if vectors is not None:
+            hits = [(int(key), score) for key, score in vectors.search(embed(query), k=n)]
+            return [(doc, score) for doc, score in hits if doc < len(items)]
+        return dense_ranking(embed(query), items, n)
+
+    dense: List[Tuple[int, float]] = []
+    lexical: List[Tuple[int, float]] = []
+    if mode == "hybrid":
+        # El embedding de la query (red) y BM25 (local) se solapan
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            fut = pool.submit(_dense)
+            lexical = lexical_ranking(index, query, n)
+            dense = fut.result()
+    elif mode == "dense":
+        dense = _dense()
+    else:
+        lexical = lexical_ranking(index, query, n)
+
+    dense_rank = {doc: r for r, (doc, _) in enumerate(dense, start=1)}
+    lexical_rank = {doc: r for r, (doc, _) in enumerate(lexical, start=1)}
+    if mode == "hybrid":
+        scores = rrf([(dense_weight, [d for d, _ in dense]), (lexical_weight, [d for d, _ in lexical])], k=rrf_k)
+    else:
+        ranking = dense or lexical
+        # Con re-scoring se pasa a escala RRF; sin él se conserva el score original
+        scores = rrf([(1.0, [d for d, _ in ranking])], k=rrf_k) if rescoring else dict(ranking)
+
+    if rescoring:
+        for doc in scores:
+            scores[doc] += rescore_weight * rescore(query, items[doc].get("text", ""))
+
+    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+    return [
+        {
+            "id": items[doc].get("id"),
+            "chunk": doc,
+            "score": round(score, 6),
+            "text": items[doc].get("text", "")[:500],
+            "dense_rank": dense_rank.get(doc),
+            "lexical_rank": lexical_rank.get(doc),
+        }
+        for doc, score in ranked
+    ]
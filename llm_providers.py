@@ -1,10 +1,32 @@
 import os
 import json
-import requests
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Tuple
+
+import metrics
 
 class BaseLLM:
+    provider = "base"
+    model: str = ""
+
     def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 800) -> str:
+        """Llama al proveedor y registra latencia/tokens en /metrics."""
+        start = time.perf_counter()
+        status = "error"
+        try:
+            text, usage = self._generate(messages, temperature, max_tokens)
+            status = "ok"
+        finally:
+            metrics.LLM_SECONDS.observe(time.perf_counter() - start, provider=self.provider, model=self.model)
+            metrics.LLM_REQUESTS.inc(provider=self.provider, model=self.model, status=status)
+        for kind in ("prompt", "completion"):
+            n = usage.get(kind)
+            if n:
+                metrics.LLM_TOKENS.inc(n, provider=self.provider, model=self.model, kind=kind)
+        return text
+
+    def _generate(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Tuple[str, Dict[str, int]]:
+        """Devuelve (texto, {'prompt': n, 'completion': n})."""
         raise NotImplementedError
 
 def _env_get(key: str, default: Optional[str] = None) -> Optional[str]:
@@ -12,13 +34,15 @@ def _env_get(key: str, default: Optional[str] = None) -> Optional[str]:
     return v if v and v.strip() else None
 
 class OpenAILLM(BaseLLM):
+    provider = "openai"
+
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         self.api_key = api_key or _env_get("OPENAI_API_KEY")
         self.model = model or _env_get("OPENAI_MODEL", "gpt-4o-mini")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY no configurada")
 
-    def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 800) -> str:
+    def _generate(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Tuple[str, Dict[str, int]]:
         url = "https://api.openai.com/v1/chat/completions"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -30,17 +54,24 @@ class OpenAILLM(BaseLLM):
             "temperature": temperature,
             "max_tokens": max_tokens,
         }
-        resp = requests.post(url, headers=headers, data=json.dumps(payload), timeout=60)
+        import http_client
+        resp = http_client.post(url, headers=headers, data=json.dumps(payload), timeout=60)
         resp.raise_for_status()
         data = resp.json()
-        return data["choices"][0]["message"]["content"]
+        usage = data.get("usage") or {}
+        return data["choices"][0]["message"]["content"], {
+            "prompt": usage.get("prompt_tokens", 0),
+            "completion": usage.get("completion_tokens", 0),
+        }
 
 class OllamaLLM(BaseLLM):
+    provider = "ollama"
+
     def __init__(self, host: Optional[str] = None, model: Optional[str] = None):
         self.host = host or _env_get("OLLAMA_HOST", "http://localhost:11434")
         self.model = model or _env_get("OLLAMA_MODEL", "llama3.1:8b")
 
-    def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 800) -> str:
+    def _generate(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Tuple[str, Dict[str, int]]:
         url = f"{self.host}/api/chat"
         payload = {
             "model": self.model,
@@ -50,14 +81,19 @@ class OllamaLLM(BaseLLM):
                 "num_predict": max_tokens
             }
         }
-        resp = requests.post(url, json=payload, timeout=120)
+        import http_client
+        resp = http_client.post(url, json=payload, timeout=120)
         resp.raise_for_status()
         data = resp.json()
+        usage = {
+            "prompt": data.get("prompt_eval_count", 0),
+            "completion": data.get("eval_count", 0),
+        }
         if "message" in data and "content" in data["message"]:
-            return data["message"]["content"]
+            return data["message"]["content"], usage
         if "messages" in data and data["messages"]:
-            return data["messages"][-1].get("content", "")
-        return ""
+            return data["messages"][-1].get("content", ""), usage
+        return "", usage
         
 def get_default_llm() -> BaseLLM:
     """Prioriza OpenAI si hay API key; si no, usa Ollama."""
@@ -1,5 +1,4 @@
 import argparse
-from agent import Agent
 
 def main():
     parser = argparse.ArgumentParser(description="AI Agent CLI")
@@ -7,6 +6,8 @@ def main():
     parser.add_argument("--max-steps", type=int, default=5, help="Máximo de iteraciones del agente")
     args = parser.parse_args()
 
+    # Import diferido: --help y errores de argumentos no cargan el agente
+    from agent import Agent
     agent = Agent(max_steps=args.max_steps)
     out = agent.run(args.task)
     print(out)
@@ -1,56 +1,165 @@
 #!/usr/bin/env python3
-import asyncio, json, sys
-from typing import Any, Dict
+import asyncio, json, os, sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 
 # Importa tus herramientas del proyecto (asegúrate de ejecutar desde la carpeta del proyecto)
 try:
-    from tools import (
-        memory_get,
-        memory_set,
-        rag_search,
-        rag_upsert_url,
-    )
+    from tools import TOOLS, call_tool
 except Exception as e:
     print(json.dumps({"ok": False, "error": f"cannot import tools: {e}"}))
     sys.exit(1)
 
+# Codec JSON: orjson si está instalado (mucho más rápido con payloads RAG grandes)
+try:
+    import orjson as _orjson
+except Exception:
+    _orjson = None
+
+
+def _loads(line: bytes) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(line)
+    return json.loads(line)
+
+
+def _dumps(obj: Any) -> bytes:
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj)
+        except TypeError:
+            pass  # tipos no soportados por orjson: cae a json con default=str
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+_JSON_ERRORS = (ValueError,) if _orjson is None else (ValueError, _orjson.JSONDecodeError)
+
+# Nombres históricos del servidor → herramientas de tools.TOOLS
+ALIASES = {
+    "memory.get": "memory_get",
+    "memory.set": "memory_set",
+    "rag.search": "rag_search",
+    "rag.upsert_url": "rag_upsert_url",
+}
+# Valores por defecto históricos de los alias (se aplican si el cliente no los pasa)
+ALIAS_DEFAULTS = {
+    "rag.search": {"k": 3},
+    "rag.upsert_url": {"max_chars": 6000},
+}
+# Herramientas en memoria: se responden en el event loop sin pasar por el pool
+_INLINE_TOOLS = {"memory_get", "memory_set"}
+
+# Handlers bloqueantes (red, embeddings) corren en un pool acotado;
+# MAX_INFLIGHT limita cuántas requests leídas pueden estar pendientes a la vez
+MAX_WORKERS = int(os.getenv("MCP_MAX_WORKERS", "8"))
+MAX_INFLIGHT = int(os.getenv("MCP_MAX_INFLIGHT", "64"))
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="mcp-worker")
+# Hilo dedicado a stdin: el pool de trabajo nunca bloquea la lectura
+_READER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-stdin")
+_WRITE_LOCK: Optional[asyncio.Lock] = None
+# Canal del protocolo (stdout binario); se fija en main()
+_OUT = None
+
+
+async def _blocking(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta una herramienta bloqueante en el pool sin frenar el event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXECUTOR, call_tool, tool_name, args)
+
+
+def list_tools() -> Dict[str, Any]:
+    """Catálogo completo: cada entrada de tools.TOOLS es un método"""
+    return {"ok": True, "data": {"tools": [
+        {"name": name, "description": TOOLS[name][0]} for name in sorted(TOOLS)
+    ], "aliases": ALIASES}, "error": ""}
+
+
 async def handle(req: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Router simple:
-      - method: nombre del método
-      - params: dict con argumentos
+    Router:
+      - method: nombre de una herramienta de tools.TOOLS (p.ej. 'web_search'),
+        un alias histórico ('rag.search', 'memory.get', ...) o 'tools.list'
+      - params: dict con argumentos de la herramienta
     Devuelve un dict JSON serializable.
     """
     method = req.get("method")
     params = req.get("params") or {}
 
-    if method == "memory.get":
-        return memory_get({"key": params.get("key")})
+    if method == "tools.list":
+        return list_tools()
+
+    tool_name = ALIASES.get(method, method)
+    if not isinstance(tool_name, str) or tool_name not in TOOLS:
+        return {"ok": False, "error": f"unknown method: {method}"}
+    if not isinstance(params, dict):
+        return {"ok": False, "error": "params must be an object"}
+    if method in ALIAS_DEFAULTS:
+        params = dict(ALIAS_DEFAULTS[method], **params)
+
+    if tool_name in _INLINE_TOOLS:
+        return call_tool(tool_name, params)
+    return await _blocking(tool_name, params)
+
+
+async def _write(res: Any) -> None:
+    """Escribe una respuesta completa por línea; el lock evita intercalar frames"""
+    data = _dumps(res) + b"\n"
+    async with _WRITE_LOCK:
+        _OUT.write(data)
+        _OUT.flush()
 
-    if method == "memory.set":
-        return memory_set({"key": params.get("key"), "value": params.get("value")})
 
-    if method == "rag.search":
-        return rag_search({"query": params.get("query"), "k": params.get("k", 3)})
+async def _answer(req: Any) -> Dict[str, Any]:
+    if not isinstance(req, dict):
+        return {"ok": False, "error": "request must be a JSON object"}
+    try:
+        res = await handle(req)
+    except Exception as e:
+        res = {"ok": False, "error": f"handler error: {e}"}
+    # El id permite al cliente casar respuestas que llegan fuera de orden
+    if "id" in req:
+        res = dict(res, id=req["id"])
+    return res
 
-    if method == "rag.upsert_url":
-        return rag_upsert_url({"url": params.get("url"), "max_chars": params.get("max_chars", 6000)})
 
-    return {"ok": False, "error": f"unknown method: {method}"}
+async def _process(req: Any) -> None:
+    if isinstance(req, list):
+        # Batch estilo JSON-RPC: todas las llamadas en paralelo, una sola respuesta
+        if not req:
+            await _write({"ok": False, "error": "empty batch"})
+            return
+        results: List[Dict[str, Any]] = await asyncio.gather(*(_answer(r) for r in req))
+        await _write(results)
+        return
+    await _write(await _answer(req))
+
 
 async def main() -> None:
     """
-    Bucle stdio:
-      - Lee 1 línea por stdin (JSON)
-      - Responde 1 línea por stdout (JSON)
+    Bucle stdio con pipelining:
+      - Lee 1 línea por stdin (JSON) y la despacha sin esperar la respuesta
+      - Una línea puede ser un array (batch): se ejecuta en paralelo y se
+        responde con un array en una sola línea
+      - Responde 1 línea por stdout (JSON) en cuanto termina, con el mismo "id"
+      - Al llegar EOF espera a que terminen las requests en curso
     """
+    global _WRITE_LOCK, _OUT
+    _WRITE_LOCK = asyncio.Lock()
+    inflight = asyncio.Semaphore(MAX_INFLIGHT)
+    pending = set()
+
     print("MCP-like stdio server ready", flush=True)
-    loop = asyncio.get_event_loop()
+    # Las herramientas imprimen progreso con print(): se desvía a stderr para
+    # que stdout solo lleve frames JSON
+    _OUT = sys.stdout.buffer
+    sys.stdout = sys.stderr
+    loop = asyncio.get_running_loop()
 
     while True:
         try:
             # Lee una línea; si es EOF, salimos
-            line = await loop.run_in_executor(None, sys.stdin.readline)
+            line = await loop.run_in_executor(_READER, sys.stdin.buffer.readline)
             if not line:
                 break
             line = line.strip()
@@ -59,23 +168,28 @@ async def main() -> None:
 
             # Parseo del JSON de entrada
             try:
-                req = json.loads(line)
-            except json.JSONDecodeError as e:
-                print(json.dumps({"ok": False, "error": f"bad json: {e}"}), flush=True)
+                req = _loads(line)
+            except _JSON_ERRORS as e:
+                await _write({"ok": False, "error": f"bad json: {e}"})
                 continue
 
-            # Despacho al handler
-            try:
-                res = await handle(req)
-            except Exception as e:
-                res = {"ok": False, "error": f"handler error: {e}"}
+            # Despacho concurrente (acotado por MAX_INFLIGHT)
+            await inflight.acquire()
+            task = asyncio.create_task(_process(req))
+            pending.add(task)
 
-            # Respuesta en 1 línea
-            print(json.dumps(res, ensure_ascii=False), flush=True)
+            def _done(t, _sem=inflight):
+                pending.discard(t)
+                _sem.release()
+
+            task.add_done_callback(_done)
 
         except KeyboardInterrupt:
             break
 
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    _EXECUTOR.shutdown(wait=False)
+
 if __name__ == "__main__":
     asyncio.run(main())
-
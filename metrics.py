@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas en formato Prometheus (texto) para el endpoint /metrics
+- Counters e histogramas sin locks: cada hilo escribe en su propio shard
+  y el render solo lee (merge al exportar)
+- Métricas del hot path: Agent.run, BaseLLM.generate, call_tool, cacheable,
+  http_client
+- Solo stdlib: importar este módulo no añade tiempo de arranque
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets por defecto (segundos) pensados para latencias de red/LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    Base de las métricas. Los valores viven en shards por hilo
+    ({thread_id: {labels: valor}}): solo el hilo dueño escribe en su shard,
+    así que no hace falta lock en el hot path.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._shards: Dict[int, Dict[Tuple[str, ...], Any]] = {}
+        _REGISTRY.append(self)
+
+    def _shard(self) -> Dict[Tuple[str, ...], Any]:
+        tid = threading.get_ident()
+        shard = self._shards.get(tid)
+        if shard is None:
+            # setdefault es atómico bajo el GIL
+            shard = self._shards.setdefault(tid, {})
+        return shard
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _label_str(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def _snapshots(self) -> List[List[Tuple[Tuple[str, ...], Any]]]:
+        # list(dict.items()) se ejecuta en C y no se interrumpe por otros hilos
+        return [list(shard.items()) for shard in list(self._shards.values())]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monótono con etiquetas."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        merged: Dict[Tuple[str, ...], float] = {}
+        for items in self._snapshots():
+            for key, value in items:
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._label_str(key)} {_fmt(value)}"
+                for key, value in sorted(self.values().items())]
+
+
+class Histogram(_Metric):
+    """
+    Histograma con buckets fijos. Cada serie guarda conteos por bucket
+    (no acumulados), suma y total; se acumulan al renderizar.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        series = shard.get(key)
+        if series is None:
+            # [bucket_0..bucket_n, +Inf, sum, count]
+            series = shard[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def values(self) -> Dict[Tuple[str, ...], List[float]]:
+        merged: Dict[Tuple[str, ...], List[float]] = {}
+        for items in self._snapshots():
+            for key, series in items:
+                series = list(series)
+                acc = merged.get(key)
+                if acc is None:
+                    merged[key] = series
+                else:
+                    for i, v in enumerate(series):
+                        acc[i] += v
+        return merged
+
+    def render(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for key, series in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_str(key, (('le', _fmt(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_str(key)} {_fmt(series[-2])}")
+            lines.append(f"{self.name}_count{self._label_str(key)} {int(series[-1])}")
+        return lines
+
+
+def render_prometheus() -> str:
+    """Exporta todas las métricas registradas en formato de texto Prometheus."""
+    out = []
+    for metric in _REGISTRY:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.render())
+    return "\n".join(out) + "\n"
+
+
+# ---------- Métricas del hot path ----------
+
+# Agent.run
+AGENT_RUNS = Counter("agent_runs_total", "Ejecuciones de Agent.run por resultado", ("outcome",))
+AGENT_RUN_SECONDS = Histogram("agent_run_seconds", "Duración de Agent.run")
+AGENT_RUN_STEPS = Histogram(
+    "agent_run_steps", "Pasos del bucle del agente por ejecución",
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 12, 16, 20),
+)
+AGENT_PARSE_FAILURES = Counter(
+    "agent_parse_failures_total",
+    "Respuestas del LLM sin JSON válido (recovered = el reintento funcionó)",
+    ("outcome",),
+)
+AGENT_PREFLIGHT = Counter(
+    "agent_auto_web_preflight_total",
+    "Intentos de auto-web preflight (hit = respondió sin bucle)",
+    ("result",),
+)
+
+# BaseLLM.generate
+LLM_REQUESTS = Counter("llm_requests_total", "Llamadas al LLM", ("provider", "model", "status"))
+LLM_SECONDS = Histogram("llm_generate_seconds", "Latencia de BaseLLM.generate", ("provider", "model"))
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens consumidos por tipo", ("provider", "model", "kind"))
+
+# call_tool
+TOOL_CALLS = Counter("tool_calls_total", "Llamadas a herramientas", ("tool", "status"))
+TOOL_SECONDS = Histogram("tool_call_seconds", "Latencia de call_tool", ("tool",))
+
+# cacheable
+CACHE_REQUESTS = Counter("cache_requests_total", "Lecturas de @cacheable", ("function", "result"))
+CACHE_BYTES = Counter("cache_bytes_total", "Bytes leídos/escritos por @cacheable", ("function", "direction"))
+
+# http_client
+HTTP_REQUESTS = Counter("http_client_requests_total", "Requests salientes por dominio", ("domain", "status"))
+HTTP_SECONDS = Histogram("http_client_request_seconds", "Latencia de requests salientes", ("domain",))
+HTTP_RETRIES = Counter("http_client_retries_total", "Reintentos de requests salientes", ("domain",))
+
+# domain_health (circuit breaker de lectura de artículos)
+DOMAIN_CIRCUIT = Counter("domain_circuit_events_total", "Eventos del circuit breaker por dominio", ("event",))
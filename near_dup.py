@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Agrupación de casi-duplicados (MinHash + LSH por bandas)
+- La misma noticia publicada por varios medios con títulos parecidos
+  queda en un solo "story cluster"
+- Shingles de caracteres sobre título + resumen normalizados
+- Firma MinHash vectorizada (hash multiply-shift, NumPy), LSH por bandas
+  para candidatos y verificación por similitud estimada de la firma
+- Costo ~O(n) en el pool: sin comparar todos contra todos
+"""
+
+import os
+import re
+import zlib
+from typing import Any, Callable, Dict, List, Sequence
+
+NEAR_DUP_SHINGLE = int(os.getenv("NEAR_DUP_SHINGLE", "5"))
+NEAR_DUP_PERMUTATIONS = int(os.getenv("NEAR_DUP_PERMUTATIONS", "64"))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+# Jaccard estimado mínimo para unir dos documentos del mismo bucket
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.5"))
+# Solo el arranque del texto: título + lead identifican la historia
+NEAR_DUP_MAX_CHARS = int(os.getenv("NEAR_DUP_MAX_CHARS", "400"))
+
+_SEED = 1234567
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def shingles(text: str, k: int = NEAR_DUP_SHINGLE) -> List[int]:
+    """Shingles de k caracteres del texto normalizado, como hashes de 32 bits"""
+    text = normalize(text)[:NEAR_DUP_MAX_CHARS]
+    if len(text) <= k:
+        return [zlib.crc32(text.encode("utf-8"))] if text else []
+    return list({zlib.crc32(text[i:i + k].encode("utf-8")) for i in range(len(text) - k + 1)})
+
+
+class MinHasher:
+    """Firmas MinHash de `permutations` hashes (h(x) = (a*x + b) >> 32 mod 2^64)"""
+
+    def __init__(self, permutations: int = NEAR_DUP_PERMUTATIONS, seed: int = _SEED):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        self.permutations = permutations
+        self._a = rng.integers(1, 2 ** 63, size=permutations, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=permutations, dtype=np.uint64)
+
+    def signature(self, hashes: Sequence[int]):
+        import numpy as np
+
+        if not hashes:
+            return np.full(self.permutations, np.iinfo(np.uint32).max, dtype=np.uint32)
+        x = np.asarray(hashes, dtype=np.uint64)[:, None]
+        # La multiplicación en uint64 desborda a propósito (mod 2^64)
+        h = (self._a[None, :] * x + self._b[None, :]) >> np.uint64(32)
+        return h.min(axis=0).astype(np.uint32)
+
+
+def cluster(texts: Sequence[str], threshold: float = NEAR_DUP_THRESHOLD,
+            bands: int = NEAR_DUP_BANDS, permutations: int = NEAR_DUP_PERMUTATIONS) -> List[List[int]]:
+    """
+    Agrupa textos casi duplicados.
+
+    Returns:
+        Lista de clusters (índices en `texts`), cada uno en orden de entrada;
+        los clusters van en el orden de su primer elemento
+    """
+    import numpy as np
+
+    if not texts:
+        return []
+    rows = permutations // bands
+    hasher = MinHasher(bands * rows)
+    sigs = np.stack([hasher.signature(shingles(t)) for t in texts])
+    empty = [not normalize(t) for t in texts]
+
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Candidatos: documentos que coinciden en alguna banda completa
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        block = sigs[:, band * rows:(band + 1) * rows]
+        for i in range(len(texts)):
+            if empty[i]:
+                continue
+            bucket = buckets.setdefault(block[i].tobytes(), [])
+            for j in bucket:
+                ri, rj = find(i), find(j)
+                if ri != rj and float(np.mean(sigs[i] == sigs[j])) >= threshold:
+                    parent[max(ri, rj)] = min(ri, rj)
+            bucket.append(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return [groups[r] for r in sorted(groups)]
+
+
+def collapse(items: List[Dict[str, Any]], text_of: Callable[[Dict[str, Any]], str],
+             richness: Callable[[Dict[str, Any]], float],
+             source_of: Callable[[Dict[str, Any]], Dict[str, str]],
+             threshold: float = NEAR_DUP_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Reduce cada cluster a su representante más rico y le adjunta:
+        'sources': [{'name', 'url', 'title'}, ...]  (todas las versiones)
+        'cluster_size': int
+
+    Returns:
+        Representantes en el orden del primer elemento de cada cluster
+    """
+    out = []
+    for members in cluster([text_of(it) for it in items], threshold=threshold):
+        best = max(members, key=lambda i: (richness(items[i]), -i))
+        rep = dict(items[best])
+        rep["sources"] = [source_of(items[i]) for i in members]
+        rep["cluster_size"] = len(members)
+        out.append(rep)
+    return out
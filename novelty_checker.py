@@ -2,37 +2,39 @@
 """
 Sistema de verificación de novedad para evitar contenido repetido
 Usa embeddings + similitud coseno para detectar temas ya cubiertos
+- Proveedor de embeddings configurable (NOVELTY_EMBED_PROVIDER, ver
+  embeddings.py); sin red se usa el backend local
+- Los temas de una corrida se embeben en un lote y se comparan contra el
+  historial con una sola multiplicación de matrices
+- Los vectores del historial van al almacén compacto (vector_store, junto
+  al JSON en topic_vectors/), no como listas de floats en el JSON
 """
 
 import json
 import os
-import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 HISTORY_DIR = os.getenv("NOVELTY_HISTORY_DIR", "content_history")
-os.makedirs(HISTORY_DIR, exist_ok=True)
-
 HISTORY_FILE = os.path.join(HISTORY_DIR, "topics_history.json")
 
 
-def get_embedding(text: str, model="text-embedding-3-small") -> List[float]:
+def get_embedding(text: str, model: Optional[str] = None) -> List[float]:
     """
-    Obtiene embedding de OpenAI
+    Obtiene el embedding con el proveedor de novelty
     
     Args:
         text: Texto a embedir
-        model: Modelo de embeddings (small es 10x más barato)
+        model: Modelo de OpenAI (None = proveedor configurado)
         
     Returns:
         Vector embedding
     """
-    text = text.replace("\n", " ").strip()
-    response = client.embeddings.create(input=[text], model=model)
-    return response.data[0].embedding
+    import embeddings
+
+    if model:
+        return embeddings.OpenAIEmbedder(model).embed_one(text)
+    return embeddings.get_embedder("novelty").embed_one(text)
 
 
 def cosine_similarity(v1: List[float], v2: List[float]) -> float:
@@ -42,6 +44,8 @@ def cosine_similarity(v1: List[float], v2: List[float]) -> float:
     Returns:
         Float entre 0 (diferentes) y 1 (idénticos)
     """
+    import numpy as np
+
     v1_arr = np.array(v1)
     v2_arr = np.array(v2)
     
@@ -80,6 +84,65 @@ def load_history() -> List[Dict[str, Any]]:
         return []
 
 
+def _vectors_dir() -> str:
+    return os.path.join(os.path.dirname(HISTORY_FILE), "topic_vectors")
+
+
+def _vector_key(entry: Dict[str, Any]) -> str:
+    import hashlib
+    return hashlib.sha1(f"{entry.get('topic', '')}|{entry.get('covered_date', '')}".encode("utf-8")).hexdigest()[:16]
+
+
+def _store_vectors(history: List[Dict[str, Any]]) -> None:
+    """
+    Mueve los embeddings en línea al almacén de su firma ('vector_key' en la
+    entrada) y deja en cada almacén solo las claves que siguen en el historial.
+    """
+    import embeddings
+    import vector_store
+
+    base = _vectors_dir()
+    by_sig: Dict[str, List[Dict[str, Any]]] = {}
+    for h in history:
+        if h.get('embedding') or h.get('vector_key'):
+            h.setdefault('embed_provider', embeddings.signature_of(h))
+            by_sig.setdefault(h['embed_provider'], []).append(h)
+    for signature, entries in by_sig.items():
+        store = vector_store.open_store(base, signature)
+        inline = [h for h in entries if h.get('embedding')]
+        if inline:
+            for h in inline:
+                h['vector_key'] = _vector_key(h)
+            store.add([h['vector_key'] for h in inline], [h['embedding'] for h in inline])
+            for h in inline:
+                del h['embedding']
+        store.retain([h['vector_key'] for h in entries if h.get('vector_key')])
+        store.save()
+    # Almacenes de firmas que ya no aparecen en el historial
+    if os.path.isdir(base):
+        live = {vector_store.slug(sig) for sig in by_sig}
+        for name in os.listdir(base):
+            if name not in live:
+                import shutil
+                shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+                vector_store.forget(os.path.join(base, name))
+
+
+def _attach_vectors(entries: List[Dict[str, Any]], signature: str) -> List[Dict[str, Any]]:
+    """Copias de las entradas con 'embedding' leído del almacén (solo la firma pedida)"""
+    import vector_store
+
+    wanted = [h for h in entries if h.get('vector_key') and not h.get('embedding') and h.get('embed_provider') == signature]
+    if not wanted:
+        return entries
+    store = vector_store.open_store(_vectors_dir(), signature)
+    found = [h for h in wanted if h['vector_key'] in store]
+    vectors = dict(zip((h['vector_key'] for h in found), store.vectors([h['vector_key'] for h in found]).tolist())) if found else {}
+    return [dict(h, embedding=vectors[h['vector_key']])
+            if h.get('embed_provider') == signature and not h.get('embedding') and h.get('vector_key') in vectors else h
+            for h in entries]
+
+
 def save_history(history: List[Dict[str, Any]]) -> None:
     """
     Guarda historial
@@ -91,13 +154,97 @@ def save_history(history: List[Dict[str, Any]]) -> None:
         if h.get('covered_date', '') >= cutoff
     ]
     
+    os.makedirs(os.path.dirname(HISTORY_FILE) or ".", exist_ok=True)
+    try:
+        _store_vectors(history)
+    except Exception as e:
+        # Sin almacén los vectores quedan en el JSON, como antes
+        print(f"Warning: Could not store topic vectors: {e}")
     with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
         json.dump(history, f, indent=2, ensure_ascii=False)
 
 
+def check_novelty_batch(
+    topics: List[str],
+    threshold: Optional[float] = None,
+    max_history: int = 100,
+    embedder=None
+) -> List[Dict[str, Any]]:
+    """
+    Verifica la novedad de varios temas: un solo lote de embeddings y una
+    multiplicación de matrices contra el historial.
+    
+    Args:
+        topics: Temas a verificar
+        threshold: Umbral de similitud (None = el del proveedor)
+        max_history: Máximo de items de historial a comparar
+        embedder: Proveedor (None = NOVELTY_EMBED_PROVIDER)
+        
+    Returns:
+        Un dict por tema, como check_novelty
+    """
+    import embeddings
+    import numpy as np
+
+    history = load_history()
+    
+    if not history or not topics:
+        return [{'is_novel': True, 'novelty_score': 1.0, 'similar_topics': []} for _ in topics]
+    
+    embedder = embedder or embeddings.get_embedder("novelty")
+    # Comparar con histórico (solo los más recientes); los vectores de otro
+    # proveedor se re-embeben si el proveedor es local
+    recent_history = [h for h in history[-max_history:] if h.get('topic') or 'embedding' in h]
+    try:
+        topic_vecs = embedder.embed(topics)
+        recent_history = _attach_vectors(recent_history, embedder.signature)
+        recent_history = embeddings.align(recent_history, embedder, text_key='topic')
+    except Exception as e:
+        if not embedder.local:
+            # Sin red: backend local en vez de dar todo por nuevo (con su umbral)
+            print(f"Warning: Embeddings remotos fallaron ({e}), usando backend local")
+            return check_novelty_batch(topics, None, max_history, embeddings.get_embedder(provider="local"))
+        # Si falla embedding, asumimos que es nuevo
+        return [{'is_novel': True, 'novelty_score': 1.0, 'similar_topics': [], 'error': str(e)} for _ in topics]
+    
+    if threshold is None:
+        threshold = embedder.novelty_threshold
+    dim = len(topic_vecs[0]) if topic_vecs else 0
+    recent_history = [h for h in recent_history if h.get('embedding') and len(h['embedding']) == dim]
+    if not recent_history:
+        return [{'is_novel': True, 'novelty_score': 1.0, 'similar_topics': []} for _ in topics]
+    
+    t = np.asarray(topic_vecs, dtype=np.float32)
+    h = np.asarray([item['embedding'] for item in recent_history], dtype=np.float32)
+    t /= np.maximum(np.linalg.norm(t, axis=1, keepdims=True), 1e-12)
+    h /= np.maximum(np.linalg.norm(h, axis=1, keepdims=True), 1e-12)
+    sims = t @ h.T
+    
+    results = []
+    for row in sims:
+        top = np.argsort(-row, kind="stable")[:5]  # Top 5 más similares
+        max_similarity = float(row[top[0]])
+        results.append({
+            'is_novel': max_similarity < threshold,
+            # Novelty score: inverso de la máxima similitud
+            'novelty_score': 1.0 - max_similarity,
+            'similar_topics': [
+                {
+                    'topic': recent_history[j].get('topic', ''),
+                    'similarity': float(row[j]),
+                    'covered_date': recent_history[j].get('covered_date', ''),
+                    'video_title': recent_history[j].get('video_title', '')
+                }
+                for j in top
+            ],
+            'embed_provider': embedder.signature
+        })
+    return results
+
+
 def check_novelty(
     topic: str,
-    threshold: float = 0.75,
+    threshold: Optional[float] = None,
     max_history: int = 100
 ) -> Dict[str, Any]:
     """
@@ -105,7 +252,7 @@ def check_novelty(
     
     Args:
         topic: Tema a verificar (título, descripción, etc)
-        threshold: Umbral de similitud (>= threshold = repetido)
+        threshold: Umbral de similitud (>= threshold = repetido; None = el del proveedor)
         max_history: Máximo de items de historial a comparar
         
     Returns:
@@ -122,58 +269,7 @@ def check_novelty(
             ]
         }
     """
-    history = load_history()
-    
-    if not history:
-        return {
-            'is_novel': True,
-            'novelty_score': 1.0,
-            'similar_topics': []
-        }
-    
-    # Generar embedding del nuevo tema
-    try:
-        topic_embedding = get_embedding(topic)
-    except Exception as e:
-        # Si falla embedding, asumimos que es nuevo
-        return {
-            'is_novel': True,
-            'novelty_score': 1.0,
-            'similar_topics': [],
-            'error': str(e)
-        }
-    
-    # Comparar con histórico (solo los más recientes)
-    recent_history = history[-max_history:]
-    similarities = []
-    
-    for hist_item in recent_history:
-        if 'embedding' not in hist_item:
-            continue
-        
-        sim = cosine_similarity(topic_embedding, hist_item['embedding'])
-        
-        similarities.append({
-            'topic': hist_item.get('topic', ''),
-            'similarity': sim,
-            'covered_date': hist_item.get('covered_date', ''),
-            'video_title': hist_item.get('video_title', '')
-        })
-    
-    # Ordenar por similitud
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
-    
-    # Calcular novelty score (inverso de la máxima similitud)
-    max_similarity = similarities[0]['similarity'] if similarities else 0.0
-    novelty_score = 1.0 - max_similarity
-    
-    is_novel = max_similarity < threshold
-    
-    return {
-        'is_novel': is_novel,
-        'novelty_score': novelty_score,
-        'similar_topics': similarities[:5]  # Top 5 más similares
-    }
+    return check_novelty_batch([topic], threshold, max_history)[0]
 
 
 def add_to_history(
@@ -189,8 +285,11 @@ def add_to_history(
         video_title: Título del video (opcional)
         metadata: Metadata adicional
     """
+    import embeddings
+
+    embedder = embeddings.get_embedder("novelty")
     try:
-        embedding = get_embedding(topic)
+        embedding = embedder.embed_one(topic)
     except Exception as e:
         print(f"Warning: Could not generate embedding: {e}")
         return
@@ -200,6 +299,7 @@ def add_to_history(
     entry = {
         'topic': topic,
         'embedding': embedding,
+        'embed_provider': embedder.signature,
         'covered_date': datetime.now().isoformat(),
         'video_title': video_title or '',
         'metadata': metadata or {}
@@ -213,7 +313,7 @@ def add_to_history(
 
 def filter_novel_topics(
     topics: List[str],
-    threshold: float = 0.75,
+    threshold: Optional[float] = None,
     return_details: bool = False
 ) -> List[Any]:
     """
@@ -221,7 +321,7 @@ def filter_novel_topics(
     
     Args:
         topics: Lista de temas/títulos
-        threshold: Umbral de novedad
+        threshold: Umbral de novedad (None = el del proveedor)
         return_details: Si True, retorna dict con detalles
         
     Returns:
@@ -229,9 +329,7 @@ def filter_novel_topics(
     """
     results = []
     
-    for topic in topics:
-        check = check_novelty(topic, threshold)
-        
+    for topic, check in zip(topics, check_novelty_batch(topics, threshold)):
         if check['is_novel']:
             if return_details:
                 results.append({
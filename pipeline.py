@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecutor de pipelines como grafo de etapas (DAG)
+- Cada etapa declara sus entradas y salidas: nombres en un contexto compartido
+- Las etapas cuyas entradas ya están listas corren a la vez en pools de
+  hilos ('io' para red/API, 'cpu' para trabajo local)
+- Tiempo por etapa y ruta crítica: con etapas independientes en paralelo el
+  tiempo total se acerca a la ruta crítica y no a la suma
+- Re-ejecutable: run() salta las etapas cuyas salidas ya están en el
+  contexto, salvo las pedidas en rerun y todo lo que depende de ellas
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import metrics
+
+PIPELINE_IO_WORKERS = int(os.getenv("PIPELINE_IO_WORKERS", "8"))
+PIPELINE_CPU_WORKERS = int(os.getenv("PIPELINE_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+POOLS = ("io", "cpu")
+
+STAGE_SECONDS = metrics.Histogram(
+    "pipeline_stage_seconds", "Duración de etapas de pipeline", ("pipeline", "stage"),
+)
+
+
+class StageError(RuntimeError):
+    """Fallo de una etapa: conserva el nombre y la excepción original"""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Stage '{stage}' failed: {type(error).__name__}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    """
+    Etapa del grafo: fn(**entradas) -> salida. Con una sola salida se usa el
+    valor devuelto tal cual; con varias, fn devuelve un dict con todas.
+    """
+
+    def __init__(self, name: str, fn: Callable[..., Any], inputs: Sequence[str],
+                 outputs: Sequence[str], pool: str = "io"):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.pool = pool
+
+    def call(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        value = self.fn(**args)
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: value}
+        if not isinstance(value, dict) or any(o not in value for o in self.outputs):
+            raise ValueError(f"Stage '{self.name}' must return a dict with {list(self.outputs)}")
+        return {o: value[o] for o in self.outputs}
+
+
+class Pipeline:
+    """
+    Grafo de etapas. Uso:
+
+        p = Pipeline("digest")
+        p.add("rss", fetch_rss, inputs=["hours"], outputs=["rss"])
+        p.add("web", fetch_web, inputs=["hours"], outputs=["web"])
+        p.add("merge", merge, inputs=["rss", "web"], outputs=["content"], pool="cpu")
+        ctx = p.run({"hours": 24})           # rss y web en paralelo
+        ctx = p.run(ctx, rerun=["web"])      # solo web y merge
+    """
+
+    def __init__(self, name: str = "pipeline", io_workers: Optional[int] = None,
+                 cpu_workers: Optional[int] = None):
+        self.name = name
+        self.workers = {
+            "io": io_workers or PIPELINE_IO_WORKERS,
+            "cpu": cpu_workers or PIPELINE_CPU_WORKERS,
+        }
+        self.stages: Dict[str, Stage] = {}
+        self._producer: Dict[str, str] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.wall_seconds = 0.0
+
+    def add(self, name: str, fn: Callable[..., Any], inputs: Iterable[str] = (),
+            outputs: Optional[Iterable[str]] = None, pool: str = "io") -> Stage:
+        """Registra una etapa (por defecto su única salida se llama como ella)"""
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        if pool not in POOLS:
+            raise ValueError(f"Unknown pool '{pool}' (use one of {POOLS})")
+        stage = Stage(name, fn, list(inputs), list(outputs or [name]), pool)
+        for out in stage.outputs:
+            if out in self._producer:
+                raise ValueError(f"Output '{out}' already produced by stage '{self._producer[out]}'")
+        self.stages[name] = stage
+        for out in stage.outputs:
+            self._producer[out] = name
+        return stage
+
+    def stage(self, name: Optional[str] = None, inputs: Iterable[str] = (),
+              outputs: Optional[Iterable[str]] = None, pool: str = "io"):
+        """Decorador equivalente a add()"""
+        def decorator(fn):
+            self.add(name or fn.__name__, fn, inputs, outputs, pool)
+            return fn
+        return decorator
+
+    def upstream(self, name: str) -> List[str]:
+        """Etapas que producen las entradas de 'name'"""
+        return list(dict.fromkeys(
+            self._producer[i] for i in self.stages[name].inputs if i in self._producer
+        ))
+
+    def order(self) -> List[str]:
+        """Orden topológico (estable respecto al orden de registro)"""
+        indegree = {name: len(self.upstream(name)) for name in self.stages}
+        downstream: Dict[str, List[str]] = {name: [] for name in self.stages}
+        for name in self.stages:
+            for up in self.upstream(name):
+                downstream[up].append(name)
+        ready = [name for name, n in indegree.items() if n == 0]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for down in downstream[name]:
+                indegree[down] -= 1
+                if indegree[down] == 0:
+                    ready.append(down)
+        if len(order) != len(self.stages):
+            cycle = sorted(set(self.stages) - set(order))
+            raise ValueError(f"Cycle between stages: {cycle}")
+        return order
+
+    def plan(self, context: Dict[str, Any], rerun: Iterable[str] = (),
+             targets: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Etapas a ejecutar, en orden topológico: las que tienen salidas que
+        faltan en el contexto, las de rerun y todas las que dependen de
+        alguna de ellas. targets (etapas o salidas) limita el plan a lo
+        necesario para producirlos.
+        """
+        rerun = set(rerun)
+        unknown = rerun - set(self.stages)
+        if unknown:
+            raise KeyError(f"Unknown stages: {sorted(unknown)}")
+        order = self.order()
+
+        needed = set(order)
+        if targets is not None:
+            needed = set()
+            stack = [self._producer.get(t, t) for t in targets]
+            while stack:
+                name = stack.pop()
+                if name not in self.stages:
+                    raise KeyError(f"Unknown stage or output: {name}")
+                if name not in needed:
+                    needed.add(name)
+                    stack.extend(self.upstream(name))
+
+        dirty = set()
+        for name in order:
+            if name not in needed:
+                continue
+            stage = self.stages[name]
+            if (name in rerun
+                    or any(o not in context for o in stage.outputs)
+                    or any(up in dirty for up in self.upstream(name))):
+                dirty.add(name)
+        for name in dirty:
+            missing = [i for i in self.stages[name].inputs
+                       if i not in self._producer and i not in context]
+            if missing:
+                raise KeyError(f"Stage '{name}' needs inputs not in context: {missing}")
+        return [name for name in order if name in dirty]
+
+    def _execute(self, stage: Stage, args: Dict[str, Any]) -> Tuple[Any, float, float]:
+        start = time.perf_counter()
+        try:
+            return stage.call(args), start, time.perf_counter() - start
+        except BaseException as e:
+            return e, start, time.perf_counter() - start
+
+    def run(self, context: Optional[Dict[str, Any]] = None, rerun: Iterable[str] = (),
+            targets: Optional[Iterable[str]] = None,
+            on_stage_done: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Ejecuta el plan y devuelve el contexto con todas las salidas.
+        on_stage_done(nombre, salidas) se llama en el hilo del scheduler al
+        terminar cada etapa. Si una etapa falla se lanza StageError (las que
+        ya estaban en marcha no se esperan).
+        """
+        context = dict(context or {})
+        todo = self.plan(context, rerun, targets)
+        deps = {name: {up for up in self.upstream(name) if up in todo} for name in todo}
+        self.timings = {}
+        done: set = set()
+        running: Dict[Any, str] = {}
+        pools = {
+            pool: ThreadPoolExecutor(max_workers=self.workers[pool], thread_name_prefix=f"{self.name}-{pool}")
+            for pool in {self.stages[name].pool for name in todo}
+        }
+        origin = time.perf_counter()
+        failed = True  # error o interrupción (Ctrl-C): no esperar a las etapas en marcha
+        try:
+            while todo or running:
+                for name in [n for n in todo if deps[n] <= done]:
+                    todo.remove(name)
+                    stage = self.stages[name]
+                    # El contexto solo se modifica en este hilo: las entradas se copian al lanzar
+                    args = {i: context[i] for i in stage.inputs}
+                    running[pools[stage.pool].submit(self._execute, stage, args)] = name
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    value, start, seconds = future.result()
+                    error = value if isinstance(value, BaseException) else None
+                    self.timings[name] = {
+                        "pool": self.stages[name].pool,
+                        "start": round(start - origin, 4),
+                        "seconds": round(seconds, 4),
+                        "status": "error" if error else "ok",
+                    }
+                    STAGE_SECONDS.observe(seconds, pipeline=self.name, stage=name)
+                    if error is not None:
+                        raise StageError(name, error) from error
+                    context.update(value)
+                    done.add(name)
+                    if on_stage_done:
+                        on_stage_done(name, value)
+            failed = False
+        finally:
+            self.wall_seconds = time.perf_counter() - origin
+            for pool in pools.values():
+                pool.shutdown(wait=not failed, cancel_futures=failed)
+        return context
+
+    def critical_path(self) -> Tuple[float, List[str]]:
+        """Camino más largo (en segundos) entre las etapas de la última ejecución"""
+        finish: Dict[str, float] = {}
+        prev: Dict[str, Optional[str]] = {}
+        for name in self.order():
+            if name not in self.timings:
+                continue
+            best = max((up for up in self.upstream(name) if up in finish),
+                       key=lambda up: finish[up], default=None)
+            prev[name] = best
+            finish[name] = self.timings[name]["seconds"] + (finish[best] if best else 0.0)
+        if not finish:
+            return 0.0, []
+        node: Optional[str] = None
+        for name in finish:  # en empate gana la última etapa
+            if node is None or finish[name] >= finish[node]:
+                node = name
+        total = finish[node]
+        path = []
+        while node:
+            path.append(node)
+            node = prev[node]
+        return total, path[::-1]
+
+    def summary(self) -> Dict[str, Any]:
+        """Tiempos de la última ejecución: pared, suma de etapas y ruta crítica"""
+        critical_seconds, critical = self.critical_path()
+        return {
+            "wall_seconds": round(self.wall_seconds, 4),
+            "stage_seconds_sum": round(sum(t["seconds"] for t in self.timings.values()), 4),
+            "critical_path_seconds": round(critical_seconds, 4),
+            "critical_path": critical,
+            "stages": dict(self.timings),
+        }
+
+    def report(self) -> None:
+        """Imprime la tabla de tiempos por etapa"""
+        s = self.summary()
+        print(f"\n⏱️ Pipeline '{self.name}': {s['wall_seconds']:.2f}s wall | "
+              f"critical path {s['critical_path_seconds']:.2f}s | sum of stages {s['stage_seconds_sum']:.2f}s")
+        for name, t in sorted(s["stages"].items(), key=lambda kv: kv[1]["start"]):
+            mark = "★" if name in s["critical_path"] else " "
+            status = "" if t["status"] == "ok" else f"  ❌ {t['status']}"
+            print(f"   {mark} {name:<12s} [{t['pool']}] {t['start']:7.2f}s +{t['seconds']:.2f}s{status}")
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén de HTML crudo direccionado por contenido
+- Índice por URL canónica (url_canon, con redirecciones conocidas) ->
+  metadatos de la descarga (status, ETag, fecha, sha256)
+- Cuerpos comprimidos (zstd si está instalado, si no gzip) guardados por sha256:
+  dos URLs con el mismo contenido comparten blob
+- TTL por entrada; al vencer se revalida con GET condicional
+- La extracción de texto se cachea aparte por (sha256, opciones): cambiar
+  max_chars o los parámetros de extracción nunca vuelve a descargar
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import url_canon
+
+try:
+    import zstandard as _zstd
+except Exception:
+    _zstd = None
+
+RAW_STORE_DIR = os.getenv("RAW_STORE_DIR", os.path.join("cache", "raw"))
+RAW_TTL_HOURS = float(os.getenv("RAW_TTL_HOURS", "24"))
+RAW_MAX_BYTES = int(os.getenv("RAW_MAX_BYTES", str(5 * 1024 * 1024)))
+
+USER_AGENT = "Mozilla/5.0 (compatible; ai-agent-starter/0.2)"
+
+_write_lock = threading.Lock()
+
+# Compatibilidad: la canonicalización vive en url_canon
+canonical_url = url_canon.canonical_url
+
+
+# ---------- Rutas y compresión ----------
+
+def _index_path(canonical: str) -> str:
+    return os.path.join(RAW_STORE_DIR, "index", hashlib.md5(canonical.encode("utf-8")).hexdigest() + ".json")
+
+
+def _blob_path(sha256: str, codec: str) -> str:
+    return os.path.join(RAW_STORE_DIR, "blobs", sha256[:2], f"{sha256}.{codec}")
+
+
+def _text_path(sha256: str, variant: str) -> str:
+    return os.path.join(RAW_STORE_DIR, "text", sha256[:2], f"{sha256}.{variant}.txt.gz")
+
+
+def _compress(data: bytes) -> Tuple[bytes, str]:
+    if _zstd is not None:
+        return _zstd.ZstdCompressor(level=10).compress(data), "zst"
+    return gzip.compress(data, compresslevel=6), "gz"
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zst":
+        return _zstd.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# ---------- API ----------
+
+def get_meta(url: str) -> Optional[Dict[str, Any]]:
+    """
+    Metadatos de la última descarga:
+        {'url', 'canonical', 'sha256', 'codec', 'status', 'content_type',
+         'etag', 'last_modified', 'bytes', 'stored_bytes', 'fetched_at'}
+    """
+    try:
+        with open(_index_path(url_canon.key(url)), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _is_fresh(meta: Dict[str, Any], max_age_hours: float) -> bool:
+    fetched = datetime.fromisoformat(meta["fetched_at"])
+    return datetime.now() - fetched <= timedelta(hours=max_age_hours)
+
+
+def _read_blob(meta: Dict[str, Any]) -> Optional[bytes]:
+    try:
+        with open(_blob_path(meta["sha256"], meta["codec"]), "rb") as f:
+            return _decompress(f.read(), meta["codec"])
+    except Exception:
+        return None
+
+
+def is_fresh(url: str, max_age_hours: float = RAW_TTL_HOURS) -> bool:
+    """True si la URL tiene una descarga vigente en el almacén (no habrá red)"""
+    meta = get_meta(url)
+    return bool(meta) and _is_fresh(meta, max_age_hours)
+
+
+def get(url: str, max_age_hours: float = RAW_TTL_HOURS) -> Optional[bytes]:
+    """Bytes crudos de la URL si están en el almacén y no vencieron"""
+    meta = get_meta(url)
+    if not meta or not _is_fresh(meta, max_age_hours):
+        return None
+    return _read_blob(meta)
+
+
+def put(url: str, content: bytes, status: int = 200, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Guarda una descarga; el blob se escribe solo si su sha256 no existe todavía"""
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    sha256 = hashlib.sha256(content).hexdigest()
+    compressed, codec = _compress(content)
+    blob = _blob_path(sha256, codec)
+    with _write_lock:
+        if not os.path.exists(blob):
+            _atomic_write(blob, compressed)
+        meta = {
+            "url": url,
+            "canonical": url_canon.key(url),
+            "sha256": sha256,
+            "codec": codec,
+            "status": status,
+            "content_type": headers.get("content-type", ""),
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "bytes": len(content),
+            "stored_bytes": len(compressed),
+            "fetched_at": datetime.now().isoformat(),
+        }
+        _atomic_write(_index_path(meta["canonical"]), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+    return meta
+
+
+def _download(url: str, timeout: float, prev: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    import http_client
+
+    headers = {"User-Agent": USER_AGENT}
+    if prev:
+        if prev.get("etag"):
+            headers["If-None-Match"] = prev["etag"]
+        if prev.get("last_modified"):
+            headers["If-Modified-Since"] = prev["last_modified"]
+    r = http_client.get(url, headers=headers, timeout=timeout, max_bytes=RAW_MAX_BYTES)
+    if r.status_code != 304:
+        r.raise_for_status()
+    return {"status": r.status_code, "content": r.content, "headers": dict(r.headers), "url": r.url or url}
+
+
+def fetch(url: str, timeout: float = 25, max_age_hours: float = RAW_TTL_HOURS) -> Dict[str, Any]:
+    """
+    Bytes crudos de una URL: del almacén si están frescos; si no, se descargan
+    (GET condicional si hay validadores) y se guardan.
+
+    Returns:
+        metadatos (ver get_meta) + {'content': bytes, 'from_store': bool}
+    """
+    prev = get_meta(url)
+    cached = _read_blob(prev) if prev else None
+    if cached is not None and _is_fresh(prev, max_age_hours):
+        return dict(prev, content=cached, from_store=True)
+
+    dl = _download(url, timeout, prev if cached is not None else None)
+    if dl["status"] == 304:
+        # Sin cambios: mismo blob, solo se renueva la fecha
+        meta = dict(prev, fetched_at=datetime.now().isoformat())
+        _atomic_write(_index_path(meta["canonical"]), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        return dict(meta, content=cached, from_store=True)
+    # Redirección (feedproxy, acortadores, ...): se guarda bajo la URL final
+    # y url_canon recuerda el salto para no repetirlo
+    if dl["url"] != url:
+        url_canon.learn_redirect(url, dl["url"])
+    url_canon.register(dl["url"], "read")
+    meta = put(dl["url"], dl["content"], status=dl["status"], headers=dl["headers"])
+    return dict(meta, content=dl["content"], from_store=False)
+
+
+def extract_text(url: str, favor_recall: bool = True, include_tables: bool = False,
+                 timeout: float = 25, max_age_hours: float = RAW_TTL_HOURS) -> str:
+    """
+    Texto principal de la URL (sin truncar). Se cachea por sha256 del HTML
+    + opciones de extracción, así que re-extraer o truncar distinto es local.
+    """
+    import extractor
+    import text_index
+
+    page = fetch(url, timeout=timeout, max_age_hours=max_age_hours)
+    variant = f"r{int(favor_recall)}t{int(include_tables)}"
+    path = _text_path(page["sha256"], variant)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            text = f.read()
+    except Exception:
+        text = extractor.extract_text(page["content"], favor_recall=favor_recall, include_tables=include_tables)
+        if text:
+            _atomic_write(path, gzip.compress(text.encode("utf-8")))
+    # Todo lo leído alimenta el índice local (no-op si ya estaba igual)
+    if text:
+        text_index.index_document(url, html_title(page["content"]), text, "read")
+    return text
+
+
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+def html_title(content: bytes) -> str:
+    """<title> del HTML (solo mira el principio del documento)"""
+    import html
+
+    m = _TITLE_RE.search(content[:65536])
+    if not m:
+        return ""
+    return " ".join(html.unescape(m.group(1).decode("utf-8", errors="replace")).split())[:300]
+
+
+def prune(max_age_hours: float = RAW_TTL_HOURS * 7) -> Dict[str, int]:
+    """Borra entradas del índice más viejas que max_age_hours y los blobs/textos huérfanos"""
+    removed = {"index": 0, "blobs": 0, "text": 0}
+    live = set()
+    index_dir = os.path.join(RAW_STORE_DIR, "index")
+    for name in os.listdir(index_dir) if os.path.isdir(index_dir) else []:
+        path = os.path.join(index_dir, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if _is_fresh(meta, max_age_hours):
+                live.add(meta["sha256"])
+                continue
+        except Exception:
+            pass
+        os.remove(path)
+        removed["index"] += 1
+    for kind in ("blobs", "text"):
+        root = os.path.join(RAW_STORE_DIR, kind)
+        for dirpath, _, files in os.walk(root):
+            for name in files:
+                if name.split(".", 1)[0] not in live:
+                    os.remove(os.path.join(dirpath, name))
+                    removed[kind] += 1
+    return removed
@@ -37,9 +37,9 @@ mkdir -p logs
 TIMESTAMP=$(date +%Y%m%d_%H%M%S)
 LOG_FILE="logs/digest_${TIMESTAMP}.log"
 
-# Ejecutar digest diario
+# Ejecutar digest diario (--resume retoma una ejecución interrumpida y su batch pendiente)
 echo "Running daily digest..."
-python daily_digest_optimized.py > "$LOG_FILE" 2>&1
+python daily_digest_optimized.py --resume > "$LOG_FILE" 2>&1
 
 # Verificar resultado
 if [ $? -eq 0 ]; then
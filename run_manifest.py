@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Manifiesto por ejecución del digest (checkpoint / resume)
+- Cada ejecución tiene un directorio <DIGEST_RUNS_DIR>/<run_id>/ con
+  manifest.json (configuración, etapas terminadas, batches en curso, estado)
+  y outputs/<salida>.json con la salida de cada etapa
+- Escrituras atómicas (tmp + os.replace): un kill a mitad de etapa deja el
+  manifiesto en el último checkpoint válido
+- latest_incomplete() encuentra la ejecución interrumpida más reciente para
+  retomarla desde la primera etapa sin terminar, reusando el batch enviado
+- El plazo para retomar cuenta desde created_at (no desde el último guardado)
+  y cada ejecución admite DIGEST_RESUME_MAX_ATTEMPTS intentos: una etapa que
+  falla siempre no se retoma indefinidamente con las mismas salidas en caché
+"""
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+DIGEST_RUNS_DIR = os.getenv("DIGEST_RUNS_DIR", os.path.join("digests", "runs"))
+DIGEST_RUNS_KEEP = int(os.getenv("DIGEST_RUNS_KEEP", "10"))
+DIGEST_RESUME_MAX_HOURS = float(os.getenv("DIGEST_RESUME_MAX_HOURS", "24"))
+DIGEST_RESUME_MAX_ATTEMPTS = int(os.getenv("DIGEST_RESUME_MAX_ATTEMPTS", "3"))
+
+FINISHED = ("complete", "abandoned")  # estados que no se retoman
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+
+
+class RunManifest:
+    """Estado persistente de una ejecución del digest"""
+
+    def __init__(self, run_id: Optional[str] = None, config: Optional[Dict[str, Any]] = None,
+                 base: Optional[str] = None):
+        self.base = base or DIGEST_RUNS_DIR
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.dir = os.path.join(self.base, self.run_id)
+        self.path = os.path.join(self.dir, "manifest.json")
+        self._lock = threading.RLock()  # etapas y batch escriben desde hilos distintos
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.data = json.load(f)
+        else:
+            now = datetime.now().isoformat()
+            self.data = {
+                "run_id": self.run_id,
+                "created_at": now,
+                "updated_at": now,
+                "status": "running",
+                "attempts": 1,
+                "config": dict(config or {}),
+                "stages": {},
+                "batches": {},
+            }
+            os.makedirs(os.path.join(self.dir, "outputs"), exist_ok=True)
+            self.save()
+
+    @property
+    def status(self) -> str:
+        return self.data["status"]
+
+    @property
+    def attempts(self) -> int:
+        return self.data.get("attempts", 1)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.data["config"]
+
+    def save(self) -> None:
+        with self._lock:
+            self.data["updated_at"] = datetime.now().isoformat()
+            try:
+                _write_json(self.path, self.data)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Warning: Could not save run manifest: {e}")
+
+    def completed_stages(self) -> List[str]:
+        return list(self.data["stages"])
+
+    def record_stage(self, name: str, outputs: Dict[str, Any], seconds: Optional[float] = None) -> None:
+        """Checkpoint: primero las salidas, después la etapa en el manifiesto"""
+        try:
+            for key, value in outputs.items():
+                _write_json(os.path.join(self.dir, "outputs", f"{key}.json"), value)
+        except (OSError, TypeError, ValueError) as e:
+            # Sin sus salidas la etapa no cuenta como terminada: se repite al retomar
+            print(f"Warning: Could not save outputs of stage {name}: {e}")
+            return
+        with self._lock:
+            self.data["stages"][name] = {
+                "finished_at": datetime.now().isoformat(),
+                "seconds": seconds,
+                "outputs": list(outputs),
+            }
+            self.save()
+
+    def outputs(self) -> Dict[str, Any]:
+        """Salidas de las etapas terminadas (contexto para retomar)"""
+        context = {}
+        for stage in self.data["stages"].values():
+            for key in stage["outputs"]:
+                with open(os.path.join(self.dir, "outputs", f"{key}.json"), encoding="utf-8") as f:
+                    context[key] = json.load(f)
+        return context
+
+    def set_batch(self, name: str, batch_id: str, **info: Any) -> None:
+        """Registra un batch enviado (en cuanto la API devuelve su id)"""
+        with self._lock:
+            self.data["batches"][name] = dict(info, batch_id=batch_id, submitted_at=datetime.now().isoformat())
+            self.save()
+
+    def batch(self, name: str) -> Optional[str]:
+        """batch_id enviado por esta ejecución para 'name', si existe"""
+        return self.data["batches"].get(name, {}).get("batch_id")
+
+    def resume(self) -> None:
+        """Nuevo intento sobre esta ejecución"""
+        with self._lock:
+            self.data["attempts"] = self.attempts + 1
+            self.data["status"] = "running"
+            self.save()
+
+    def finish(self, status: str = "complete", error: Optional[str] = None) -> None:
+        with self._lock:
+            self.data["status"] = status
+            if error:
+                self.data["error"] = error
+            self.save()
+        if status == "complete":
+            prune(self.base)
+
+
+def _manifests(base: str) -> List[RunManifest]:
+    if not os.path.isdir(base):
+        return []
+    runs = []
+    for run_id in sorted(os.listdir(base)):
+        if os.path.exists(os.path.join(base, run_id, "manifest.json")):
+            try:
+                runs.append(RunManifest(run_id, base=base))
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not load run manifest {run_id}: {e}")
+    return runs
+
+
+def latest_incomplete(base: Optional[str] = None,
+                      max_age_hours: float = DIGEST_RESUME_MAX_HOURS,
+                      max_attempts: int = DIGEST_RESUME_MAX_ATTEMPTS) -> Optional[RunManifest]:
+    """
+    Ejecución sin terminar más reciente (interrumpida o fallida) creada dentro
+    del plazo y con intentos disponibles. La que los ha agotado se marca como
+    'abandoned' y se empieza una nueva.
+    """
+    cutoff = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+    for run in reversed(_manifests(base or DIGEST_RUNS_DIR)):
+        if run.status in FINISHED or run.data["created_at"] < cutoff:
+            continue
+        if run.attempts >= max_attempts:
+            print(f"Warning: Run {run.run_id} failed {run.attempts} times - not resuming it")
+            run.finish("abandoned")
+            continue
+        return run
+    return None
+
+
+def prune(base: Optional[str] = None, keep: int = DIGEST_RUNS_KEEP) -> int:
+    """Borra los directorios de ejecuciones terminadas más allá de las 'keep' últimas"""
+    complete = [run for run in _manifests(base or DIGEST_RUNS_DIR) if run.status in FINISHED]
+    removed = 0
+    for run in complete[:max(0, len(complete) - keep)]:
+        shutil.rmtree(run.dir, ignore_errors=True)
+        removed += 1
+    return removed
@@ -1,7 +1,7 @@
 # server.py
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -11,6 +11,7 @@ import os, json
 load_dotenv()
 
 from agent import Agent  # importa después de load_dotenv
+import metrics
 
 app = FastAPI(title="AI Agent Starter API", version="0.1.0")
 # CORS permisivo por si la UI se sirve desde otro origen en Render
@@ -279,6 +280,11 @@ resetBtn.onclick = ()=>sendTask(true);
 </html>'''
 """
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Métricas del hot path en formato Prometheus (texto)"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 def health():
     return {"ok": True, "service": "ai-agent-starter", "version": 
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del digest en dos fases: publicación inmediata con señales locales y
+poller que añade el análisis del batch al .md y a su JSON - sin red ni API keys
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import daily_digest_optimized as dd
+
+STORY = {"title": "GPT-5 anunciado", "summary": "OpenAI presenta GPT-5", "link": "https://e.com/a"}
+
+
+def _patched(calls):
+    def wait(batch_id, check_interval, max_wait):
+        calls["wait"].append(batch_id)
+        if calls.get("batch_fails"):
+            return None
+        return [{"id": "article-0-https://e.com/a", "content": "Análisis del batch"},
+                {"id": "titles-0", "content": json.dumps({"titles": [{"title": "GPT-5 en el batch"}]})}]
+
+    return {
+        "fetch_rss": lambda hours_back: {"all_posts": [STORY], "unprocessed_posts": [STORY]},
+        "fetch_web": lambda hours_back: [],
+        "merge_content": lambda rss_data, web_articles: {
+            "rss_posts": rss_data["all_posts"], "web_articles": web_articles, "total_sources": 1},
+        "filter_and_rank_topics": lambda topics, max_topics, use_advanced_scoring: [
+            {"topic": t, "novelty_score": 0.9} for t in topics],
+        "analyze_articles_batch": lambda articles, focus, extra_prompts=None: calls["extra"].append(
+            [p["id"] for p in extra_prompts or []]) or "batch_1",
+        "wait_for_batch": wait,
+        "enrich_articles": lambda articles: calls["enrich"].append(len(articles)) or [
+            {"video_titles": [{"title": "GPT-5 lo cambia todo"}]}],
+        "start_background_poller": lambda json_path: calls["poller"].append(json_path) or 0,
+        "add_to_history": lambda **kw: None,
+    }
+
+
+def _run(calls, body):
+    patched = _patched(calls)
+    original = {name: getattr(dd, name) for name in patched}
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        for name, fn in patched.items():
+            setattr(dd, name, fn)
+        return body()
+    finally:
+        os.chdir(cwd)
+        for name, fn in original.items():
+            setattr(dd, name, fn)
+
+
+def test_phase_one_publishes_without_waiting_and_poller_patches():
+    calls = {"wait": [], "enrich": [], "poller": [], "extra": []}
+
+    def body():
+        start = time.perf_counter()
+        result = dd.generate_daily_digest(two_phase=True, incremental=False, checkpoint=False)
+        assert time.perf_counter() - start < 5
+        assert calls["wait"] == [] and calls["enrich"] == []
+        # ENRICH_MODE=auto: en dos fases hype/títulos viajan en el mismo batch
+        assert calls["extra"] == [["hype-0", "titles-0"]]
+        assert result["stats"]["analysis_pending"]
+        json_path = dd.digest_json_path(result["filepath"])
+        assert calls["poller"] == [json_path]
+        with open(result["filepath"], encoding="utf-8") as f:
+            published = f.read()
+        assert "GPT-5 anunciado" in published and "⏳ en curso" in published
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        assert data["analysis"] == dict(data["analysis"], status="pending", batch_id="batch_1")
+
+        # Fase dos
+        dd.poll_digest_analysis(json_path, check_interval=0)
+        assert calls["wait"] == ["batch_1"]
+        with open(result["filepath"], encoding="utf-8") as f:
+            patched = f.read()
+        assert "Análisis del batch" in patched and "GPT-5 en el batch" in patched
+        assert calls["enrich"] == []
+        assert "⏳ en curso" not in patched and "_Análisis en progreso..._" not in patched
+        assert patched.splitlines()[0] == published.splitlines()[0]  # misma fecha
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        assert data["analysis"]["status"] == "complete"
+        assert data["batch_results"][0]["title"] == "GPT-5 anunciado"
+        assert dd.poll_pending_digests() == []
+
+    _run(calls, body)
+
+
+def test_failed_batch_is_marked_and_not_polled_again():
+    calls = {"wait": [], "enrich": [], "poller": [], "extra": [], "batch_fails": True}
+
+    def body():
+        result = dd.generate_daily_digest(two_phase=True, incremental=False, checkpoint=False,
+                                          use_advanced_features=False)
+        assert dd.poll_pending_digests(check_interval=0) == [dd.digest_json_path(result["filepath"])]
+        with open(dd.digest_json_path(result["filepath"]), encoding="utf-8") as f:
+            assert json.load(f)["analysis"]["status"] == "failed"
+        assert dd.poll_pending_digests() == [] and calls["enrich"] == []
+
+    _run(calls, body)
+
+
+def test_poller_does_not_overwrite_newer_digest_of_the_same_day():
+    calls = {"wait": [], "enrich": [], "poller": [], "extra": []}
+
+    def body():
+        result = dd.generate_daily_digest(two_phase=True, incremental=False, checkpoint=False,
+                                          use_advanced_features=False)
+        json_path = dd.digest_json_path(result["filepath"])
+
+        def wait(batch_id, check_interval, max_wait):
+            # Mientras el poller espera, el cron publica otro digest del mismo día
+            dd.analyze_articles_batch = lambda articles, focus, extra_prompts=None: "batch_2"
+            dd.generate_daily_digest(two_phase=True, incremental=False, checkpoint=False,
+                                     use_advanced_features=False)
+            return [{"id": "article-0-https://e.com/a", "content": "Análisis viejo"}]
+
+        dd.wait_for_batch = wait
+        dd.poll_digest_analysis(json_path, check_interval=0)
+        with open(json_path, encoding="utf-8") as f:
+            analysis = json.load(f)["analysis"]
+        assert analysis["status"] == "pending" and analysis["batch_id"] == "batch_2"
+        with open(result["filepath"], encoding="utf-8") as f:
+            assert "Análisis viejo" not in f.read()
+
+    _run(calls, body)
+
+
+def test_single_phase_json_is_complete():
+    calls = {"wait": [], "enrich": [], "poller": [], "extra": []}
+
+    def body():
+        result = dd.generate_daily_digest(incremental=False, checkpoint=False)
+        assert calls["poller"] == [] and calls["wait"] == ["batch_1"]
+        # Una fase: hype/títulos con llamadas directas mientras se espera el batch
+        assert calls["extra"] == [[]] and calls["enrich"] == [1]
+        assert "GPT-5 lo cambia todo" in result["digest"]
+        with open(dd.digest_json_path(result["filepath"]), encoding="utf-8") as f:
+            assert json.load(f)["analysis"]["status"] == "complete"
+
+    _run(calls, body)
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
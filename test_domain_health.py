@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del circuit breaker por dominio (domain_health.py) - sin red ni API keys
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import domain_health as dh
+
+
+def _fresh_state():
+    dh.DOMAIN_HEALTH_PATH = os.path.join(tempfile.mkdtemp(), "health.json")
+    dh._state = None
+    dh._probing.clear()
+    dh._touched.clear()
+
+
+def test_breaker_opens_then_half_open_probe_closes_it():
+    _fresh_state()
+    url = "https://slow.example/a"
+    for _ in range(dh.DOMAIN_FAIL_THRESHOLD):
+        assert dh.allow(url)
+        dh.record(url, False, 25.0)
+    assert dh.is_open(url) and not dh.allow(url)
+
+    # Cooldown vencido: una sola prueba pasa
+    dh._load()["slow.example"]["opened_at"] = time.time() - dh.DOMAIN_COOLDOWN_SECONDS - 1
+    assert not dh.is_open(url)
+    assert dh.allow(url)
+    assert not dh.allow("https://slow.example/b")
+    dh.record(url, True, 1.0)
+    assert dh.stats()["slow.example"]["state"] == dh.CLOSED
+
+
+def test_failed_probe_doubles_cooldown():
+    _fresh_state()
+    url = "https://flaky.example/"
+    for _ in range(dh.DOMAIN_FAIL_THRESHOLD):
+        dh.record(url, False, 1.0)
+    dh._load()["flaky.example"]["opened_at"] = 0
+    assert dh.allow(url)
+    dh.record(url, False, 1.0)
+    assert dh.stats()["flaky.example"]["cooldown"] == dh.DOMAIN_COOLDOWN_SECONDS * 2
+
+
+def test_timeout_adapts_to_p95_and_persists():
+    _fresh_state()
+    url = "https://fast.example/x"
+    assert dh.timeout_for(url, 25) == 25
+    for _ in range(10):
+        dh.record(url, True, 0.5)
+    assert dh.timeout_for(url, 25) == max(dh.DOMAIN_MIN_TIMEOUT, 0.5 * dh.DOMAIN_TIMEOUT_FACTOR + 1.0)
+
+    dh.save()
+    with open(dh.DOMAIN_HEALTH_PATH, encoding="utf-8") as f:
+        assert json.load(f)["fast.example"]["samples"] == 10
+
+
+def test_saves_from_another_process_are_merged():
+    _fresh_state()
+    dh.record("https://a.example/x", True, 0.5)
+    dh.record("https://shared.example/x", True, 0.5)
+    dh.save()
+    dh.record("https://b.example/x", False, 1.0)
+    # Otro proceso registra otros dominios y guarda entretanto
+    script = (
+        "import domain_health as dh\n"
+        "dh.record('https://c.example/x', True, 2.0)\n"
+        "for _ in range(3): dh.record('https://shared.example/x', False, 1.0)\n"
+        "dh.save()\n"
+    )
+    env = dict(os.environ, DOMAIN_HEALTH_PATH=dh.DOMAIN_HEALTH_PATH,
+               PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, timeout=60)
+    dh.save()
+    with open(dh.DOMAIN_HEALTH_PATH, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert set(saved) == {"a.example", "b.example", "c.example", "shared.example"}
+    assert saved["b.example"]["consecutive_failures"] == 1
+    # El otro proceso fue el último en registrar shared.example: su circuito abierto se conserva
+    assert saved["shared.example"]["state"] == dh.OPEN
+    assert dh.is_open("https://shared.example/y")
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
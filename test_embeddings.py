@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test de los proveedores de embeddings (embeddings.py) y de novelty con el
+backend local - sin red ni API keys
+"""
+
+import json
+import os
+import tempfile
+
+import embeddings
+import novelty_checker
+from embeddings import LocalEmbedder
+
+
+def _local(**kw):
+    return LocalEmbedder(path=os.path.join(tempfile.mkdtemp(), "model.npz"), **kw)
+
+
+def _cos(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+class _Offline:
+    """Proveedor remoto sin red"""
+    local = False
+    signature = "openai:test"
+    novelty_threshold = 0.75
+
+    def embed(self, texts):
+        raise ConnectionError("sin red")
+
+
+def test_provider_selection_per_subsystem():
+    old = dict(os.environ)
+    try:
+        os.environ.pop("OPENAI_API_KEY", None)
+        os.environ["RAG_EMBED_PROVIDER"] = "openai"
+        assert embeddings.provider_for("novelty") == "local"  # auto sin key
+        assert embeddings.provider_for("rag") == "openai"
+        os.environ["OPENAI_API_KEY"] = "sk-test"
+        assert embeddings.provider_for("novelty") == "openai"
+        os.environ["NOVELTY_EMBED_PROVIDER"] = "otro"
+        try:
+            embeddings.provider_for("novelty")
+            assert False
+        except ValueError:
+            pass
+    finally:
+        os.environ.clear()
+        os.environ.update(old)
+
+
+def test_local_embeddings_are_normalized_and_semantic():
+    e = _local()
+    a, b, c = e.embed([
+        "OpenAI lanza GPT-4o con voz en tiempo real",
+        "GPT-4o de OpenAI ya conversa por voz en tiempo real",
+        "Samsung desarrolla memoria HBM4 para chips",
+    ])
+    assert len(a) == embeddings.LOCAL_EMBED_DIM
+    assert abs(_cos(a, a) - 1.0) < 1e-3
+    assert _cos(a, b) > 0.4 > _cos(a, c)
+    assert e.embed(["", "x"])[0] == [0.0] * e.dim
+    # El lote no cambia el resultado de cada texto
+    assert e.embed_one("GPT-4o de OpenAI ya conversa por voz en tiempo real") == b
+
+
+def test_fit_idf_svd_and_reload():
+    e = _local(dim=512, svd_dim=16)
+    unfitted = e.signature
+    corpus = [f"noticia {i} sobre modelos de lenguaje y chips de {w}" for i, w in
+              enumerate(["nvidia", "amd", "intel", "apple", "google", "meta"] * 10)]
+    info = e.fit(corpus)
+    assert info["svd_dim"] == 16 and e.signature != unfitted
+    assert len(e.embed_one("chips de nvidia")) == 16
+
+    reloaded = LocalEmbedder(dim=512, svd_dim=16, path=e.path)
+    assert reloaded.signature == e.signature
+    assert reloaded.embed_one("chips de nvidia") == e.embed_one("chips de nvidia")
+    # Otro LOCAL_EMBED_DIM ignora el modelo guardado
+    assert LocalEmbedder(dim=256, path=e.path).signature.startswith("local:256:0:0")
+
+
+def test_align_reembeds_other_providers_locally():
+    e = _local()
+    items = [{"id": "a", "text": "chips de nvidia", "embedding": [0.1, 0.2]},
+             {"id": "b", "text": "ya local", "embedding": [1.0], "embed_provider": e.signature}]
+    aligned = embeddings.align(items, e)
+    assert len(aligned[0]["embedding"]) == e.dim and aligned[1]["embedding"] == [1.0]
+    assert embeddings.align(items, _Offline())[0]["embedding"] is None
+
+
+def test_novelty_batch_local_and_offline_fallback():
+    original = novelty_checker.HISTORY_FILE
+    novelty_checker.HISTORY_FILE = os.path.join(tempfile.mkdtemp(), "history.json")
+    try:
+        with open(novelty_checker.HISTORY_FILE, "w", encoding="utf-8") as f:
+            # Historial viejo con vectores de OpenAI: se re-embebe el tema
+            json.dump([{"topic": "Meta publica Llama 3.1 405B como modelo abierto",
+                        "embedding": [0.5, 0.5], "covered_date": "2099-01-01"}], f)
+        topics = ["Llama 3.1 de 405B: Meta libera su modelo abierto más grande",
+                  "Samsung desarrolla memoria HBM4 para chips de IA"]
+        results = novelty_checker.check_novelty_batch(topics, embedder=_local())
+        assert [r["is_novel"] for r in results] == [False, True]
+        assert results[0]["similar_topics"][0]["topic"].startswith("Meta publica")
+
+        fallback = novelty_checker.check_novelty_batch(topics, embedder=_Offline())
+        assert [r["is_novel"] for r in fallback] == [False, True]
+        assert fallback[0]["embed_provider"].startswith("local:")
+    finally:
+        novelty_checker.HISTORY_FILE = original
+
+
+def test_dense_ranking_skips_mismatched_vectors():
+    import hybrid_search
+
+    items = [{"embedding": [1.0, 0.0]}, {"embedding": None}, {"embedding": [0.0, 1.0, 0.0]}]
+    ranking = hybrid_search.dense_ranking([1.0, 0.0], items, 3)
+    assert ranking[0] == (0, 1.0) and all(score == 0.0 for _, score in ranking[1:])
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
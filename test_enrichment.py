@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del análisis avanzado del digest (hype/títulos): pool acotado, timeout
+por llamada, límite compartido de api.openai.com y envío por Batch API -
+sin red ni API keys (cliente de OpenAI simulado)
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import advanced_features
+import batch_processor
+import daily_digest_optimized as dd
+import http_client
+
+ARTICLES = [{"title": f"Modelo {i} supera el benchmark", "content": "paper con código en github", "url": f"u{i}"}
+            for i in range(5)]
+
+
+class _FakeClient:
+    """chat.completions.create que tarda 'delay' (o 'slow' si el prompt lo pide)"""
+
+    def __init__(self, delay=0.2, slow=10.0):
+        self.delay = delay
+        self.slow = slow
+        self.active = 0
+        self.peak = 0
+        self.options = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    def create(self, **kw):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            slow = "Modelo 3" in kw["messages"][1]["content"] and kw["max_tokens"] == 800  # títulos
+            time.sleep(min(self.slow, self.options[-1]["timeout"]) if slow else self.delay)
+            if slow:
+                raise TimeoutError("request timed out")
+            if kw["max_tokens"] == 400:
+                text = json.dumps({"substance_score": 8, "hype_score": 2, "verdict": "substance",
+                                   "reasoning": "ok", "red_flags": [], "green_flags": ["paper"]})
+            else:
+                text = json.dumps({"titles": [{"title": "Título", "viral_potential": 7}],
+                                   "thumbnail_ideas": ["idea"]})
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _with_client(client, body):
+    original = advanced_features._get_client
+    advanced_features._get_client = lambda: client
+    try:
+        return body()
+    finally:
+        advanced_features._get_client = original
+
+
+def test_enrichment_runs_concurrently_with_call_timeouts():
+    client = _FakeClient(delay=0.2)
+
+    def body():
+        start = time.perf_counter()
+        enrichment = dd.enrich_articles(ARTICLES, concurrency=10, timeout=0.5)
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.8  # 10 llamadas de 0.2s (serie: 2s); la lenta corta en 0.5s
+        assert client.peak == 10 and client.options[0]["timeout"] == 0.5
+        assert all(e["hype_analysis"]["verdict"] == "substance" for e in enrichment)
+        assert enrichment[0]["video_titles"][0]["title"] == "Título"
+        # La llamada que agotó su timeout usa el respaldo (título genérico)
+        assert "Lo Que Necesitas Saber" in enrichment[3]["video_titles"][0]["title"]
+
+    _with_client(client, body)
+
+
+def test_concurrency_is_bounded_by_pool_and_shared_limit():
+    client = _FakeClient(delay=0.05)
+
+    def body():
+        dd.enrich_articles(ARTICLES, concurrency=3, timeout=0.3)
+        assert client.peak == 3
+        http_client.configure_domain("api.openai.com", concurrency=2)
+        try:
+            client.peak = 0
+            dd.enrich_articles(ARTICLES, concurrency=10, timeout=0.3)
+            assert client.peak == 2
+        finally:
+            http_client.configure_domain("api.openai.com", concurrency=16)
+
+    _with_client(client, body)
+
+
+def test_enrichment_through_batch_api():
+    prompts = dd.enrichment_prompts(ARTICLES, limit=2)
+    assert [p["id"] for p in prompts] == ["hype-0", "titles-0", "hype-1", "titles-1"]
+
+    original = batch_processor.BATCH_DIR
+    batch_processor.BATCH_DIR = tempfile.mkdtemp()
+    try:
+        path = batch_processor.create_batch_request(
+            [{"id": "article-0-u0", "user": "analiza"}] + prompts, max_tokens=300)
+        with open(path, encoding="utf-8") as f:
+            bodies = {r["custom_id"]: r["body"] for r in map(json.loads, f)}
+        assert bodies["article-0-u0"]["max_tokens"] == 300 and "response_format" not in bodies["article-0-u0"]
+        assert bodies["hype-0"]["max_tokens"] == 400 and bodies["hype-0"]["temperature"] == 0.3
+        assert bodies["titles-1"]["response_format"] == {"type": "json_object"}
+    finally:
+        batch_processor.BATCH_DIR = original
+
+    raw = [
+        {"id": "article-0-u0", "content": "análisis 0"},
+        {"id": "article-1-u1", "content": "análisis 1"},
+        {"id": "hype-1", "content": json.dumps({"substance_score": 6, "hype_score": 4, "verdict": "mixed"})},
+        {"id": "titles-0", "content": "no es json"},
+    ]
+    results = dd.attach_analysis(raw, ARTICLES, [])
+    assert [r["title"] for r in results] == [ARTICLES[0]["title"], ARTICLES[1]["title"]]
+    assert results[1]["hype_analysis"]["verdict"] == "mixed" and "video_titles" not in results[1]
+    assert "Lo Que Necesitas Saber" in results[0]["video_titles"][0]["title"]
+
+
+def test_tight_timeout_only_applies_to_hype_and_titles():
+    client = _FakeClient(delay=0.0)
+
+    def body():
+        advanced_features.analyze_hype_vs_substance("Modelo 1", "paper")
+        advanced_features.generate_video_titles("Modelo 1")
+        assert client.options == [
+            {"timeout": advanced_features.ADVANCED_CALL_TIMEOUT, "max_retries": advanced_features.ADVANCED_MAX_RETRIES},
+        ] * 2
+        # La competencia conserva el timeout y los reintentos por defecto del cliente
+        advanced_features.analyze_competition("Modelo 1")
+        assert len(client.options) == 2
+
+    _with_client(client, body)
+
+
+def test_enrich_mode():
+    old = os.environ.get("ENRICH_MODE")
+    try:
+        os.environ.pop("ENRICH_MODE", None)
+        assert dd.enrich_in_batch(True) and not dd.enrich_in_batch(False)
+        os.environ["ENRICH_MODE"] = "batch"
+        assert dd.enrich_in_batch(False)
+        os.environ["ENRICH_MODE"] = "concurrent"
+        assert not dd.enrich_in_batch(True)
+        os.environ["ENRICH_MODE"] = "otro"
+        try:
+            dd.enrich_in_batch()
+            assert False
+        except ValueError:
+            pass
+    finally:
+        if old is None:
+            os.environ.pop("ENRICH_MODE", None)
+        else:
+            os.environ["ENRICH_MODE"] = old
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
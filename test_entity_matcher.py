@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del matcher de entidades (entity_matcher.py) - sin red ni API keys
+"""
+
+from entity_matcher import EntityMatcher, default_matcher
+
+
+def test_scan_counts_per_document_and_aggregate():
+    m = default_matcher()
+    scan = m.scan(iter([
+        "OpenAI lanza GPT-4o; OpenAI compite con Anthropic",
+        "Hugging Face y Mistral publican agentes con RAG. GPT-4o y gpt-4 comparados",
+    ]))
+    assert scan["per_document"][0] == {"OpenAI": 2, "gpt-4o": 1, "Anthropic": 1}
+    assert scan["mentions"]["gpt-4o"] == 2 and scan["mentions"]["gpt-4"] == 1
+    assert scan["documents"]["gpt-4o"] == 2
+    assert scan["mentions"]["Hugging Face"] == 1
+
+
+def test_entity_in_several_categories():
+    m = default_matcher()
+    cats = m.by_category(m.count("Mistral y Midjourney; Claude 3.5 y Claude"))
+    assert cats["companies"]["Mistral"] == 1 and cats["models"]["Mistral"] == 1
+    assert cats["models"]["Midjourney"] == 1
+    assert cats["models"]["claude 3.5"] == 1 and cats["models"]["claude"] == 1
+
+
+def test_whole_words_only():
+    m = EntityMatcher({"ai": {"patterns": ["ai"], "categories": ["t"]},
+                       "open source": {"patterns": [r"open\s+source"], "categories": ["t"]}})
+    assert m.count("He said the AI is open  source, not a trail") == {"ai": 1, "open source": 1}
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
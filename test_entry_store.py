@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del índice incremental de entradas (entry_store.py) - sin red ni API keys
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from entry_store import EntryStore, entry_key, mark_processed
+
+
+def test_entries_are_registered_once_and_persisted():
+    path = os.path.join(tempfile.mkdtemp(), "entries.json")
+    store = EntryStore(path)
+    key = entry_key("http://feed/a", "guid-1")
+    first = store.add(key, "http://feed/a", {"title": "A", "published": datetime.now().isoformat()})
+    again = store.add(key, "http://feed/a", {"title": "otro"})
+    assert again is first and again["post"]["title"] == "A"
+    store.save()
+
+    reloaded = EntryStore(path)
+    assert key in reloaded and len(reloaded) == 1
+    assert reloaded.get(key)["post"]["entry_key"] == key
+
+
+def test_window_and_processed_state():
+    path = os.path.join(tempfile.mkdtemp(), "entries.json")
+    store = EntryStore(path)
+    now = datetime.now()
+    store.add(entry_key("f", "new"), "f", {"title": "new", "published": now.isoformat()})
+    store.add(entry_key("f", "old"), "f", {"title": "old", "published": (now - timedelta(days=3)).isoformat()})
+    store.add(entry_key("g", "x"), "g", {"title": "x", "published": now.isoformat()})
+    store.save()
+
+    window = store.window(now - timedelta(hours=24), sources=["f"])
+    assert [p["title"] for p in window] == ["new"]
+
+    assert mark_processed(window, path=path) == 1
+    assert EntryStore(path).is_processed(entry_key("f", "new"))
+    assert not EntryStore(path).is_processed(entry_key("g", "x"))
+
+
+def test_saves_from_another_process_are_merged():
+    path = os.path.join(tempfile.mkdtemp(), "entries.json")
+    now = datetime.now().isoformat()
+    store = EntryStore(path)
+    store.add(entry_key("f", "a"), "f", {"title": "a", "published": now})
+    store.add(entry_key("f", "b"), "f", {"title": "b", "published": now})
+    store.save()
+    store.add(entry_key("f", "c"), "f", {"title": "c", "published": now})
+    # Otro proceso (p.ej. el digest) marca 'a' y agrega 'd' entretanto
+    script = (
+        "from entry_store import EntryStore, entry_key\n"
+        f"store = EntryStore({path!r})\n"
+        "store.mark_processed([entry_key('f', 'a')])\n"
+        "store.add(entry_key('f', 'd'), 'f', {'title': 'd'})\n"
+        "store.save()\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, timeout=60)
+    store.mark_processed([entry_key("f", "b")])
+    store.save()
+
+    reloaded = EntryStore(path)
+    assert sorted(rec["post"]["title"] for rec in reloaded._entries.values()) == ["a", "b", "c", "d"]
+    assert reloaded.is_processed(entry_key("f", "a")) and reloaded.is_processed(entry_key("f", "b"))
+    assert not reloaded.is_processed(entry_key("f", "c"))
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
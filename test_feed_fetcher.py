@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test de la descarga concurrente de feeds (feed_fetcher.py), del GET
+condicional, de la ingestión RSS incremental y del deadline de noticias -
+sin red ni API keys: http_client.request (y DDGS) se sustituyen por
+respuestas preparadas
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import feed_fetcher
+import http_client
+
+
+class _Server:
+    """Sustituto de http_client.request: handler(url, headers) -> (status, headers, body) o excepción"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def __call__(self, method, url, timeout=None, retries=None, max_bytes=None, headers=None, **kw):
+        with self._lock:
+            self.requests.append((url, dict(headers or {})))
+        status, resp_headers, body = self.handler(url, headers or {})
+        return http_client.Response(url, status, resp_headers, body, "utf-8", 0.0)
+
+    def __enter__(self):
+        self._original = http_client.request
+        http_client.request = self
+        return self
+
+    def __exit__(self, *exc):
+        http_client.request = self._original
+
+
+def test_fetch_many_runs_in_parallel_and_isolates_errors():
+    def handler(url, headers):
+        if url.endswith("/boom"):
+            raise ConnectionError("conexión rechazada")
+        if url.endswith("/500"):
+            return 500, {}, b"error"
+        time.sleep(0.3)
+        return 200, {}, url.encode()
+
+    urls = [f"https://f{i}.com/ok" for i in range(4)] + ["https://x.com/boom", "https://y.com/500"]
+    with _Server(handler):
+        start = time.perf_counter()
+        results = feed_fetcher.fetch_many(urls, timeout=5, deadline=5)
+        assert time.perf_counter() - start < 0.9  # el más lento, no la suma (4 x 0.3s)
+    assert set(results) == set(urls)
+    for url in urls[:4]:
+        assert results[url]["ok"] and results[url]["content"] == url.encode()
+    assert not results["https://x.com/boom"]["ok"] and "rechazada" in results["https://x.com/boom"]["error"]
+    assert results["https://y.com/500"] == dict(results["https://y.com/500"], ok=False, status=500,
+                                               error="HTTP 500")
+
+
+def test_fetch_many_global_deadline_marks_stragglers():
+    def handler(url, headers):
+        time.sleep(1.0 if "lento" in url else 0.0)
+        return 200, {}, b"ok"
+
+    with _Server(handler):
+        start = time.perf_counter()
+        results = feed_fetcher.fetch_many(["https://lento.com/f", "https://rapido.com/f"], timeout=5, deadline=0.3)
+        assert time.perf_counter() - start < 0.8
+    assert results["https://rapido.com/f"]["ok"]
+    assert not results["https://lento.com/f"]["ok"] and "deadline" in results["https://lento.com/f"]["error"]
+
+
+RSS = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>F</title>
+<item><guid>g1</guid><title>GPT-5 anunciado</title><link>https://e.com/a</link>
+<description>OpenAI presenta GPT-5</description></item>
+<item><guid>g2</guid><title>Llama 4</title><link>https://e.com/b</link>
+<description>Meta publica Llama 4</description></item>
+</channel></rss>"""
+
+
+def _conditional(url, headers):
+    # 200 con validadores la primera vez; 304 sin cuerpo si el cliente los reenvía
+    if headers.get("If-None-Match") == '"v1"':
+        return 304, {}, b""
+    return 200, {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}, RSS
+
+
+def test_conditional_get_reuses_cached_parse_on_304():
+    parsed = []
+
+    def parse(content):
+        parsed.append(len(content))
+        return [{"id": "g1", "title": "GPT-5 anunciado"}]
+
+    original = feed_fetcher.FEED_CACHE_DIR
+    feed_fetcher.FEED_CACHE_DIR = tempfile.mkdtemp()
+    try:
+        with _Server(_conditional) as server:
+            first = feed_fetcher.fetch_feeds_cached(["https://f.com/rss"], parse)["https://f.com/rss"]
+            second = feed_fetcher.fetch_feeds_cached(["https://f.com/rss"], parse)["https://f.com/rss"]
+        assert server.requests[0][1].get("If-None-Match") is None
+        assert server.requests[1][1]["If-None-Match"] == '"v1"'
+        assert server.requests[1][1]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+        assert first["ok"] and not first["from_cache"] and first["bytes_downloaded"] == len(RSS)
+        assert second == dict(second, ok=True, from_cache=True, status=304, bytes_downloaded=0,
+                              bytes_saved=len(RSS), entries=first["entries"])
+        assert parsed == [len(RSS)]  # el 304 no vuelve a parsear
+    finally:
+        feed_fetcher.FEED_CACHE_DIR = original
+
+
+def test_rss_ingestion_takes_304_feeds_from_entry_store():
+    import ai_content_research as acr
+    import text_index
+    import url_canon
+
+    seen = {"https://e.com/b": ["read"]}  # leída por el agente: no es duplicado
+
+    def register(url, source):
+        is_new = url not in seen
+        seen.setdefault(url, []).append(source)
+        return url, is_new
+
+    parsed = []
+    parse = acr._parse_feed_entries
+    patched = {
+        (acr, "RSS_SOURCES"): {"substacks": [{"name": "F", "author": "A", "rss": "https://f.com/rss"}]},
+        (acr, "_parse_feed_entries"): lambda content: parsed.append(1) or parse(content),
+        (url_canon, "resolve"): lambda url: url,
+        (url_canon, "register"): register,
+        (url_canon, "key"): lambda url: url,
+        (url_canon, "sources"): lambda url: list(seen.get(url, [])),
+        (text_index, "index_document"): lambda *a: True,
+        (feed_fetcher, "FEED_CACHE_DIR"): os.path.join("cache", "feeds"),
+    }
+    original = {target: getattr(*target) for target in patched}
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())  # entry_store y la cache de feeds en rutas relativas
+    try:
+        for (module, name), value in patched.items():
+            setattr(module, name, value)
+        with _Server(_conditional) as server:
+            first = acr.fetch_all_rss_feeds(hours=10 ** 6)
+            # Se registran al guardar la entrada
+            assert seen == {"https://e.com/a": ["rss"], "https://e.com/b": ["read", "rss"]}
+            second = acr.fetch_all_rss_feeds(hours=10 ** 6)
+        assert len(server.requests) == 2 and parsed == [1]
+        assert sorted(p["title"] for p in first["new_posts"]) == ["GPT-5 anunciado", "Llama 4"]
+        # Segunda corrida: 304, nada nuevo, la ventana sale del índice de entradas
+        assert second["stats"]["not_modified"] == ["F"] and second["stats"]["errors"] == []
+        assert second["new_posts"] == []
+        assert sorted(p["title"] for p in second["all_posts"]) == ["GPT-5 anunciado", "Llama 4"]
+    finally:
+        os.chdir(cwd)
+        for (module, name), value in original.items():
+            setattr(module, name, value)
+
+
+def test_news_deadline_scores_a_copy_of_pending_items():
+    import types
+
+    import ai_content_research as acr
+    import domain_health
+    import text_index
+    import tools
+
+    release = threading.Event()
+
+    class _DDGS:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def news(self, query, **kw):
+            return [{"url": "https://lento.com/a", "title": "OpenAI launch", "body": "snippet"}]
+
+    def read_url_clean(args):
+        release.wait(timeout=5)  # sigue corriendo después del deadline
+        return {"ok": True, "data": {"text": "texto completo"}, "error": ""}
+
+    patched = {
+        (acr, "NEWS_DEADLINE"): 0.3,
+        (tools, "read_url_clean"): read_url_clean,
+        (domain_health, "is_open"): lambda url: False,
+        (text_index, "index_document"): lambda *a: True,
+    }
+    original = {target: getattr(*target) for target in patched}
+    module = sys.modules.get("duckduckgo_search")
+    sys.modules["duckduckgo_search"] = types.SimpleNamespace(DDGS=_DDGS)
+    try:
+        for (target, name), value in patched.items():
+            setattr(target, name, value)
+        results = acr.search_ai_news_advanced()
+        assert [r["full_text"] for r in results] == ["snippet"]
+        release.set()
+        time.sleep(0.2)  # el worker termina: no toca el resultado ya puntuado
+        assert results[0]["full_text"] == "snippet" and "relevance_score" in results[0]
+    finally:
+        release.set()
+        for (target, name), value in original.items():
+            setattr(target, name, value)
+        if module is None:
+            sys.modules.pop("duckduckgo_search", None)
+        else:
+            sys.modules["duckduckgo_search"] = module
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del cliente HTTP compartido (http_client.py) contra un servidor local
+"""
+
+import http.server
+import threading
+import time
+
+import http_client
+
+_HITS = {"flaky": 0}
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/flaky":
+            _HITS["flaky"] += 1
+            if _HITS["flaky"] == 1:
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+        body = b"x" * (4096 if self.path == "/big" else 10)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve() -> str:
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{srv.server_port}"
+
+
+def test_retries_503_then_succeeds():
+    base = _serve()
+    r = http_client.get(base + "/flaky", retries=2)
+    assert r.status_code == 200 and r.content == b"x" * 10
+    assert http_client.domain_stats()["127.0.0.1"]["retries"] >= 1
+
+
+def test_response_size_cap():
+    base = _serve()
+    try:
+        http_client.get(base + "/big", max_bytes=1024, retries=0)
+        assert False, "debió fallar por tamaño"
+    except http_client.HTTPError as e:
+        assert "demasiado grande" in str(e)
+
+
+def test_token_bucket_spaces_requests():
+    http_client.configure_domain("bucket.test", concurrency=4, rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        with http_client.limit("http://bucket.test/x"):
+            pass
+    # 1 token inicial + 4 a 20/s => ~0.2s
+    assert time.monotonic() - start >= 0.15
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test de la búsqueda híbrida del RAG (hybrid_search.py) - sin red ni API keys
+"""
+
+import os
+import tempfile
+
+import hybrid_search
+from hybrid_search import rescore, rrf, search
+
+
+ITEMS = [
+    {"id": "https://a.com/llama3", "text": "Llama 3 tiene una ventana de contexto de 8 mil tokens.", "embedding": [1.0, 0.0, 0.0]},
+    {"id": "https://a.com/llama31", "text": "Llama 3.1 amplía la ventana de contexto a 128 mil tokens.", "embedding": [1.0, 0.0, 0.0]},
+    {"id": "https://b.com/chips", "text": "Nvidia presenta chips para inferencia.", "embedding": [0.0, 1.0, 0.0]},
+]
+
+
+def _embed(text):
+    # Proxy denso que no distingue versiones: todo lo de contexto es igual
+    return [1.0, 0.0, 0.0] if "contexto" in text else [0.0, 1.0, 0.0]
+
+
+def _lexical(items=ITEMS):
+    return hybrid_search.lexical_index(os.path.join(tempfile.mkdtemp(), "rag.jsonl"), items)
+
+
+def test_rrf_sums_weighted_reciprocal_ranks():
+    fused = rrf([(1.0, [1, 2]), (2.0, [2, 3])], k=60)
+    assert fused[2] == 1.0 / 62 + 2.0 / 61
+    assert max(fused, key=fused.get) == 2
+
+
+def test_rescore_rewards_exact_versions():
+    query = "contexto de Llama 3.1"
+    assert rescore(query, ITEMS[1]["text"]) > rescore(query, ITEMS[0]["text"])
+    assert rescore("", "lo que sea") == 0.0
+
+
+def test_hybrid_breaks_dense_ties_with_lexical_and_rescore():
+    index = _lexical()
+    hits = search("ventana de contexto Llama 3.1", ITEMS, _embed, index=index, k=2)
+    assert hits[0]["id"] == "https://a.com/llama31"
+    assert hits[0]["dense_rank"] is not None and hits[0]["lexical_rank"] is not None
+
+
+def test_modes_and_fallbacks():
+    index = _lexical()
+    assert search("nvidia chips", ITEMS, None, index=index, k=1, mode="lexical")[0]["chunk"] == 2
+    assert search("inferencia", ITEMS, _embed, index=None, k=1, mode="dense")[0]["chunk"] == 2
+    # Sin índice léxico el modo híbrido cae a denso
+    assert search("chips", ITEMS, _embed, index=None, k=1)[0]["lexical_rank"] is None
+    try:
+        search("x", ITEMS, _embed, mode="otro")
+        assert False
+    except ValueError:
+        pass
+
+
+def test_lexical_index_syncs_incrementally_and_rebuilds():
+    path = os.path.join(tempfile.mkdtemp(), "rag.jsonl")
+    idx = hybrid_search.lexical_index(path, ITEMS[:2])
+    assert len(idx) == 2
+    idx = hybrid_search.lexical_index(path, ITEMS)
+    assert len(idx) == 3 and os.path.exists(path + ".bm25")
+    # El JSONL se reescribió: las posiciones cambian y el índice se rehace
+    idx = hybrid_search.lexical_index(path, ITEMS[2:])
+    assert len(idx) == 1 and idx.search("nvidia")[0]["key"] == "0"
+
+
+def test_concurrent_searches_sync_the_lexical_index_once():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    import text_index
+
+    items = [{"id": f"https://e.com/{i}", "text": f"documento {i} sobre modelos abiertos"} for i in range(2000)]
+    path = os.path.join(tempfile.mkdtemp(), "rag.jsonl")
+    saves, start = [], threading.Barrier(8)
+    original = text_index.TextIndex.save
+
+    def save(self, force=False):
+        saves.append(threading.current_thread().name)
+        return original(self, force)
+
+    def search(_):
+        start.wait()  # las 8 llamadas llegan a la vez con el índice vacío
+        return hybrid_search.lexical_index(path, items)
+
+    text_index.TextIndex.save = save
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            indexes = list(pool.map(search, range(8)))
+    finally:
+        text_index.TextIndex.save = original
+    assert all(idx is indexes[0] for idx in indexes)
+    assert len(indexes[0]) == 2000 and len(saves) == 1
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Presupuesto de tiempo de arranque (python -X importtime)
+- Importar el agente/CLI no debe cargar dependencias pesadas
+- Importar módulos del digest no debe crear clientes ni directorios
+Ajusta el presupuesto con IMPORT_BUDGET_MS (por defecto 150 ms)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "150"))
+
+# Solo deben cargarse en el primer uso de la herramienta correspondiente
+HEAVY_MODULES = (
+    "requests", "duckduckgo_search", "trafilatura", "feedparser",
+    "openai", "numpy", "bs4", "httpx",
+)
+
+
+def _importtime(module: str, cwd: str):
+    """Devuelve (cumulative_ms, módulos importados) de 'import <module>'"""
+    env = dict(os.environ, PYTHONPATH=HERE)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=cwd, env=env,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    cumulative_us = 0
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit():
+            continue  # cabecera
+        name = parts[2]
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(parts[1])
+    return cumulative_us / 1000.0, imported
+
+
+def test_agent_import_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        ms, imported = _importtime("agent", tmp)
+    heavy = sorted(set(HEAVY_MODULES) & imported)
+    assert not heavy, f"import agent cargó dependencias pesadas: {heavy}"
+    assert ms < BUDGET_MS, f"import agent tardó {ms:.1f} ms (presupuesto {BUDGET_MS:.0f} ms)"
+
+
+def test_main_import_is_lazy():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, imported = _importtime("main", tmp)
+    assert "agent" not in imported, "main.py no debe importar el agente antes de parsear args"
+
+
+def test_digest_modules_have_no_import_side_effects():
+    for module in ("novelty_checker", "batch_processor", "cache_manager"):
+        with tempfile.TemporaryDirectory() as tmp:
+            _, imported = _importtime(module, tmp)
+            created = os.listdir(tmp)
+        assert "openai" not in imported, f"{module} creó el cliente de OpenAI al importar"
+        assert not created, f"{module} creó directorios al importar: {created}"
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
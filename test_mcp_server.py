@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del servidor MCP (mcp_server.py) sin stdio: despacho concurrente con
+respuestas fuera de orden casadas por id, batches estilo JSON-RPC y alias
+históricos - sin red ni API keys (call_tool se sustituye por esperas)
+"""
+
+import asyncio
+import io
+import json
+import threading
+import time
+
+import mcp_server
+
+
+class _Out(io.BytesIO):
+    """stdout del protocolo: registra cada write() para comprobar frames completos"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+        return super().write(data)
+
+
+def _fake_call_tool(calls):
+    def call_tool(name, args):
+        calls.append((name, threading.current_thread().name))
+        time.sleep(args.get("delay", 0))
+        return {"ok": True, "data": {"tool": name, "tag": args.get("tag")}, "error": ""}
+    return call_tool
+
+
+def _serve(requests, calls):
+    """Despacha las requests como main() (sin esperar respuestas) y devuelve las líneas escritas"""
+    original = mcp_server.call_tool, mcp_server._OUT, mcp_server._WRITE_LOCK
+    out = _Out()
+
+    async def run():
+        mcp_server._WRITE_LOCK = asyncio.Lock()
+        tasks = []
+        for req in requests:
+            tasks.append(asyncio.create_task(mcp_server._process(req)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    try:
+        mcp_server.call_tool = _fake_call_tool(calls)
+        mcp_server._OUT = out
+        asyncio.run(run())
+    finally:
+        mcp_server.call_tool, mcp_server._OUT, mcp_server._WRITE_LOCK = original
+    assert all(w.endswith(b"\n") and w.count(b"\n") == 1 for w in out.writes)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_responses_come_back_out_of_order_with_their_ids():
+    calls = []
+    start = time.perf_counter()
+    lines = _serve([
+        {"id": 1, "method": "web_search", "params": {"tag": "lento", "delay": 0.5}},
+        {"id": 2, "method": "web_search", "params": {"tag": "rapido", "delay": 0.0}},
+    ], calls)
+    assert time.perf_counter() - start < 0.9
+    assert [line["id"] for line in lines] == [2, 1]
+    assert {line["id"]: line["data"]["tag"] for line in lines} == {1: "lento", 2: "rapido"}
+    # Las herramientas bloqueantes corren en el pool, no en el event loop
+    assert all(thread.startswith("mcp-worker") for _, thread in calls)
+
+
+def test_concurrent_responses_are_whole_lines():
+    calls = []
+    requests = [{"id": i, "method": "web_search", "params": {"tag": "x" * 5000, "delay": 0.01}}
+                for i in range(20)]
+    lines = _serve(requests, calls)
+    assert sorted(line["id"] for line in lines) == list(range(20))
+
+
+def test_errors_keep_the_id():
+    lines = _serve([{"id": "a", "method": "no_existe"}, {"id": "b", "method": "web_search", "params": [1]},
+                    "no es un objeto"], [])
+    by_id = {line.get("id"): line for line in lines}
+    assert "unknown method" in by_id["a"]["error"] and "params" in by_id["b"]["error"]
+    assert by_id[None] == {"ok": False, "error": "request must be a JSON object"}
+
+
+def test_batch_mixes_requests_and_notifications():
+    calls = []
+    lines = _serve([[
+        {"id": 1, "method": "web_search", "params": {"tag": "lento", "delay": 0.3}},
+        {"method": "web_search", "params": {"tag": "notificacion"}},
+        {"id": 2, "method": "memory.get", "params": {"key": "k"}},
+    ]], calls)
+    assert len(lines) == 1 and isinstance(lines[0], list)
+    results = lines[0]
+    # Una respuesta por elemento, en el orden del batch; sin id las notificaciones
+    assert [r.get("id") for r in results] == [1, None, 2]
+    assert results[0]["data"]["tag"] == "lento" and results[1]["data"]["tag"] == "notificacion"
+    assert results[2]["data"]["tool"] == "memory_get"
+    assert len(calls) == 3
+
+
+def test_empty_batch_is_an_error():
+    assert _serve([[]], []) == [{"ok": False, "error": "empty batch"}]
+
+
+def test_aliases_keep_their_historical_defaults():
+    seen = {}
+
+    def call_tool(name, args):
+        seen[name] = args
+        return {"ok": True, "data": None, "error": ""}
+
+    original = mcp_server.call_tool
+    mcp_server.call_tool = call_tool
+    try:
+        asyncio.run(mcp_server.handle({"method": "rag.search", "params": {"query": "q"}}))
+        asyncio.run(mcp_server.handle({"method": "rag.upsert_url", "params": {"url": "https://e.com"}}))
+        assert seen == {"rag_search": {"query": "q", "k": 3},
+                        "rag_upsert_url": {"url": "https://e.com", "max_chars": 6000}}
+        asyncio.run(mcp_server.handle({"method": "rag.search", "params": {"query": "q", "k": 7}}))
+        assert seen["rag_search"]["k"] == 7
+        # El nombre directo de la herramienta no recibe defaults del alias
+        asyncio.run(mcp_server.handle({"method": "rag_search", "params": {"query": "q"}}))
+        assert seen["rag_search"] == {"query": "q"}
+    finally:
+        mcp_server.call_tool = original
+    listed = mcp_server.list_tools()["data"]
+    assert listed["aliases"]["rag.search"] == "rag_search"
+    assert {"rag_search", "web_search"} <= {t["name"] for t in listed["tools"]}
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
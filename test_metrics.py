@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del exportador Prometheus (metrics.py) - sin red ni API keys
+"""
+
+import threading
+
+from metrics import Counter, Histogram, render_prometheus
+
+
+def test_counter_merges_thread_shards():
+    c = Counter("test_threads_total", "test", ("tool",))
+
+    def work():
+        for _ in range(1000):
+            c.inc(tool="web_search")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert c.values() == {("web_search",): 8000}
+    assert 'test_threads_total{tool="web_search"} 8000' in render_prometheus()
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("test_latency_seconds", "test", ("tool",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 3.0):
+        h.observe(v, tool="x")
+
+    text = render_prometheus()
+    assert 'test_latency_seconds_bucket{tool="x",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{tool="x",le="1"} 3' in text
+    assert 'test_latency_seconds_bucket{tool="x",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count{tool="x"} 4' in text
+    assert 'test_latency_seconds_sum{tool="x"} 4.05' in text
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
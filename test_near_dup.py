@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test de agrupación de casi-duplicados (near_dup.py) - sin red ni API keys
+"""
+
+import near_dup
+
+GPT5 = [
+    "OpenAI launches GPT-5, its most capable model yet. The company said GPT-5 is available today for ChatGPT users",
+    "OpenAI launches GPT-5: its most capable model yet — the company said GPT-5 is available today to ChatGPT users",
+    "OpenAI unveils GPT-5, its most capable model. The company said GPT-5 is available today for all ChatGPT users",
+]
+OTHER = [
+    "Anthropic raises $2B in new funding round led by Google",
+    "Mistral releases open-weight model for coding",
+]
+
+
+def test_cluster_groups_rewrites_and_keeps_distinct_stories():
+    clusters = near_dup.cluster(GPT5 + OTHER + [""])
+    assert clusters == [[0, 1, 2], [3], [4], [5]]
+
+
+def test_collapse_keeps_richest_and_carries_sources():
+    items = [
+        {"title": GPT5[0], "summary": "", "source_name": "TechCrunch"},
+        {"title": GPT5[1], "summary": "", "source_name": "The Verge", "full_text": "x" * 500},
+        {"title": OTHER[0], "summary": "", "source_name": "VentureBeat"},
+    ]
+    stories = near_dup.collapse(
+        items,
+        text_of=lambda it: it["title"],
+        richness=lambda it: len(it.get("full_text", "")),
+        source_of=lambda it: {"name": it["source_name"], "url": "", "title": it["title"]},
+    )
+    assert len(stories) == 2
+    assert stories[0]["source_name"] == "The Verge" and stories[0]["cluster_size"] == 2
+    assert [s["name"] for s in stories[0]["sources"]] == ["TechCrunch", "The Verge"]
+    assert stories[1]["cluster_size"] == 1
+
+
+def test_signatures_are_deterministic():
+    a = near_dup.MinHasher().signature(near_dup.shingles(GPT5[0]))
+    b = near_dup.MinHasher().signature(near_dup.shingles(GPT5[0]))
+    assert (a == b).all()
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
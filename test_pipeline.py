@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del ejecutor de etapas (pipeline.py) y del digest como grafo - sin red
+ni API keys (las etapas con red se sustituyen por esperas)
+"""
+
+import time
+
+from pipeline import Pipeline, StageError
+
+
+def _sleep(seconds, value):
+    def fn(*_, **__):
+        time.sleep(seconds)
+        return value
+    return fn
+
+
+def test_independent_stages_run_concurrently():
+    p = Pipeline("t")
+    p.add("a", _sleep(0.3, 1), ["x"], ["a"])
+    p.add("b", _sleep(0.3, 2), ["x"], ["b"])
+    p.add("c", lambda a, b: a + b, ["a", "b"], ["c"], pool="cpu")
+    ctx = p.run({"x": 0})
+    assert ctx["c"] == 3
+    s = p.summary()
+    assert s["wall_seconds"] < 0.5 < s["stage_seconds_sum"]
+    assert s["critical_path"][-1] == "c" and len(s["critical_path"]) == 2
+    assert abs(s["critical_path_seconds"] - 0.3) < 0.1
+    assert set(s["stages"]) == {"a", "b", "c"}
+
+
+def test_multiple_outputs_and_decorator():
+    p = Pipeline("t")
+
+    @p.stage(inputs=["n"], outputs=["half", "double"], pool="cpu")
+    def split(n):
+        return {"half": n / 2, "double": n * 2}
+
+    assert p.run({"n": 4}) == {"n": 4, "half": 2.0, "double": 8}
+    p.add("bad", lambda n: 1, ["n"], ["x", "y"])
+    try:
+        p.run({"n": 4})
+        assert False
+    except StageError as e:
+        assert e.stage == "bad" and isinstance(e.error, ValueError)
+
+
+def test_rerun_skips_resolved_stages():
+    calls = []
+    p = Pipeline("t")
+    p.add("fetch", lambda: calls.append("fetch") or [1, 2], [], ["items"])
+    p.add("count", lambda items: calls.append("count") or len(items), ["items"], ["count"], pool="cpu")
+    p.add("other", lambda: calls.append("other") or "x", [], ["other"])
+    ctx = p.run()
+    assert sorted(calls) == ["count", "fetch", "other"]
+
+    calls.clear()
+    assert p.run(ctx) == ctx and calls == []
+    assert p.run(ctx, rerun=["fetch"])["count"] == 2 and calls == ["fetch", "count"]
+    calls.clear()
+    p.run({}, targets=["count"])
+    assert calls == ["fetch", "count"]
+    assert p.plan({"items": [1]}, targets=["count"]) == ["count"]
+
+
+def test_validation_errors():
+    p = Pipeline("t")
+    p.add("a", lambda b: b, ["b"], ["a"])
+    p.add("b", lambda a: a, ["a"], ["b"])
+    for bad in (lambda: p.order(), lambda: p.add("c", lambda: 0, [], ["a"]),
+                lambda: p.add("d", lambda: 0, pool="gpu")):
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+    q = Pipeline("t")
+    q.add("a", lambda missing: missing, ["missing"])
+    try:
+        q.run()
+        assert False
+    except KeyError:
+        pass
+
+
+def test_failure_does_not_wait_for_running_stages():
+    p = Pipeline("t")
+    p.add("slow", _sleep(1.0, 1), [], ["slow"])
+    p.add("boom", lambda: 1 / 0, [], ["boom"])
+    start = time.perf_counter()
+    try:
+        p.run()
+        assert False
+    except StageError as e:
+        assert e.stage == "boom" and isinstance(e.error, ZeroDivisionError)
+    assert time.perf_counter() - start < 0.8
+    assert p.timings["boom"]["status"] == "error"
+
+
+def test_digest_graph_overlaps_fetch_and_batch_wait():
+    import daily_digest_optimized as dd
+
+    story = {"title": "GPT-5 anunciado", "summary": "OpenAI presenta GPT-5", "link": "https://e.com/a",
+             "source_name": "E"}
+    patched = {
+        "fetch_rss": _sleep(0.3, {"all_posts": [story], "unprocessed_posts": [story]}),
+        "fetch_web": _sleep(0.3, []),
+        "merge_content": lambda rss_data, web_articles: {
+            "rss_posts": rss_data["all_posts"], "web_articles": web_articles, "total_sources": 1},
+        "filter_and_rank_topics": lambda topics, max_topics, use_advanced_scoring: [
+            {"topic": t, "novelty_score": 0.9} for t in topics],
+        "submit_and_wait_batch": _sleep(0.4, [{"id": "article-0-https://e.com/a", "content": "Análisis"}]),
+        "enrich_articles": _sleep(0.4, [{"video_titles": [{"title": "GPT-5 lo cambia todo"}]}]),
+        "add_to_history": lambda **kw: None,
+    }
+    original = {name: getattr(dd, name) for name in patched}
+    try:
+        for name, fn in patched.items():
+            setattr(dd, name, fn)
+        result = dd.generate_daily_digest(save_to_file=False, incremental=False, checkpoint=False)
+        assert "Análisis" in result["digest"] and "GPT-5 lo cambia todo" in result["digest"]
+        timing = result["stats"]["pipeline"]
+        assert timing["wall_seconds"] < 0.3 + 0.4 + 0.3 < timing["stage_seconds_sum"]
+        assert {"rss", "web", "batch", "enrich"} <= set(timing["stages"])
+
+        # Re-ejecutar solo el formato reutiliza fetch y batch
+        again = dd.generate_daily_digest(save_to_file=False, incremental=False, checkpoint=False,
+                                         context=result["context"], rerun=["format"], targets=["digest"])
+        assert set(again["stats"]["pipeline"]["stages"]) == {"format"}
+        assert again["digest"].count("GPT-5 anunciado") == 1
+    finally:
+        for name, fn in original.items():
+            setattr(dd, name, fn)
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del almacén de HTML crudo (raw_store.py) - sin red ni API keys
+"""
+
+import os
+import tempfile
+
+import raw_store
+import text_index
+
+# Lo extraído alimenta el índice local: que no quede en el repo
+text_index.TEXT_INDEX_PATH = os.path.join(tempfile.mkdtemp(), "text_index.bin")
+
+HTML = ("<html><body><article><h1>Título</h1>"
+        + "<p>Los agentes de IA usan herramientas para leer la web.</p>" * 30
+        + "</article></body></html>").encode("utf-8")
+
+
+def test_canonical_url_drops_tracking_and_fragment():
+    assert raw_store.canonical_url("HTTPS://Example.com:443/a?utm_source=x&b=2&a=1#top") == \
+        "https://example.com/a?a=1&b=2"
+
+
+def test_identical_content_shares_one_blob():
+    raw_store.RAW_STORE_DIR = tempfile.mkdtemp()
+    m1 = raw_store.put("https://a.example/post", HTML)
+    m2 = raw_store.put("https://b.example/copy", HTML)
+    assert m1["sha256"] == m2["sha256"]
+    assert m1["stored_bytes"] < m1["bytes"]
+    assert raw_store.get("https://a.example/post?utm_medium=rss") == HTML
+
+
+def test_extraction_reuses_stored_bytes():
+    raw_store.RAW_STORE_DIR = tempfile.mkdtemp()
+    raw_store.put("https://a.example/post", HTML)
+    # Sin red: si fetch intentara descargar, la URL .example fallaría
+    text = raw_store.extract_text("https://a.example/post")
+    assert "agentes de IA" in text
+    assert raw_store.extract_text("https://a.example/post")[:50] == text[:50]
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
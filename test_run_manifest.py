@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del manifiesto por ejecución (run_manifest.py) y de
+generate_daily_digest(resume=True) tras un kill durante la espera del
+batch - sin red ni API keys
+"""
+
+import os
+import tempfile
+
+import run_manifest
+from run_manifest import RunManifest
+
+
+def test_manifest_checkpoints_and_reload():
+    base = tempfile.mkdtemp()
+    run = RunManifest(config={"hours_back": 24}, base=base)
+    run.record_stage("fetch", {"items": [1, 2], "meta": {"n": 2}}, seconds=0.5)
+    run.set_batch("analysis", "batch_abc", articles=2)
+
+    again = run_manifest.latest_incomplete(base)
+    assert again.run_id == run.run_id and again.config == {"hours_back": 24}
+    assert again.outputs() == {"items": [1, 2], "meta": {"n": 2}}
+    assert again.batch("analysis") == "batch_abc" and again.batch("otro") is None
+
+    again.finish("complete")
+    assert run_manifest.latest_incomplete(base) is None
+    assert RunManifest(run.run_id, base=base).status == "complete"
+
+
+def test_resume_window_and_attempts():
+    base = tempfile.mkdtemp()
+    old = RunManifest("run_old", base=base)
+    old.data["created_at"] = "2000-01-01T00:00:00"
+    old.finish("failed")  # guardar refresca updated_at, no created_at
+    assert run_manifest.latest_incomplete(base) is None
+
+    run = RunManifest("run_new", base=base)
+    for attempt in (2, 3):
+        run.finish("failed")
+        again = run_manifest.latest_incomplete(base, max_attempts=3)
+        assert again.run_id == "run_new"
+        again.resume()
+        assert again.attempts == attempt and again.status == "running"
+        run = again
+    run.finish("failed")
+    assert run_manifest.latest_incomplete(base, max_attempts=3) is None
+    assert RunManifest("run_new", base=base).status == "abandoned"
+
+
+def test_prune_keeps_latest_complete_runs():
+    base = tempfile.mkdtemp()
+    for i in range(4):
+        run = RunManifest(f"run_{i}", base=base)
+        run.data["status"] = "complete"
+        run.save()
+    RunManifest("run_9", base=base)  # sin terminar: no se borra
+    assert run_manifest.prune(base, keep=2) == 2
+    assert sorted(os.listdir(base)) == ["run_2", "run_3", "run_9"]
+
+
+def test_resume_reattaches_to_pending_batch():
+    import daily_digest_optimized as dd
+
+    story = {"title": "GPT-5 anunciado", "summary": "OpenAI presenta GPT-5", "link": "https://e.com/a"}
+    calls = {"fetch": 0, "submit": 0, "wait": []}
+
+    def fetch_rss(hours_back):
+        calls["fetch"] += 1
+        return {"all_posts": [story], "unprocessed_posts": [story]}
+
+    def submit(articles, focus, extra_prompts=None):
+        calls["submit"] += 1
+        return f"batch_{calls['submit']}"
+
+    def wait(batch_id, check_interval, max_wait):
+        calls["wait"].append(batch_id)
+        if len(calls["wait"]) == 1:
+            raise KeyboardInterrupt  # el cron mata el proceso durante la espera
+        return [{"id": "article-0-https://e.com/a", "content": "Análisis del batch"}]
+
+    patched = {
+        "fetch_rss": fetch_rss,
+        "fetch_web": lambda hours_back: [],
+        "merge_content": lambda rss_data, web_articles: {
+            "rss_posts": rss_data["all_posts"], "web_articles": web_articles, "total_sources": 1},
+        "filter_and_rank_topics": lambda topics, max_topics, use_advanced_scoring: [
+            {"topic": t, "novelty_score": 0.9} for t in topics],
+        "analyze_articles_batch": submit,
+        "wait_for_batch": wait,
+        "add_to_history": lambda **kw: None,
+    }
+    original = {name: getattr(dd, name) for name in patched}
+    original_dir = run_manifest.DIGEST_RUNS_DIR
+    run_manifest.DIGEST_RUNS_DIR = tempfile.mkdtemp()
+    try:
+        for name, fn in patched.items():
+            setattr(dd, name, fn)
+        config = dict(save_to_file=False, incremental=False, use_advanced_features=False, hours_back=12)
+        try:
+            dd.generate_daily_digest(**config)
+            assert False
+        except Exception as e:
+            assert getattr(e, "stage", None) == "batch"
+
+        run = run_manifest.latest_incomplete()
+        assert run.batch("analysis") == "batch_1" and "batch" not in run.completed_stages()
+        assert "novelty" in run.completed_stages()
+
+        result = dd.generate_daily_digest(resume=True, hours_back=48)
+        assert result["run_id"] == run.run_id
+        assert calls["fetch"] == 1 and calls["submit"] == 1 and calls["wait"] == ["batch_1", "batch_1"]
+        assert "Análisis del batch" in result["digest"]
+        assert result["context"]["hours_back"] == 12  # configuración de la ejecución original
+        assert run_manifest.latest_incomplete() is None
+    finally:
+        run_manifest.DIGEST_RUNS_DIR = original_dir
+        for name, fn in original.items():
+            setattr(dd, name, fn)
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del índice BM25 local (text_index.py) - sin red ni API keys
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from text_index import TextIndex, analyze, _decode, _varint
+
+
+def _index():
+    return TextIndex(os.path.join(tempfile.mkdtemp(), "index.bin"))
+
+
+def test_analyzer_folds_accents_plurals_and_stopwords():
+    assert analyze("Los agentes de IA y la regulación") == ["agente", "ia", "regulacion"]
+    assert analyze("The new models of GPT-4o") == ["model", "gpt-4o"]
+
+
+def test_varint_postings_roundtrip():
+    buf = bytearray()
+    prev = 0
+    for doc, tf in [(0, 1), (5, 200), (70000, 3)]:
+        _varint(doc - prev, buf)
+        _varint(tf, buf)
+        prev = doc
+    assert _decode(bytes(buf)) == [(0, 1), (5, 200), (70000, 3)]
+
+
+def test_bm25_ranking_and_persistence():
+    idx = _index()
+    idx.add("https://a.com/1", "Regulación europea de la IA", "La Unión Europea aprueba reglas para modelos de IA.", "rss:A")
+    idx.add("https://b.com/2", "Nvidia presenta nuevos chips", "Los chips aceleran la inferencia de modelos.", "read")
+    idx.add("https://c.com/3", "Agents in production", "Companies deploy AI agents with tools and memory.", "news")
+    assert idx.search("regulacion IA europa")[0]["url"] == "https://a.com/1"
+    assert idx.search("agent")[0]["url"] == "https://c.com/3"
+    assert [r["url"] for r in idx.search("modelos", source="read")] == ["https://b.com/2"]
+    idx.save()
+
+    reloaded = TextIndex(idx.path)
+    assert len(reloaded) == 3
+    assert reloaded.search("chips nvidia")[0]["title"] == "Nvidia presenta nuevos chips"
+
+
+def test_richer_version_replaces_and_compacts():
+    idx = _index()
+    idx.add("https://a.com/1", "Titular", "resumen corto", "rss:A")
+    assert not idx.add("https://a.com/1", "", "resumen", "news")  # más corto: no reindexa
+    assert idx.add("https://a.com/1", "Titular", "resumen corto y ahora el artículo completo sobre robótica", "read")
+    assert len(idx) == 1 and idx.search("robotica")[0]["source"] == "read"
+    idx.save()
+    assert idx.stats()["deleted"] == 0
+    assert len(TextIndex(idx.path).search("titular")) == 1
+
+
+def test_saves_from_several_processes_are_merged():
+    path = os.path.join(tempfile.mkdtemp(), "idx.bin")
+    server, digest = TextIndex(path), TextIndex(path)  # dos procesos con el índice cargado
+    server.add("https://e.com/a", "Llama 4 de Meta", "Meta publica Llama 4", "read")
+    server.save()
+    digest.add("https://e.com/b", "GPT-5 anunciado", "OpenAI presenta GPT-5", "rss")
+    digest.save()
+    server.add("https://e.com/c", "Gemini 2", "Google lanza Gemini 2", "web")
+    server.save()
+    merged = TextIndex(path)
+    assert len(merged) == 3
+    for query, url in (("llama", "https://e.com/a"), ("openai", "https://e.com/b"), ("gemini", "https://e.com/c")):
+        assert merged.search(query)[0]["url"] == url
+
+    # Procesos reales guardando a la vez
+    script = (
+        "import sys; from text_index import TextIndex\n"
+        "idx = TextIndex(sys.argv[1])\n"
+        "for i in range(20):\n"
+        "    idx.add(f'https://p{sys.argv[2]}.com/{i}', f'doc {i}', f'proceso{sys.argv[2]} texto {i}', 'rss')\n"
+        "    idx.save()\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    procs = [subprocess.Popen([sys.executable, "-c", script, path, str(n)], env=env) for n in range(4)]
+    assert all(p.wait(timeout=60) == 0 for p in procs)
+    final = TextIndex(path)
+    assert len(final) == 3 + 4 * 20
+    assert all(len(final.search(f"proceso{n}", k=50)) == 20 for n in range(4))
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test de la serie temporal de entidades (trend_series.py) - sin red ni API keys
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+
+from trend_series import TrendSeries
+
+
+def _history(path, days=15):
+    """Historia sintética: 'steady' estable, 'rising' se dispara los últimos 3 días"""
+    today = date.today()
+    series = TrendSeries(path)
+    for back in range(days, -1, -1):
+        counts = {"steady": 10 + back % 2}
+        if back <= 2:
+            counts["rising"] = 12
+        elif back % 4 == 0:
+            counts["rising"] = 1
+        series.record(counts, day=today - timedelta(days=back))
+    series.save()
+    return series
+
+
+def test_rising_beats_steady_and_survives_reload():
+    path = os.path.join(tempfile.mkdtemp(), "series.npz")
+    _history(path)
+    series = TrendSeries(path)
+    rising = series.rising()
+    assert [r["key"] for r in rising] == ["rising"]
+    assert rising[0]["velocity"] > 10 and rising[0]["zscore"] > 2
+
+
+def test_missing_days_are_not_zeros():
+    path = os.path.join(tempfile.mkdtemp(), "series.npz")
+    today = date.today()
+    series = TrendSeries(path)
+    # Corridas cada 3 días: los huecos no deben bajar la media base
+    for back in (18, 15, 12, 9, 6, 3, 0):
+        series.record({"steady": 10}, day=today - timedelta(days=back))
+    s = series.scores()
+    i = s["keys"].index("steady")
+    assert s["baseline"][i] == 10 and s["velocity"][i] == 0
+
+
+def test_same_day_overwrites_and_short_history_is_empty():
+    path = os.path.join(tempfile.mkdtemp(), "series.npz")
+    series = TrendSeries(path)
+    series.record({"a": 5})
+    series.record({"a": 2, "b": 1})
+    assert series.counts[series.keys.index("a"), -1] == 2
+    assert series.rising() == [] and series.scores() == {}
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test de canonicalización de URLs e índice compartido (url_canon.py) - sin red ni API keys
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import url_canon
+
+
+def _fresh_index():
+    url_canon.URL_INDEX_PATH = os.path.join(tempfile.mkdtemp(), "url_index.json")
+    url_canon._state = None
+
+
+def test_variants_share_one_canonical_url():
+    variants = [
+        "https://www.theverge.com/2025/1/1/story?utm_source=rss&utm_medium=feed",
+        "http://theverge.com/2025/1/1/story/",
+        "https://m.theverge.com/2025/1/1/story/amp#comments",
+        "https://www-theverge-com.cdn.ampproject.org/c/s/www.theverge.com/2025/1/1/story/amp",
+        "https://www.google.com/amp/s/www.theverge.com/2025/1/1/story.amp",
+    ]
+    assert {url_canon.canonical_url(v) for v in variants} == {"https://theverge.com/2025/1/1/story"}
+    # Lo que sí cambia el contenido se conserva
+    assert url_canon.canonical_url("https://a.com/p?id=2&page=1") == "https://a.com/p?id=2&page=1"
+    assert url_canon.canonical_url("https://a.com/p?page=1&id=2") == "https://a.com/p?id=2&page=1"
+
+
+def test_learned_redirects_apply_without_network():
+    _fresh_index()
+    url_canon.learn_redirect("http://feedproxy.google.com/~r/blog/abc", "https://blog.example.com/post?utm_source=feed")
+    assert url_canon.key("http://feedproxy.google.com/~r/blog/abc") == "https://blog.example.com/post"
+    assert url_canon.resolve("http://feedproxy.google.com/~r/blog/abc") == "https://blog.example.com/post"
+    # Un host que redirigió a otro queda marcado como redirector
+    url_canon.learn_redirect("https://lnk.example.org/x1", "https://news.example.com/a")
+    assert url_canon.is_redirector("https://lnk.example.org/other")
+
+
+def test_register_dedupes_across_sources_and_persists():
+    _fresh_index()
+    key, is_new = url_canon.register("https://www.example.com/a?utm_campaign=x", "rss")
+    assert is_new and key == "https://example.com/a"
+    _, is_new = url_canon.register("http://example.com/a/", "web")
+    assert not is_new
+    url_canon.save()
+    url_canon._state = None
+    assert url_canon.sources("https://example.com/a#x") == ["rss", "web"]
+
+
+def test_saves_from_another_process_are_merged():
+    _fresh_index()
+    url_canon.register("https://example.com/a", "rss")
+    url_canon.save()
+    url_canon.register("https://example.com/b", "read")
+    # Otro proceso (p.ej. el servidor) guarda entretanto con su propia copia
+    script = (
+        "import url_canon\n"
+        "url_canon.register('https://example.com/a', 'rag')\n"
+        "url_canon.register('https://example.com/c', 'web')\n"
+        "url_canon.save()\n"
+    )
+    env = dict(os.environ, URL_INDEX_PATH=url_canon.URL_INDEX_PATH,
+               PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, timeout=60)
+    url_canon.save()
+    url_canon._state = None
+    assert url_canon.sources("https://example.com/a") == ["rss", "rag"]
+    assert url_canon.sources("https://example.com/b") == ["read"]
+    assert url_canon.sources("https://example.com/c") == ["web"]
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test del almacén cuantizado de vectores (vector_store.py) y de su uso en
+RAG y en el historial de novedad - sin red ni API keys
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+import vector_store
+from vector_store import VectorStore, quantize_int8
+
+
+def _data(n=600, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _truth(x, q, k=10):
+    return set(np.argsort(-(x @ q))[:k].tolist())
+
+
+def test_int8_roundtrip_error_is_small():
+    x = _data()
+    codes, scale = quantize_int8(x)
+    assert codes.dtype == np.int8 and codes.nbytes == x.nbytes // 4
+    assert np.abs(codes * scale[:, None] - x).max() < scale.max()
+
+
+def test_int8_search_persistence_and_append():
+    x = _data()
+    path = os.path.join(tempfile.mkdtemp(), "store")
+    store = VectorStore(path, mode="int8")
+    assert store.add([str(i) for i in range(500)], x[:500]) == 500
+    store.save()
+
+    reloaded = VectorStore(path, mode="int8")
+    assert len(reloaded) == 500
+    assert reloaded.add(["0", "500", "500"], x[[0, 500, 500]]) == 1  # claves repetidas se ignoran
+    reloaded.save()
+    again = VectorStore(path, mode="int8")
+    hits = again.search(x[500], k=10)
+    assert hits[0] == ("500", hits[0][1]) and abs(hits[0][1] - 1.0) < 1e-2
+    assert {int(k) for k, _ in again.search(x[7] + 0.1 * x[8], k=10)} == _truth(x[:501], x[7] + 0.1 * x[8])
+    assert np.allclose(again.vectors(["3"])[0], x[3], atol=1e-3)
+
+
+def test_interrupted_save_leftovers_are_discarded():
+    x = _data()
+    path = os.path.join(tempfile.mkdtemp(), "store")
+    store = VectorStore(path)
+    store.add(["a"], x[:1])
+    store.save()
+    with open(os.path.join(path, "f16.bin"), "ab") as f:
+        f.write(b"\x00" * 10)  # append sin meta.json: guardado cortado
+    store = VectorStore(path)
+    store.add(["b"], x[1:2])
+    store.save()
+    assert np.allclose(VectorStore(path).vectors(["b"])[0], x[1], atol=1e-3)
+
+
+def test_pq_adc_with_rescoring_meets_recall_target():
+    x = _data(n=2000, dim=64)
+    path = os.path.join(tempfile.mkdtemp(), "store")
+    store = VectorStore(path, mode="pq")
+    store.add([str(i) for i in range(len(x))], x)
+    store.train(subspaces=8)
+    store.save()
+    assert store.stats()["mode"] == "pq" and store.pq.shape == (2000, 8)
+    assert not os.path.exists(os.path.join(path, "i8.bin"))
+
+    reloaded = VectorStore(path, mode="pq")
+    rng = np.random.default_rng(1)
+    queries = x[rng.choice(len(x), 30, replace=False)] + 0.3 * rng.standard_normal((30, 64)).astype(np.float32) / 8
+    recall = np.mean([len({int(k) for k, _ in reloaded.search(q, k=10, rescore=200)} & _truth(x, q)) / 10 for q in queries])
+    assert recall >= vector_store.RECALL_TARGET
+    # Vectores nuevos se codifican con el codebook existente
+    reloaded.add(["new"], x[:1] * -1)
+    assert reloaded.search(-x[0], k=1)[0][0] == "new"
+
+
+def test_retain_compacts():
+    x = _data()
+    path = os.path.join(tempfile.mkdtemp(), "store")
+    store = VectorStore(path)
+    store.add([str(i) for i in range(10)], x[:10])
+    store.save()
+    assert store.retain(["2", "5"]) == 8
+    reloaded = VectorStore(path)
+    assert reloaded.keys == ["2", "5"]
+    assert np.allclose(reloaded.vectors(["5"])[0], x[5], atol=1e-3)
+    assert reloaded.retain([]) == 2 and len(VectorStore(path)) == 0
+
+
+def test_saves_from_another_process_are_merged():
+    path = tempfile.mkdtemp()
+    store = VectorStore(path, mode="int8")
+    store.add(["a"], [np.eye(8)[0]])
+    store.save()
+    store.add(["b"], [np.eye(8)[1]])
+    # Otro proceso (p.ej. el MCP) guarda entretanto con su propia copia
+    script = (
+        "import numpy as np\n"
+        "from vector_store import VectorStore\n"
+        f"store = VectorStore({path!r}, mode='int8')\n"
+        "store.add(['c'], [np.eye(8)[2]])\n"
+        "store.save()\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, timeout=60)
+    store.save()
+    for reloaded in (store, VectorStore(path, mode="int8")):
+        assert sorted(reloaded.keys) == ["a", "b", "c"]
+        for key, dim in (("a", 0), ("b", 1), ("c", 2)):
+            assert int(np.argmax(reloaded.vectors([key])[0])) == dim
+            assert reloaded.search(np.eye(8)[dim], k=1)[0][0] == key
+
+
+def test_rag_migration_keeps_positions():
+    import hybrid_search
+    import embeddings
+
+    rag = os.path.join(tempfile.mkdtemp(), "rag.jsonl")
+    with open(rag, "w", encoding="utf-8") as f:
+        for i in range(3):
+            vec = [0.0] * 64
+            vec[i] = 1.0
+            f.write(json.dumps({"id": f"u{i}", "text": f"texto {i}", "embedding": vec}) + "\n")
+    before = os.path.getsize(rag)
+    assert vector_store.migrate_rag(rag) == {"items": 3, "moved": 3}
+    assert os.path.getsize(rag) < before
+    with open(rag, encoding="utf-8") as f:
+        items = [json.loads(line) for line in f]
+    assert all("embedding" not in it for it in items)
+
+    class _Legacy:
+        local = False
+        signature = embeddings.LEGACY_SIGNATURE
+
+    store = hybrid_search.dense_index(rag, items, _Legacy())
+    assert store.search([0.0, 0.0, 1.0] + [0.0] * 61, k=1)[0][0] == "2"
+
+
+def test_concurrent_rag_upserts_keep_vectors_aligned():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    import raw_store
+    import tools
+    import url_canon
+
+    class _Embedder:
+        signature = "test-onehot"
+        started = threading.Barrier(4)
+
+        def embed_one(self, text):
+            self.started.wait(timeout=5)  # todas las llamadas leen el JSONL antes de escribir
+            vec = [0.0] * 8
+            vec[int(text.split()[-1])] = 1.0
+            return vec
+
+    urls = [f"https://e.com/{i}" for i in range(4)]
+    patched = {
+        (tools, "RAG_PATH"): os.path.join(tempfile.mkdtemp(), "rag.jsonl"),
+        (tools, "_embedder"): lambda: _Embedder(),
+        (raw_store, "fetch"): lambda url, timeout: {"content": f"doc {url[-1]}".encode()},
+        (url_canon, "register"): lambda url, source: (url, True),
+    }
+    original = {target: getattr(*target) for target in patched}
+    try:
+        for (module, name), value in patched.items():
+            setattr(module, name, value)
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda u: tools.rag_upsert_url({"url": u}), urls))
+        assert all(r["ok"] for r in results)
+        items = tools._rag_load()
+        store = vector_store.open_store(tools.RAG_PATH + ".vec", _Embedder.signature)
+        assert sorted(store.keys) == ["0", "1", "2", "3"]
+        for pos, item in enumerate(items):
+            n = int(item["text"].split()[-1])
+            assert int(np.argmax(store.vectors([str(pos)])[0])) == n
+    finally:
+        for (module, name), value in original.items():
+            setattr(module, name, value)
+
+
+def test_stale_rag_search_keeps_new_vectors():
+    import hybrid_search
+    import raw_store
+    import tools
+    import url_canon
+
+    class _Embedder:
+        signature = "test-onehot"
+        local = False
+
+        def embed_one(self, text):
+            vec = [0.0] * 8
+            vec[int(text.split()[-1])] = 1.0
+            return vec
+
+    patched = {
+        (tools, "RAG_PATH"): os.path.join(tempfile.mkdtemp(), "rag.jsonl"),
+        (tools, "_embedder"): lambda: _Embedder(),
+        (raw_store, "fetch"): lambda url, timeout: {"content": f"doc {url[-1]}".encode()},
+        (url_canon, "register"): lambda url, source: (url, True),
+    }
+    original = {target: getattr(*target) for target in patched}
+    try:
+        for (module, name), value in patched.items():
+            setattr(module, name, value)
+        assert tools.rag_upsert_url({"url": "https://e.com/0"})["ok"]
+        stale = tools._rag_load()  # un rag_search leyó el JSONL antes de la escritura
+        assert tools.rag_upsert_url({"url": "https://e.com/1"})["ok"]
+        store = hybrid_search.dense_index(tools.RAG_PATH, stale, _Embedder())
+        assert sorted(store.keys) == ["0", "1"]
+        hits = hybrid_search.search("doc 1", stale, _Embedder().embed_one, mode="dense", vectors=store)
+        assert [h["chunk"] for h in hits] == [0]
+    finally:
+        for (module, name), value in original.items():
+            setattr(module, name, value)
+
+
+def test_novelty_history_moves_vectors_out_of_json():
+    import embeddings
+    import novelty_checker
+
+    original = novelty_checker.HISTORY_FILE
+    novelty_checker.HISTORY_FILE = os.path.join(tempfile.mkdtemp(), "history.json")
+    local = embeddings.LocalEmbedder(path=os.path.join(tempfile.mkdtemp(), "m.npz"))
+    try:
+        topic = "Meta publica Llama 3.1 405B como modelo abierto"
+        novelty_checker.save_history([{"topic": topic, "embedding": local.embed_one(topic),
+                                       "embed_provider": local.signature,
+                                       "covered_date": "2099-01-01T00:00:00"}])
+        with open(novelty_checker.HISTORY_FILE, encoding="utf-8") as f:
+            saved = json.load(f)
+        assert "embedding" not in saved[0] and saved[0]["vector_key"]
+        assert os.path.isdir(os.path.join(os.path.dirname(novelty_checker.HISTORY_FILE), "topic_vectors"))
+
+        result = novelty_checker.check_novelty_batch([topic], embedder=local)[0]
+        assert not result["is_novel"] and result["similar_topics"][0]["similarity"] > 0.99
+    finally:
+        novelty_checker.HISTORY_FILE = original
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ PASS - {name}')
@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+"""
+Índice invertido local (BM25) sobre todo lo que el sistema lee
+- Analizador ES/EN: minúsculas, sin acentos, stopwords de ambos idiomas,
+  plural simple ("agentes" -> "agente", "models" -> "model")
+- Postings comprimidos: por término, (salto de doc_id, tf) en varint,
+  solo-append; el archivo completo va además en zlib
+- Incremental: un documento (URL canónica) nuevo solo agrega sus postings;
+  si vuelve con más texto, el anterior queda como borrado y se compacta
+  al guardar
+- Búsqueda BM25 local en milisegundos, sin red (herramienta local_search)
+- Compartido entre procesos (servidor, MCP, digest, poller): al guardar se
+  toma un lock de archivo y, si otro proceso guardó antes, se relee el disco
+  y se re-aplican encima los documentos agregados desde el último guardado
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import file_lock
+
+TEXT_INDEX_PATH = os.getenv("TEXT_INDEX_PATH", os.path.join("cache", "text_index.bin"))
+TEXT_INDEX_RETENTION_DAYS = int(os.getenv("TEXT_INDEX_RETENTION_DAYS", "60"))
+TEXT_INDEX_MAX_CHARS = int(os.getenv("TEXT_INDEX_MAX_CHARS", "20000"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+_SAVE_INTERVAL = 10.0
+_SNIPPET_CHARS = 300
+# Compactar cuando los borrados superan esta fracción
+_COMPACT_RATIO = 0.2
+# Listas de postings decodificadas que se mantienen en memoria
+_DECODED_CACHE = 512
+
+# ---------- Analizador ----------
+
+_ES_STOPWORDS = set(
+    "a al algo algunas algunos ante antes como con contra cual cuales cuando de del desde donde dos el la las los en entre era erais eramos eran es esa esas ese esos esta estaba estabais estabamos estaban estuve estuviera estuviese esto estos estoy etc fue fui ha habeis habiamos habian hablar habia han hasta hay la lo mas me mi mis mucho muy nada ni no nos nosotras nosotros o os otra otro para pero poco por porque que quien quienes se ser si sino sobre solo somos son soy su sus tambien te tiene tienen todo todos tras tu tus un una uno y ya".split()
+)
+_EN_STOPWORDS = set(
+    "a about after all also an and any are as at be been before but by can could did do does for from had has have he her his how i if in into is it its just more most new not of on or our out over said she so than that the their them then there these they this to up was we were what when which who will with would you your".split()
+)
+_STOPWORDS = {unicodedata.normalize("NFKD", w).encode("ascii", "ignore").decode() for w in _ES_STOPWORDS | _EN_STOPWORDS}
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def tokenize_es(text: str) -> List[str]:
+    """Palabras en español (3+ letras, con acentos) sin stopwords: conteo de keywords, no indexado"""
+    text = text.lower()
+    tokens = re.findall(r"[a-záéíóúñü]{3,}", text)
+    return [t for t in tokens if t not in _ES_STOPWORDS]
+
+
+def _fold(text: str) -> str:
+    return unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+
+
+def analyze(text: str) -> List[str]:
+    """Términos indexables (mismo análisis para documentos y consultas)"""
+    terms = []
+    for tok in _TOKEN.findall(_fold(text or "")):
+        if tok in _STOPWORDS or (len(tok) < 2 and not tok.isdigit()):
+            continue
+        if len(tok) > 4 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        terms.append(tok)
+    return terms
+
+
+# ---------- Postings (varint) ----------
+
+def _varint(n: int, out: bytearray) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _decode(buf: bytes) -> List[tuple]:
+    """Lista de (doc_id, tf) de una lista de postings"""
+    out = []
+    doc, i, n = 0, 0, len(buf)
+    while i < n:
+        vals = [0, 0]
+        for j in (0, 1):
+            b = buf[i]
+            i += 1
+            value = b & 0x7F
+            shift = 7
+            # Camino rápido: casi todos los saltos y tf caben en un byte
+            while b >= 0x80:
+                b = buf[i]
+                i += 1
+                value |= (b & 0x7F) << shift
+                shift += 7
+            vals[j] = value
+        doc += vals[0]
+        out.append((doc, vals[1]))
+    return out
+
+
+class TextIndex:
+    """
+    docs: doc_id -> {'key', 'url', 'title', 'source', 'added', 'length', 'chars', 'sha', 'snippet'}
+    postings: término -> bytearray de (salto doc_id, tf)
+    """
+
+    def __init__(self, path: Optional[str] = None, retention_days: Optional[int] = None):
+        self.path = path or TEXT_INDEX_PATH
+        # 0 = sin vencimiento (p.ej. el índice léxico del RAG)
+        self.retention_days = TEXT_INDEX_RETENTION_DAYS if retention_days is None else retention_days
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_save = 0.0
+        # add() con cambios desde el último guardado: se re-aplican si otro
+        # proceso reemplazó el archivo entretanto
+        self._pending: List[tuple] = []
+        self._clear()
+        self._load()
+
+    # --- persistencia ---
+
+    def _clear(self) -> None:
+        self.docs: Dict[int, Dict[str, Any]] = {}
+        self.by_key: Dict[str, int] = {}
+        self.postings: Dict[str, bytearray] = {}
+        self._last_doc: Dict[str, int] = {}
+        self.deleted: set = set()
+        # término -> (bytes decodificados, postings); válido mientras no crezca
+        self._decoded: Dict[str, tuple] = {}
+        self.next_id = 0
+        self.total_length = 0
+        self._stamp = None
+
+    def _load(self) -> None:
+        # stamp antes de leer: si el archivo cambia en medio, el próximo guardado fusiona
+        self._stamp = file_lock.stamp(self.path)
+        if self._stamp is None:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                raw = zlib.decompress(f.read())
+            (meta_len,) = struct.unpack_from("<I", raw, 0)
+            meta = json.loads(raw[4:4 + meta_len].decode("utf-8"))
+            pos = 4 + meta_len
+            postings = {}
+            while pos < len(raw):
+                tlen, plen = struct.unpack_from("<HI", raw, pos)
+                pos += 6
+                term = raw[pos:pos + tlen].decode("utf-8")
+                pos += tlen
+                postings[term] = bytearray(raw[pos:pos + plen])
+                pos += plen
+        except Exception as e:
+            print(f"Warning: Could not load text index: {e}")
+            return
+        self.docs = {int(k): v for k, v in meta["docs"].items()}
+        self.deleted = set(meta.get("deleted", []))
+        self.next_id = meta["next_id"]
+        self.postings = postings
+        self._last_doc = {t: d for t, d in meta.get("last_doc", {}).items()}
+        self.by_key = {d["key"]: i for i, d in self.docs.items() if i not in self.deleted}
+        self.total_length = sum(d["length"] for i, d in self.docs.items() if i not in self.deleted)
+
+    def _merge_from_disk(self) -> None:
+        """Adopta la versión en disco de otro proceso y re-aplica los add() propios"""
+        pending = self._pending
+        self._clear()
+        self._load()
+        for args in pending:
+            self._add(*args)
+
+    def save(self, force: bool = False) -> None:
+        """
+        Escritura atómica bajo lock de archivo (compacta antes si hay muchos
+        borrados o documentos vencidos). Si otro proceso guardó desde nuestra
+        última lectura, se fusiona su versión antes de escribir.
+        """
+        with self._lock:
+            if not self._dirty and not force:
+                return
+            try:
+                with file_lock.locked(self.path):
+                    if file_lock.stamp(self.path) != self._stamp:
+                        self._merge_from_disk()
+                    self._write()
+                self._pending = []
+                self._dirty = False
+            except Exception as e:
+                print(f"Warning: Could not save text index: {e}")
+            self._last_save = time.monotonic()
+
+    def _write(self) -> None:
+        self._expire()
+        if self.deleted and len(self.deleted) > _COMPACT_RATIO * max(1, len(self.docs)):
+            self._compact()
+        meta = json.dumps({
+            "docs": self.docs, "deleted": sorted(self.deleted),
+            "next_id": self.next_id, "last_doc": self._last_doc,
+        }, ensure_ascii=False).encode("utf-8")
+        parts = [struct.pack("<I", len(meta)), meta]
+        for term, buf in self.postings.items():
+            t = term.encode("utf-8")
+            parts.append(struct.pack("<HI", len(t), len(buf)))
+            parts.append(t)
+            parts.append(bytes(buf))
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(b"".join(parts), 6))
+        os.replace(tmp, self.path)
+        self._stamp = file_lock.stamp(self.path)
+
+    def _expire(self) -> None:
+        if not self.retention_days:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        for doc_id, d in self.docs.items():
+            if doc_id not in self.deleted and d["added"] < cutoff:
+                self._delete(doc_id)
+
+    def _compact(self) -> None:
+        """Reescribe los postings sin los documentos borrados (los ids se conservan)"""
+        postings: Dict[str, bytearray] = {}
+        last: Dict[str, int] = {}
+        for term, buf in self.postings.items():
+            out, prev = bytearray(), 0
+            for doc_id, tf in _decode(bytes(buf)):
+                if doc_id in self.deleted:
+                    continue
+                _varint(doc_id - prev, out)
+                _varint(tf, out)
+                prev = doc_id
+            if out:
+                postings[term], last[term] = out, prev
+        for doc_id in self.deleted:
+            self.docs.pop(doc_id, None)
+        self.postings, self._last_doc, self.deleted = postings, last, set()
+        self._decoded = {}
+
+    # --- escritura ---
+
+    def _delete(self, doc_id: int) -> None:
+        d = self.docs[doc_id]
+        self.deleted.add(doc_id)
+        self.total_length -= d["length"]
+        if self.by_key.get(d["key"]) == doc_id:
+            del self.by_key[d["key"]]
+        self._dirty = True
+
+    def add(self, url: str, title: str, text: str, source: str, key: Optional[str] = None) -> bool:
+        """
+        Indexa un documento. Si la URL ya está con el mismo texto o con más
+        texto, solo se actualizan título/fuente (se conserva la versión más rica).
+
+        Returns:
+            True si se (re)indexaron postings
+        """
+        text = (text or "")[:TEXT_INDEX_MAX_CHARS]
+        key = key or url
+        with self._lock:
+            reindexed, changed = self._add(url, title, text, source, key)
+            if changed:
+                self._pending.append((url, title, text, source, key))
+        return reindexed
+
+    def _add(self, url: str, title: str, text: str, source: str, key: str) -> Tuple[bool, bool]:
+        """(postings re-indexados, hubo cambios)"""
+        body = f"{title or ''}\n{text}"
+        sha = hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            current = self.by_key.get(key)
+            if current is not None:
+                d = self.docs[current]
+                if d["sha"] == sha or len(text) <= d["chars"]:
+                    if title and not d["title"]:
+                        d["title"] = title
+                        self._dirty = True
+                        return False, True
+                    return False, False
+                self._delete(current)
+
+            # Título con doble peso: los titulares son la mejor señal
+            terms = analyze(title) * 2 + analyze(text)
+            if not terms:
+                return False, current is not None
+            doc_id = self.next_id
+            self.next_id += 1
+            for term, tf in Counter(terms).items():
+                buf = self.postings.setdefault(term, bytearray())
+                _varint(doc_id - self._last_doc.get(term, 0), buf)
+                _varint(tf, buf)
+                self._last_doc[term] = doc_id
+            snippet = " ".join(text.split())[:_SNIPPET_CHARS]
+            self.docs[doc_id] = {
+                "key": key, "url": url, "title": title or "", "source": source,
+                "added": datetime.now().isoformat(), "length": len(terms),
+                "chars": len(text), "sha": sha, "snippet": snippet,
+            }
+            self.by_key[key] = doc_id
+            self.total_length += len(terms)
+            self._dirty = True
+        return True, True
+
+    # --- lectura ---
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    def search(self, query: str, k: int = 10, since: Optional[str] = None,
+               source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        BM25 sobre el índice.
+
+        Args:
+            query: Texto libre (ES/EN)
+            k: Resultados
+            since: ISO datetime mínimo de indexación
+            source: Prefijo de fuente ('rss', 'read', 'web', ...)
+
+        Returns:
+            [{'key', 'url', 'title', 'source', 'added', 'score', 'snippet'}, ...]
+        """
+        import heapq
+        import math
+
+        terms = list(dict.fromkeys(analyze(query)))
+        with self._lock:
+            n_docs = len(self.by_key)
+            if not terms or not n_docs:
+                return []
+            avgdl = self.total_length / n_docs
+            scores: Dict[int, float] = {}
+            docs, deleted = self.docs, self.deleted
+            kb = BM25_K1 * (1 - BM25_B)
+            kd = BM25_K1 * BM25_B / avgdl
+            for term in terms:
+                buf = self.postings.get(term)
+                if not buf:
+                    continue
+                plist = self._postings(term, buf)
+                if deleted:
+                    plist = [p for p in plist if p[0] not in deleted]
+                if not plist:
+                    continue
+                idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5)) * (BM25_K1 + 1)
+                for doc_id, tf in plist:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf / (tf + kb + kd * docs[doc_id]["length"])
+
+            def keep(doc_id):
+                d = self.docs[doc_id]
+                return (since is None or d["added"] >= since) and (source is None or d["source"].startswith(source))
+
+            top = heapq.nlargest(k, (item for item in scores.items() if keep(item[0])), key=lambda x: x[1])
+            return [
+                {
+                    "key": self.docs[doc_id]["key"],
+                    "url": self.docs[doc_id]["url"],
+                    "title": self.docs[doc_id]["title"],
+                    "source": self.docs[doc_id]["source"],
+                    "added": self.docs[doc_id]["added"],
+                    "score": round(score, 4),
+                    "snippet": self.docs[doc_id]["snippet"],
+                }
+                for doc_id, score in top
+            ]
+
+    def _postings(self, term: str, buf: bytearray) -> List[tuple]:
+        cached = self._decoded.get(term)
+        if cached is not None and cached[0] == len(buf):
+            return cached[1]
+        plist = _decode(bytes(buf))
+        if len(self._decoded) >= _DECODED_CACHE:
+            self._decoded.clear()
+        self._decoded[term] = (len(buf), plist)
+        return plist
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self.by_key),
+                "terms": len(self.postings),
+                "deleted": len(self.deleted),
+                "postings_bytes": sum(len(b) for b in self.postings.values()),
+            }
+
+
+# ---------- Índice compartido ----------
+
+_index: Optional[TextIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> TextIndex:
+    """Índice del proceso (se carga del disco en el primer uso)"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = TextIndex()
+        return _index
+
+
+def index_document(url: str, title: str, text: str, source: str) -> bool:
+    """
+    Alimenta el índice desde los caminos de descarga (RSS, lectura, web).
+    Nunca lanza: indexar es un efecto secundario.
+    """
+    if not url or not (title or text):
+        return False
+    try:
+        import url_canon
+
+        idx = get_index()
+        added = idx.add(url, title, text, source, key=url_canon.key(url))
+        if time.monotonic() - idx._last_save > _SAVE_INTERVAL:
+            idx.save()
+        return added
+    except Exception as e:
+        print(f"Warning: Could not index {url}: {e}")
+        return False
+
+
+def _save_on_exit() -> None:
+    if _index is not None:
+        _index.save()
+
+
+atexit.register(_save_on_exit)
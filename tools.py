@@ -1,19 +1,23 @@
 # -*- coding: utf-8 -*-
 # Herramientas del agente y del servidor MCP
 # - Memoria simple en proceso
-# - RAG simple basado en JSONL + embeddings de OpenAI (opcional)
+# - RAG simple basado en JSONL + embeddings (OpenAI o backend local)
+# - Dependencias pesadas (requests, DDGS, trafilatura, OpenAI) se importan
+#   en el primer uso: importar este módulo solo registra el catálogo
 
 import os
 import json
-import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Tuple
 from datetime import datetime
 
-import requests
-import re
 from collections import Counter
 from urllib.parse import urlparse
 
+import metrics
+
 # ---------- Utilidades comunes ----------
 
 def _ok(ok: bool, data: Any, error: str) -> Dict[str, Any]:
@@ -39,27 +43,21 @@ def memory_get(args: Dict[str, Any]) -> Dict[str, Any]:
 
 # ---------- RAG (opcional) ----------
 
-EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
 RAG_PATH = os.getenv("RAG_PATH", "rag_store.jsonl")
-_client = None
 
+# La clave del vector es la posición de la línea en el JSONL: leer, añadir el
+# vector y escribir la línea van juntos (el MCP ejecuta herramientas en hilos)
+_RAG_LOCK = threading.Lock()
 
-def _get_client():
-    """Crea el cliente de OpenAI de forma diferida para no romper si no está instalado."""
-    global _client
-    if _client is None:
-        try:
-            from openai import OpenAI  # type: ignore
-        except Exception as e:
-            raise RuntimeError(f"OpenAI SDK no disponible: {e}")
-        _client = OpenAI()  # usa OPENAI_API_KEY del entorno
-    return _client
+
+def _embedder():
+    """Proveedor de embeddings del RAG (RAG_EMBED_PROVIDER, ver embeddings.py)"""
+    import embeddings
+    return embeddings.get_embedder("rag")
 
 
 def _embed(text: str):
-    client = _get_client()
-    emb = client.embeddings.create(model=EMBED_MODEL, input=text)
-    return emb.data[0].embedding
+    return _embedder().embed_one(text)
 
 
 def _rag_load():
@@ -85,45 +83,81 @@ def rag_upsert_url(args: Dict[str, Any]) -> Dict[str, Any]:
     max_chars = int(args.get("max_chars", 6000))
     if not url:
         return _ok(False, None, "Falta 'url'")
+    import url_canon
+
+    # Un artículo ya indexado (misma URL canónica) no se vuelve a embeber
+    canonical = url_canon.key(url)
+    items = _rag_load()
+    if any(it.get("canonical", url_canon.key(it.get("id", ""))) == canonical for it in items):
+        return _ok(True, {"upserted": url, "canonical": canonical, "already_indexed": True}, "")
     try:
-        r = requests.get(url, timeout=25)
-        r.raise_for_status()
-        text = r.text[:max_chars]
+        import raw_store
+        page = raw_store.fetch(url, timeout=25)
+        text = page["content"].decode("utf-8", errors="replace")[:max_chars]
     except Exception as e:
         return _ok(False, None, f"Error al leer URL: {e}")
 
     try:
-        vec = _embed(text)
-        _rag_append({"id": url, "text": text, "embedding": vec})
-        return _ok(True, {"upserted": url}, "")
+        import vector_store
+
+        embedder = _embedder()
+        vec = embedder.embed_one(text)
+        with _RAG_LOCK:
+            # Otra llamada pudo indexar la misma URL mientras se descargaba/embebía
+            items = _rag_load()
+            if any(it.get("canonical", url_canon.key(it.get("id", ""))) == canonical for it in items):
+                return _ok(True, {"upserted": url, "canonical": canonical, "already_indexed": True}, "")
+            # Primero la línea y después el vector (clave = posición de la línea, no
+            # va en el JSONL): una línea sin vector es el estado intermedio seguro
+            _rag_append({"id": url, "canonical": canonical, "text": text, "embed_provider": embedder.signature})
+            store = vector_store.open_store(RAG_PATH + ".vec", embedder.signature)
+            # Filas de un JSONL recortado: ocuparían la clave de la línea nueva
+            stale = [k for k in store.keys if int(k) >= len(items)]
+            if stale:
+                store.retain([k for k in store.keys if int(k) < len(items)])
+            store.add([str(len(items))], [vec])
+            store.save()
+        url_canon.register(url, "rag")
+        return _ok(True, {"upserted": url, "canonical": canonical}, "")
     except Exception as e:
         return _ok(False, None, f"Error al embeder: {e}")
 
 
 def rag_search(args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Busca en el RAG. Por defecto híbrido: BM25 + embeddings fusionados con
+    RRF y re-scoring por nombres/versiones exactos (ver hybrid_search).
+    Args: {'query': '...', 'k': 3, 'mode': 'hybrid'|'dense'|'lexical', 'rescore': True}
+    """
+    import hybrid_search
+
     q = args.get("query")
     k = int(args.get("k", 3))
+    mode = args.get("mode", hybrid_search.RAG_SEARCH_MODE)
     if not q:
         return _ok(False, None, "Falta 'query'")
+    if mode not in hybrid_search.MODES:
+        return _ok(False, None, f"'mode' debe ser uno de {hybrid_search.MODES}")
     items = _rag_load()
     if not items:
-        return _ok(True, {"matches": []}, "")
-    qv = _embed(q)
-
-    def cosine(a, b):
-        dot = sum(x * y for x, y in zip(a, b))
-        na = math.sqrt(sum(x * x for x in a))
-        nb = math.sqrt(sum(y * y for y in b))
-        return 0.0 if na == 0 or nb == 0 else dot / (na * nb)
-
-    scored = []
-    for it in items:
-        s = cosine(qv, it["embedding"])
-        scored.append({"id": it["id"], "score": s, "text": it["text"][:500]})
-    scored.sort(key=lambda x: x["score"], reverse=True)
-    return _ok(True, {"matches": scored[:k]}, "")
+        return _ok(True, {"matches": [], "mode": mode}, "")
+    index = hybrid_search.lexical_index(RAG_PATH, items) if mode != "dense" else None
+    embed, vectors = None, None
+    if mode != "lexical":
+        embedder = _embedder()
+        # Chunks embebidos con otro proveedor: re-embebidos (local) o fuera de la rama densa
+        vectors = hybrid_search.dense_index(RAG_PATH, items, embedder)
+        embed = embedder.embed_one
+    matches = hybrid_search.search(
+        q, items, embed, index=index, k=k, mode=mode, vectors=vectors,
+        rescoring=bool(args.get("rescore", True)),
+    )
+    return _ok(True, {"matches": matches, "mode": mode}, "")
 
 # ---------- Catálogo y dispatcher ----------
+# TOOLS describe cada herramienta (descripción + función). Las funciones
+# importan sus dependencias dentro del cuerpo, así que construir el catálogo
+# (agente, MCP, /run) no carga ninguna implementación pesada.
 
 TOOLS: Dict[str, Tuple[str, callable]] = {
     "memory_set": (
@@ -139,7 +173,7 @@ TOOLS: Dict[str, Tuple[str, callable]] = {
         rag_upsert_url,
     ),
     "rag_search": (
-        "Busca en la base vectorial y devuelve top-k trozos. Args: {'query': '...', 'k': 3}",
+        "Busca en la base RAG (híbrido BM25 + vectorial) y devuelve top-k trozos. Args: {'query': '...', 'k': 3, 'mode': 'hybrid'}",
         rag_search,
     ),
 }
@@ -158,15 +192,18 @@ def call_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     if not tool:
         return _ok(False, None, f"unknown tool: {tool_name}")
     _, fn = tool
+    start = time.perf_counter()
     try:
-        return fn(args if isinstance(args, dict) else {})
+        result = fn(args if isinstance(args, dict) else {})
     except Exception as e:
-        return _ok(False, None, f"tool error: {e}")
+        result = _ok(False, None, f"tool error: {e}")
+    metrics.TOOL_SECONDS.observe(time.perf_counter() - start, tool=tool_name)
+    ok = isinstance(result, dict) and result.get("ok")
+    metrics.TOOL_CALLS.inc(tool=tool_name, status="ok" if ok else "error")
+    return result
 
 # --- BÚSQUEDA WEB + EXTRACCIÓN DE TEXTO LIMPIO ---
 
-from duckduckgo_search import DDGS
-import trafilatura
 from cache_manager import cacheable
 
 # --- FASE 3: ADVANCED FEATURES ---
@@ -597,8 +634,11 @@ def analyze_hype_tool(args: Dict[str, Any]) -> Dict[str, Any]:
 
 def _web_search_internal(q: str, k: int):
     """Helper interno cacheado para web_search"""
+    from duckduckgo_search import DDGS
+    import http_client
+
     results = []
-    with DDGS() as ddgs:
+    with http_client.limit("duckduckgo.com"), DDGS() as ddgs:
         for r in ddgs.text(q, max_results=k, safesearch="moderate"):
             results.append({
                 "title": r.get("title"),
@@ -629,18 +669,26 @@ def web_search(args):
     except Exception as e:
         return _ok(False, None, f"Error en búsqueda: {e}")
 
-@cacheable(max_age_hours=24)  # Artículos: cache largo (24 horas)
-def _cached_read_url(url: str, max_chars: int):
-    downloaded = trafilatura.fetch_url(url, timeout=25)
-    if not downloaded:
-        raise ValueError("No se pudo descargar la URL")
-    text = trafilatura.extract(
-        downloaded,
-        include_comments=False,
-        include_tables=False,
-        favor_recall=True
-    ) or ""
-    text = text.strip()
+def _read_url_text(url: str, max_chars: int, timeout: float = 25):
+    import domain_health
+    import raw_store
+
+    # Lo que ya está en el almacén no toca la red ni el circuit breaker
+    if raw_store.is_fresh(url):
+        text = raw_store.extract_text(url, favor_recall=True, timeout=timeout)
+    else:
+        if not domain_health.allow(url):
+            raise ValueError(f"dominio en pausa por fallos recientes: {domain_health.domain_of(url)}")
+        start = time.monotonic()
+        try:
+            # HTML crudo y texto extraído se cachean aparte (24h): distintos
+            # max_chars comparten la misma descarga y la misma extracción
+            text = raw_store.extract_text(url, favor_recall=True,
+                                          timeout=domain_health.timeout_for(url, timeout))
+        except Exception:
+            domain_health.record(url, False, time.monotonic() - start)
+            raise
+        domain_health.record(url, bool(text), time.monotonic() - start)
     if not text:
         raise ValueError("No se pudo extraer texto")
     return text[:max_chars]
@@ -658,28 +706,21 @@ def read_url_clean(args):
     if not url:
         return _ok(False, None, "Falta 'url'")
     try:
-        text = _cached_read_url(url, max_chars)
+        text = _read_url_text(url, max_chars)
         return _ok(True, {"text": text}, "")
     except Exception as e:
         return _ok(False, None, f"Error al extraer: {e}")
 
 # --- Escaneo de tendencias web (búsqueda + lectura + señales) ---
 
-_ES_STOPWORDS = set(
-    "a al algo algunas algunos ante antes como con contra cual cuales cuando de del desde donde dos el la las los en entre era erais eramos eran es esa esas ese esos esta estaba estabais estabamos estaban estuve estuviera estuviese esto estos estoy etc fue fui ha habeis habiamos habian hablar habia han hasta hay la lo mas me mi mis mucho muy nada ni no nos nosotras nosotros o os otra otro para pero poco por porque que quien quienes se ser si sino sobre solo somos son soy su sus tambien te tiene tienen todo todos tras tu tus un una uno y ya".split()
-)
-
-
-def _tokenize_es(text: str):
-    text = text.lower()
-    tokens = re.findall(r"[a-záéíóúñü]{3,}", text)
-    return [t for t in tokens if t not in _ES_STOPWORDS]
+# Tokenizador compartido con el índice local (text_index)
+from text_index import tokenize_es
 
 
 def _top_keywords_es(texts, topn=12):
     c = Counter()
     for t in texts:
-        for tok in _tokenize_es(t or ""):
+        for tok in tokenize_es(t or ""):
             c[tok] += 1
     return [{"term": w, "count": n} for w, n in c.most_common(topn)]
 
@@ -705,7 +746,9 @@ def web_trend_scan(args):
       }
     """
     from duckduckgo_search import DDGS  # import local para evitar fallos si no instalado
-    import trafilatura
+    import domain_health
+    import http_client
+    import url_canon
 
     topic = args.get("topic") or args.get("query") or args.get("q")
     k = int(args.get("k", 10))
@@ -718,7 +761,7 @@ def web_trend_scan(args):
 
     results = []
     try:
-        with DDGS() as ddgs:
+        with http_client.limit("duckduckgo.com"), DDGS() as ddgs:
             # Intentar canal de noticias primero
             try:
                 for r in ddgs.news(topic, max_results=k, safesearch="moderate", timelimit=timelimit):
@@ -740,45 +783,44 @@ def web_trend_scan(args):
     except Exception as e:
         return _ok(False, None, f"Error en búsqueda: {e}")
 
-    # Unificar y filtrar URLs válidas
+    # Unificar y filtrar URLs válidas (dedupe por URL canónica)
     urls_seen = set()
     clean_results = []
     for r in results:
         u = r.get("url")
-        if not u or u in urls_seen:
+        if not u or url_canon.key(u) in urls_seen:
             continue
-        urls_seen.add(u)
+        urls_seen.add(url_canon.key(u))
         clean_results.append(r)
 
-    # Leer artículos (máximo max_articles)
-    articles = []
-    texts = []
-    for r in clean_results[:max_articles]:
-        u = r["url"]
+    # Leer artículos (máximo max_articles): descarga en hilos, extracción en procesos.
+    # Los dominios con el circuito abierto se saltan y dejan su lugar a otros.
+    def _read(r):
         try:
-            downloaded = trafilatura.fetch_url(u, timeout=25)
-            if not downloaded:
-                continue
-            txt = trafilatura.extract(
-                downloaded,
-                include_comments=False,
-                include_tables=False,
-                favor_recall=True
-            ) or ""
-            txt = (txt or "").strip()
-            if not txt:
-                continue
-            txt = txt[:max_chars]
-            texts.append(txt)
-            snippet = (txt[:220] + "...") if len(txt) > 220 else txt
-            articles.append({
-                "title": r.get("title"),
-                "url": u,
-                "snippet": snippet,
-                "text": txt
-            })
+            return _read_url_text(r["url"], max_chars)
         except Exception:
+            return ""
+
+    candidates = [r for r in clean_results if not domain_health.is_open(r["url"])][:max_articles]
+    articles = []
+    texts = []
+    if candidates:
+        with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+            extracted = list(pool.map(_read, candidates))
+    else:
+        extracted = []
+    for r, txt in zip(candidates, extracted):
+        if not txt:
             continue
+        txt = txt[:max_chars]
+        texts.append(txt)
+        snippet = (txt[:220] + "...") if len(txt) > 220 else txt
+        articles.append({
+            "title": r.get("title"),
+            "url": r["url"],
+            "snippet": snippet,
+            "text": txt
+        })
 
     # Señales: keywords y dominios
     keywords = _top_keywords_es(texts, topn=12)
@@ -795,9 +837,35 @@ def web_trend_scan(args):
     }
     return _ok(True, data, "")
 
+def local_search(args):
+    """
+    Busca en el índice local (BM25) de todo lo ya leído: RSS, artículos,
+    páginas de web_trend_scan y read_url_clean. Sin red.
+    Args:
+      {'query': '...', 'k': 5, 'days': 7, 'source': 'rss'|'read'|'news'|... (opcional)}
+    Devuelve:
+      {'results': [{'title','url','source','added','score','snippet'}, ...], 'documents': int, 'took_ms': float}
+    """
+    import text_index
+
+    q = args.get("query")
+    k = int(args.get("k", 5))
+    if not q:
+        return _ok(False, None, "Falta 'query'")
+    since = None
+    if args.get("days"):
+        from datetime import timedelta
+        since = (datetime.now() - timedelta(days=float(args["days"]))).isoformat()
+    start = time.perf_counter()
+    idx = text_index.get_index()
+    results = idx.search(q, k=k, since=since, source=args.get("source"))
+    took_ms = round((time.perf_counter() - start) * 1000, 2)
+    return _ok(True, {"results": results, "documents": len(idx), "took_ms": took_ms}, "")
+
 # Registrar herramientas nuevas
 TOOLS["web_search"] = ("Busca en la web. Args: {'query':'...','k':5}", web_search)
 TOOLS["read_url_clean"] = ("Lee y limpia texto de una URL. Args: {'url':'https://...','max_chars':4000}", read_url_clean)
+TOOLS["local_search"] = ("Busca sin red en lo ya leído (RSS, artículos, páginas). Args: {'query':'...','k':5,'days':7}", local_search)
 TOOLS["web_trend_scan"] = ("Escanea tendencias web de un tema. Args: {'topic':'...','k':10,'max_articles':5,'timelimit':'w','max_chars':4000}", web_trend_scan)
 
 # Fase 3: Advanced Features
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Serie temporal persistente de menciones por entidad (detección de "rising topics")
+- Matriz columnar NumPy (entidades x días) en un .npz comprimido: una
+  columna por día calendario, ventana fija de TREND_MAX_DAYS
+- Cada corrida escribe su columna del día (la última corrida del día
+  manda); días sin corrida quedan como NaN y no cuentan como cero
+- Velocidad y z-score vectorizados: media de la ventana reciente contra
+  la media/desviación de la línea base anterior, sin releer contenido
+- Costo por corrida O(entidades): la ventana de días es constante
+"""
+
+import os
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+TREND_SERIES_PATH = os.getenv("TREND_SERIES_PATH", os.path.join("content_history", "entity_series.npz"))
+TREND_MAX_DAYS = int(os.getenv("TREND_MAX_DAYS", "90"))
+TREND_WINDOW_DAYS = int(os.getenv("TREND_WINDOW_DAYS", "3"))
+TREND_BASELINE_DAYS = int(os.getenv("TREND_BASELINE_DAYS", "14"))
+# Días con datos mínimos en la línea base para calcular z-scores
+TREND_MIN_BASELINE_DAYS = int(os.getenv("TREND_MIN_BASELINE_DAYS", "3"))
+
+
+class TrendSeries:
+    """
+    counts[i, j] = menciones de keys[i] el día (end - max_days + 1 + j);
+    observed[j] indica si hubo corrida ese día.
+    """
+
+    def __init__(self, path: str = TREND_SERIES_PATH, max_days: int = TREND_MAX_DAYS):
+        import numpy as np
+
+        self.path = path
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self.keys: List[str] = []
+        self.end: Optional[int] = None  # ordinal del último día de la ventana
+        self.counts = np.full((0, max_days), np.nan, dtype=np.float32)
+        self.observed = np.zeros(max_days, dtype=bool)
+        self._load()
+        self._index: Dict[str, int] = {k: i for i, k in enumerate(self.keys)}
+
+    def _load(self) -> None:
+        import numpy as np
+
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                keys = [str(k) for k in data["keys"]]
+                counts = data["counts"].astype(np.float32)
+                observed = data["observed"].astype(bool)
+                end = int(data["end"])
+        except Exception as e:
+            print(f"Warning: Could not load trend series: {e}")
+            return
+        # Ajusta al ancho configurado (si TREND_MAX_DAYS cambió)
+        width = min(self.max_days, counts.shape[1])
+        self.counts = np.full((len(keys), self.max_days), np.nan, dtype=np.float32)
+        self.counts[:, self.max_days - width:] = counts[:, counts.shape[1] - width:]
+        self.observed[self.max_days - width:] = observed[observed.shape[0] - width:]
+        self.keys, self.end = keys, end
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _advance(self, day: int) -> None:
+        """Corre la ventana para que termine en `day` (los días nuevos quedan sin observar)"""
+        import numpy as np
+
+        if self.end is None or day - self.end >= self.max_days:
+            self.counts[:] = np.nan
+            self.observed[:] = False
+        elif day > self.end:
+            shift = day - self.end
+            self.counts[:, :-shift] = self.counts[:, shift:]
+            self.counts[:, -shift:] = np.nan
+            self.observed[:-shift] = self.observed[shift:]
+            self.observed[-shift:] = False
+        self.end = day
+
+    def record(self, mentions: Dict[str, int], day: Optional[date] = None) -> None:
+        """
+        Escribe los conteos de una corrida en la columna del día.
+
+        Args:
+            mentions: {entidad: menciones} (p.ej. scan['mentions'] del matcher)
+            day: Día de la corrida (hoy por defecto)
+        """
+        import numpy as np
+
+        ordinal = (day or date.today()).toordinal()
+        with self._lock:
+            if self.end is None or ordinal > self.end:
+                self._advance(ordinal)
+            col = self.max_days - 1 - (self.end - ordinal)
+            if col < 0:
+                return  # más viejo que la ventana
+
+            new_keys = [k for k in mentions if k not in self._index]
+            if new_keys:
+                # Entidades nuevas: 0 en los días con corrida, NaN en el resto
+                rows = np.where(self.observed, 0.0, np.nan).astype(np.float32)
+                self.counts = np.vstack([self.counts, np.tile(rows, (len(new_keys), 1))])
+                for k in new_keys:
+                    self._index[k] = len(self.keys)
+                    self.keys.append(k)
+
+            self.counts[:, col] = 0.0
+            idx = np.fromiter((self._index[k] for k in mentions), dtype=np.int64, count=len(mentions))
+            self.counts[idx, col] = np.fromiter(mentions.values(), dtype=np.float32, count=len(mentions))
+            self.observed[col] = True
+
+    def scores(self, window: int = TREND_WINDOW_DAYS, baseline: int = TREND_BASELINE_DAYS) -> Dict[str, Any]:
+        """
+        Métricas vectorizadas sobre toda la matriz:
+            recent   = media diaria en los últimos `window` días
+            base     = media diaria en los `baseline` días anteriores
+            velocity = recent - base (menciones/día)
+            zscore   = velocity / max(std_base, sqrt(max(base, 1)))
+
+        El piso sqrt(base) (ruido tipo Poisson) evita z infinitos para
+        entidades que antes no aparecían nunca.
+
+        Returns:
+            {'keys', 'recent', 'baseline', 'velocity', 'zscore'} (arrays) o {} si no hay historia suficiente
+        """
+        import numpy as np
+
+        with self._lock:
+            if not self.keys:
+                return {}
+            counts = self.counts
+            observed = self.observed
+            recent_cols = slice(self.max_days - window, self.max_days)
+            base_cols = slice(max(0, self.max_days - window - baseline), self.max_days - window)
+            n_recent = int(observed[recent_cols].sum())
+            n_base = int(observed[base_cols].sum())
+            if n_recent == 0 or n_base < TREND_MIN_BASELINE_DAYS:
+                return {}
+
+            recent = np.nansum(counts[:, recent_cols], axis=1) / n_recent
+            base_block = counts[:, base_cols][:, observed[base_cols]]
+            mu = base_block.mean(axis=1)
+            sd = base_block.std(axis=1)
+            velocity = recent - mu
+            zscore = velocity / np.maximum(sd, np.sqrt(np.maximum(mu, 1.0)))
+            return {
+                "keys": list(self.keys),
+                "recent": recent,
+                "baseline": mu,
+                "velocity": velocity,
+                "zscore": zscore,
+            }
+
+    def rising(self, top: int = 10, min_zscore: float = 2.0, min_recent: float = 2.0,
+               window: int = TREND_WINDOW_DAYS, baseline: int = TREND_BASELINE_DAYS) -> List[Dict[str, Any]]:
+        """
+        Entidades que aceleran: z-score >= min_zscore y al menos `min_recent`
+        menciones/día en la ventana reciente, ordenadas por z-score.
+
+        Returns:
+            [{'key', 'recent', 'baseline', 'velocity', 'zscore'}, ...]
+        """
+        import numpy as np
+
+        s = self.scores(window, baseline)
+        if not s:
+            return []
+        mask = (s["zscore"] >= min_zscore) & (s["recent"] >= min_recent)
+        idx = np.flatnonzero(mask)
+        idx = idx[np.argsort(-s["zscore"][idx], kind="stable")][:top]
+        return [
+            {
+                "key": s["keys"][i],
+                "recent": round(float(s["recent"][i]), 2),
+                "baseline": round(float(s["baseline"][i]), 2),
+                "velocity": round(float(s["velocity"][i]), 2),
+                "zscore": round(float(s["zscore"][i]), 2),
+            }
+            for i in idx
+        ]
+
+    def save(self) -> None:
+        """Escritura atómica del .npz"""
+        import numpy as np
+
+        with self._lock:
+            if self.end is None:
+                return
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    np.savez_compressed(
+                        f,
+                        keys=np.array(self.keys, dtype=str),
+                        counts=self.counts,
+                        observed=self.observed,
+                        end=np.int64(self.end),
+                    )
+                os.replace(tmp, self.path)
+            except Exception as e:
+                print(f"Warning: Could not save trend series: {e}")
+
+
+def record_run(mentions: Dict[str, int], path: str = TREND_SERIES_PATH, top: int = 10) -> List[Dict[str, Any]]:
+    """Registra los conteos de hoy, guarda y devuelve las entidades en ascenso"""
+    series = TrendSeries(path)
+    series.record(mentions)
+    series.save()
+    return series.rising(top=top)
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Canonicalización de URLs e índice persistente compartido
+- canonical_url: esquema https, host sin www./m./amp., sin puerto por
+  defecto, sin fragmento ni parámetros de tracking, variantes AMP
+  (/amp, .amp, ?amp=1, caches de AMP de Google) plegadas, query ordenada
+  y sin barra final
+- Redirecciones: los hosts que redirigen (feedproxy, t.co, bit.ly, ...)
+  se resuelven una vez por URL y se recuerdan; los hosts que redirigen se
+  aprenden también de las descargas normales (raw_store)
+- Índice por URL canónica -> primera vez vista y fuentes que la trajeron
+  (RSS, web, lectura, RAG), compartido entre corridas y entre procesos: al
+  guardar se toma un lock de archivo y se fusiona lo que otro proceso
+  escribió desde nuestra última lectura
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import file_lock
+
+URL_INDEX_PATH = os.getenv("URL_INDEX_PATH", os.path.join("cache", "url_index.json"))
+URL_INDEX_RETENTION_DAYS = int(os.getenv("URL_INDEX_RETENTION_DAYS", "30"))
+URL_RESOLVE_TIMEOUT = float(os.getenv("URL_RESOLVE_TIMEOUT", "8"))
+_SAVE_INTERVAL = 5.0
+_MAX_REDIRECTS = 20000
+
+_TRACKING_PARAMS = (
+    "utm_", "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "_hsenc", "_hsmi",
+    "mkt_tok", "ref_src", "ref_url", "cmpid", "ocid", "smid", "sr_share", "guccounter", "__twitter_impression",
+)
+_TRACKING_EXACT = ("ref", "amp", "outputtype", "usqp")
+# Prefijos de host que sirven el mismo contenido
+_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+# Acortadores y proxies de feeds: siempre redirigen a otro host
+REDIRECT_HOSTS = {
+    "feedproxy.google.com", "feeds.feedburner.com", "t.co", "bit.ly", "buff.ly", "ow.ly", "dlvr.it",
+    "lnkd.in", "trib.al", "tinyurl.com", "goo.gl", "rebrand.ly", "news.google.com",
+}
+
+_AMP_CACHE = re.compile(r"^[a-z0-9-]+\.cdn\.ampproject\.org$")
+_AMP_PATH = re.compile(r"(?:/amp/?|\.amp)$")
+
+_lock = threading.Lock()
+_state: Optional[Dict[str, Any]] = None
+_stamp = None  # versión en disco de la última lectura/escritura
+_dirty = False
+_last_save = 0.0
+
+
+def _fold_host(host: str) -> str:
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") >= 2:
+            return host[len(prefix):]
+    return host
+
+
+def canonical_url(url: str) -> str:
+    """Clave canónica de la URL (sin red)"""
+    parts = urlsplit((url or "").strip())
+    host = (parts.hostname or "").lower()
+    path = parts.path or "/"
+
+    # Caches de AMP: https://www-x-com.cdn.ampproject.org/c/s/x.com/path
+    # y https://www.google.com/amp/s/x.com/path
+    if _AMP_CACHE.match(host) or (host.endswith("google.com") and path.startswith("/amp/")):
+        inner = re.sub(r"^/(?:c/|v/|amp/)*(?:s/)?", "", path)
+        if inner and inner != path:
+            return canonical_url("https://" + inner + (f"?{parts.query}" if parts.query else ""))
+
+    host = _fold_host(host)
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = _AMP_PATH.sub("", path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS) and k.lower() not in _TRACKING_EXACT
+    ))
+    return urlunsplit(("https" if parts.scheme.lower() in ("http", "https", "") else parts.scheme.lower(),
+                       host, path, query, ""))
+
+
+def host_of(url: str) -> str:
+    return _fold_host((urlsplit(url).hostname or "").lower())
+
+
+# ---------- Índice persistente ----------
+
+def _read() -> Dict[str, Any]:
+    try:
+        with open(URL_INDEX_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except Exception:
+        state = {}
+    for section in ("urls", "redirects", "redirect_hosts"):
+        state.setdefault(section, {})
+    return state
+
+
+def _load() -> Dict[str, Any]:
+    global _state, _stamp
+    if _state is None:
+        _stamp = file_lock.stamp(URL_INDEX_PATH)
+        _state = _read()
+    return _state
+
+
+def _merge(disk: Dict[str, Any], ours: Dict[str, Any]) -> Dict[str, Any]:
+    """Unión de dos versiones del índice (la primera vez vista gana; fuentes sumadas)"""
+    urls = disk["urls"]
+    for k, rec in ours["urls"].items():
+        other = urls.get(k)
+        if other is None:
+            urls[k] = rec
+            continue
+        other["first_seen"] = min(filter(None, (other.get("first_seen"), rec.get("first_seen"))), default="")
+        other["sources"] = list(dict.fromkeys(other.get("sources", []) + rec.get("sources", [])))
+    disk["redirects"].update(ours["redirects"])
+    for host, seen in ours["redirect_hosts"].items():
+        disk["redirect_hosts"][host] = max(seen, disk["redirect_hosts"].get(host, ""))
+    return disk
+
+
+def _touch() -> None:
+    global _dirty
+    _dirty = True
+
+
+def key(url: str) -> str:
+    """Clave canónica aplicando redirecciones ya conocidas (sin red)"""
+    canonical = canonical_url(url)
+    with _lock:
+        final = _load()["redirects"].get(canonical)
+    return final or canonical
+
+
+def is_redirector(url: str) -> bool:
+    host = host_of(url)
+    if host in REDIRECT_HOSTS:
+        return True
+    with _lock:
+        return host in _load()["redirect_hosts"]
+
+
+def learn_redirect(url: str, final_url: str) -> None:
+    """Registra que `url` terminó en `final_url` (y si cambió de host, que el host redirige)"""
+    src, dst = canonical_url(url), canonical_url(final_url)
+    if src == dst:
+        return
+    with _lock:
+        state = _load()
+        state["redirects"][src] = dst
+        if host_of(url) != host_of(final_url):
+            state["redirect_hosts"][host_of(url)] = datetime.now().isoformat()
+        _touch()
+
+
+def resolve(url: str, timeout: float = URL_RESOLVE_TIMEOUT) -> str:
+    """
+    Clave canónica final de la URL. Solo hace red (un HEAD siguiendo
+    redirecciones) para hosts que redirigen y URLs no resueltas antes.
+    """
+    canonical = canonical_url(url)
+    with _lock:
+        cached = _load()["redirects"].get(canonical)
+    if cached or not is_redirector(url):
+        return cached or canonical
+    try:
+        import http_client
+        r = http_client.request("HEAD", url, timeout=timeout, retries=0, allow_redirects=True)
+        final = r.url or url
+    except Exception:
+        return canonical
+    learn_redirect(url, final)
+    return canonical_url(final)
+
+
+def register(url: str, source: str) -> Tuple[str, bool]:
+    """
+    Registra que `source` ('rss', 'web', 'read', 'rag', ...) trajo la URL.
+
+    Returns:
+        (clave canónica, True si la URL no estaba en el índice)
+    """
+    k = key(url)
+    with _lock:
+        urls = _load()["urls"]
+        rec = urls.get(k)
+        is_new = rec is None
+        if is_new:
+            rec = urls[k] = {"first_seen": datetime.now().isoformat(), "sources": []}
+        if source not in rec["sources"]:
+            rec["sources"].append(source)
+            _touch()
+    if time.monotonic() - _last_save > _SAVE_INTERVAL:
+        save()
+    return k, is_new
+
+
+def sources(url: str) -> List[str]:
+    """Fuentes que ya trajeron esta URL ([] si nunca se vio)"""
+    k = key(url)
+    with _lock:
+        rec = _load()["urls"].get(k)
+    return list(rec["sources"]) if rec else []
+
+
+def save() -> None:
+    """
+    Escritura atómica del índice (poda entradas viejas); se llama sola y al
+    salir. Bajo lock de archivo: si otro proceso guardó desde nuestra última
+    lectura, se fusiona su versión antes de escribir.
+    """
+    global _state, _stamp, _dirty, _last_save
+    with _lock:
+        if not _dirty or _state is None:
+            return
+        try:
+            with file_lock.locked(URL_INDEX_PATH):
+                if file_lock.stamp(URL_INDEX_PATH) != _stamp:
+                    _state = _merge(_read(), _state)
+                cutoff = (datetime.now() - timedelta(days=URL_INDEX_RETENTION_DAYS)).isoformat()
+                _state["urls"] = {k: v for k, v in _state["urls"].items() if v.get("first_seen", "") >= cutoff}
+                if len(_state["redirects"]) > _MAX_REDIRECTS:
+                    _state["redirects"] = dict(list(_state["redirects"].items())[-_MAX_REDIRECTS:])
+                tmp = f"{URL_INDEX_PATH}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(_state, f, ensure_ascii=False)
+                os.replace(tmp, URL_INDEX_PATH)
+                _stamp = file_lock.stamp(URL_INDEX_PATH)
+            _dirty = False
+        except Exception as e:
+            print(f"Warning: Could not save URL index: {e}")
+        _last_save = time.monotonic()
+
+
+atexit.register(save)
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén compacto de vectores (RAG e historial de novedad)
+- Un directorio por firma de embeddings (ver embeddings.py): vectores
+  normalizados en archivos binarios solo-append + meta.json con las claves
+- int8 con escala por vector (1 byte/dim) o, en modo 'pq', cuantización
+  por producto (VECTOR_PQ_SUBSPACES bytes/vector) entrenada cuando hay
+  VECTOR_PQ_MIN_TRAIN vectores; desde entonces el almacén es solo PQ
+- Búsqueda directamente sobre los códigos con NumPy (int8: producto por
+  bloques; PQ: distancia asimétrica con tabla por consulta) y re-scoring
+  exacto de los VECTOR_RESCORE mejores candidatos con la copia float16
+  (memmap: solo se leen las filas candidatas)
+- Objetivo de calidad: recall@10 >= 0.95 frente a la búsqueda float exacta
+  (bench/vector_bench.py)
+- Guardado bajo file_lock (servidor y MCP comparten almacén): si meta.json
+  cambió desde la carga se releen las filas de disco y se re-agregan encima
+  las pendientes
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import file_lock
+
+VECTOR_STORE_MODE = os.getenv("VECTOR_STORE_MODE", "int8")  # int8 | pq
+VECTOR_PQ_SUBSPACES = int(os.getenv("VECTOR_PQ_SUBSPACES", "0"))  # 0 = dim / 16
+VECTOR_PQ_MIN_TRAIN = int(os.getenv("VECTOR_PQ_MIN_TRAIN", "2000"))
+VECTOR_RESCORE = int(os.getenv("VECTOR_RESCORE", "100"))
+RECALL_TARGET = 0.95
+
+_PQ_CENTROIDS = 256
+_PQ_TRAIN_SAMPLE = 10000
+_PQ_ITERATIONS = 8
+# Filas por bloque al puntuar int8: la copia float32 temporal cabe en cache
+_BLOCK = 256
+# Filas por bloque al codificar PQ y al puntuar con la tabla ADC
+_PQ_BLOCK = 8192
+_ADC_BLOCK = 1024
+
+# archivo -> (dtype, ancho por fila: 'dim', 'pq' o 1)
+_SEGMENTS = {
+    "f16.bin": ("float16", "dim"),
+    "i8.bin": ("int8", "dim"),
+    "scale.bin": ("float32", 1),
+    "pq.bin": ("uint8", "pq"),
+}
+
+
+def slug(signature: str) -> str:
+    return re.sub(r"[^A-Za-z0-9.\-]+", "_", signature)
+
+
+class VectorStore:
+    """
+    keys[i] es la clave de la fila i; las filas pendientes se escriben en
+    save() (append a los .bin y meta.json atómico al final).
+    """
+
+    def __init__(self, path: str, mode: str = VECTOR_STORE_MODE):
+        import numpy as np
+
+        self.path = path
+        self.mode = mode
+        self._lock = threading.RLock()
+        self.keys: List[str] = []
+        self.dim: Optional[int] = None
+        self.centroids = None  # (m, 256, dim/m) float32
+        self.i8 = np.zeros((0, 0), dtype=np.int8)
+        self.scale = np.zeros(0, dtype=np.float32)
+        self.pq = np.zeros((0, 0), dtype=np.uint8)
+        self._f16 = None
+        self._saved = 0
+        self._pending: List[Any] = []
+        self._stamp = None
+        self._load()
+        self._pos = {k: i for i, k in enumerate(self.keys)}
+
+    # --- persistencia ---
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _width(self, name: str) -> int:
+        width = _SEGMENTS[name][1]
+        if name in ("i8.bin", "scale.bin") and self.centroids is not None:
+            return 0  # almacén PQ: sin códigos int8
+        if width == "dim":
+            return self.dim or 0
+        if width == "pq":
+            return 0 if self.centroids is None else self.centroids.shape[0]
+        return width
+
+    def _read(self, name: str, n: int, mmap: bool = False):
+        import numpy as np
+
+        dtype, width = np.dtype(_SEGMENTS[name][0]), self._width(name)
+        shape = (n, width) if _SEGMENTS[name][1] != 1 else (n,)
+        if n == 0 or width == 0:
+            return np.zeros((n, width) if len(shape) == 2 else (0,), dtype=dtype)
+        if mmap:
+            return np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape)
+        return np.fromfile(self._file(name), dtype=dtype, count=n * width).reshape(shape)
+
+    def _load(self) -> None:
+        import numpy as np
+
+        # Antes de leer: si otro proceso guarda en medio, save() lo verá distinto
+        self._stamp = file_lock.stamp(self._file("meta.json"))
+        try:
+            with open(self._file("meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim = meta.get("dim")
+            n = len(meta["keys"])
+            if meta.get("pq"):
+                self.centroids = np.load(self._file("pq_centroids.npy"))
+                self.pq = self._read("pq.bin", n)
+            else:
+                self.i8 = self._read("i8.bin", n)
+                self.scale = self._read("scale.bin", n)
+            self.keys = list(meta["keys"])
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Warning: Could not load vector store {self.path}: {e}")
+            self.keys, self.dim, self.centroids = [], None, None
+            return
+        self._saved = len(self.keys)
+
+    def _rows_f16(self):
+        """Copia float16 (memmap) de las filas guardadas"""
+        if self._f16 is None or self._f16.shape[0] != self._saved:
+            self._f16 = self._read("f16.bin", self._saved, mmap=True)
+        return self._f16
+
+    def _sync(self) -> None:
+        """
+        Con file_lock tomado: si meta.json cambió desde la carga (otro
+        proceso guardó), recarga las filas de disco y re-agrega las pendientes.
+        """
+        import numpy as np
+
+        if file_lock.stamp(self._file("meta.json")) == self._stamp:
+            return
+        keys = self.keys[self._saved:]
+        rows = np.vstack(self._pending) if self._pending else None
+        self.keys, self.dim, self.centroids, self._f16 = [], None, None, None
+        self.i8 = np.zeros((0, 0), dtype=np.int8)
+        self.scale = np.zeros(0, dtype=np.float32)
+        self.pq = np.zeros((0, 0), dtype=np.uint8)
+        self._saved, self._pending = 0, []
+        self._load()
+        self._pos = {k: i for i, k in enumerate(self.keys)}
+        if rows is not None:
+            self._append(keys, rows)
+
+    def save(self) -> None:
+        """Agrega las filas pendientes a los .bin y escribe meta.json (atómico)"""
+        with self._lock:
+            if not self._pending and os.path.exists(self._file("meta.json")):
+                return
+            try:
+                with file_lock.locked(self._file("meta.json")):
+                    self._sync()
+                    self._flush()
+            except Exception as e:
+                print(f"Warning: Could not save vector store: {e}")
+
+    def _flush(self) -> None:
+        """Con file_lock tomado: append de las filas pendientes y meta.json"""
+        import numpy as np
+
+        os.makedirs(self.path, exist_ok=True)
+        rows = np.vstack(self._pending).astype(np.float16) if self._pending else None
+        for name in _SEGMENTS:
+            width = self._width(name)
+            if width == 0:
+                continue
+            itemsize = np.dtype(_SEGMENTS[name][0]).itemsize
+            with open(self._file(name), "ab") as f:
+                # Restos de un guardado interrumpido: se descartan
+                f.truncate(self._saved * width * itemsize)
+                if rows is None:
+                    continue
+                if name == "f16.bin":
+                    f.write(rows.tobytes())
+                elif name == "i8.bin":
+                    f.write(self.i8[self._saved:].tobytes())
+                elif name == "scale.bin":
+                    f.write(self.scale[self._saved:].tobytes())
+                else:
+                    f.write(self.pq[self._saved:].tobytes())
+        self._write_meta()
+        self._saved = len(self.keys)
+        self._pending = []
+        self._f16 = None
+
+    def _write_meta(self) -> None:
+        meta = {
+            "keys": self.keys,
+            "dim": self.dim,
+            "pq": None if self.centroids is None else {"subspaces": int(self.centroids.shape[0])},
+            "updated": datetime.now().isoformat(),
+        }
+        tmp = self._file(f"meta.json.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file("meta.json"))
+        self._stamp = file_lock.stamp(self._file("meta.json"))
+
+    # --- escritura ---
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pos
+
+    def add(self, keys: Sequence[str], vectors) -> int:
+        """Agrega vectores (se normalizan); las claves ya presentes se ignoran"""
+        import numpy as np
+
+        x = np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1)
+        with self._lock:
+            added = self._append(keys, x)
+            if added and self.mode == "pq" and self.centroids is None and len(self.keys) >= VECTOR_PQ_MIN_TRAIN:
+                self.train()
+        return added
+
+    def _append(self, keys: Sequence[str], x) -> int:
+        import numpy as np
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = x.shape[1]
+            if x.shape[1] != self.dim:
+                raise ValueError(f"dimensión {x.shape[1]} != {self.dim}")
+            fresh, seen = [], set()
+            for i, k in enumerate(keys):
+                if k not in self._pos and k not in seen:
+                    seen.add(k)
+                    fresh.append(i)
+            if not fresh:
+                return 0
+            x = _normalize(x[fresh])
+            if self.centroids is not None:
+                self.pq = np.vstack([self.pq.reshape(-1, self.centroids.shape[0]), pq_encode(x, self.centroids)])
+            else:
+                codes, scale = quantize_int8(x)
+                self.i8 = np.vstack([self.i8.reshape(-1, self.dim), codes])
+                self.scale = np.concatenate([self.scale, scale])
+            for i in fresh:
+                self._pos[keys[i]] = len(self.keys)
+                self.keys.append(keys[i])
+            self._pending.append(x)
+        return len(fresh)
+
+    def train(self, subspaces: int = VECTOR_PQ_SUBSPACES, seed: int = 0) -> None:
+        """Entrena el codebook PQ sobre los vectores actuales y re-codifica todo"""
+        import numpy as np
+
+        with self._lock, file_lock.locked(self._file("meta.json")):
+            self._sync()
+            self._flush()
+            x = self.vectors()
+            m = subspaces or max(1, self.dim // 16)
+            while self.dim % m:
+                m -= 1
+            rng = np.random.default_rng(seed)
+            sample = x[rng.choice(len(x), min(len(x), _PQ_TRAIN_SAMPLE), replace=False)]
+            self.centroids = pq_train(sample, m, seed=seed)
+            self.pq = np.vstack([pq_encode(x[s:s + _PQ_BLOCK], self.centroids) for s in range(0, len(x), _PQ_BLOCK)])
+            np.save(self._file("pq_centroids.npy"), self.centroids)
+            with open(self._file("pq.bin"), "wb") as f:
+                f.write(self.pq.tobytes())
+            self._write_meta()
+            self.i8, self.scale = np.zeros((0, 0), dtype=np.int8), np.zeros(0, dtype=np.float32)
+            for name in ("i8.bin", "scale.bin"):
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
+
+    def retain(self, keys: Sequence[str]) -> int:
+        """Deja solo las claves dadas (reescribe los archivos); devuelve las borradas"""
+        import numpy as np
+
+        with self._lock, file_lock.locked(self._file("meta.json")):
+            self._sync()
+            keep = [self._pos[k] for k in keys if k in self._pos]
+            dropped = len(self.keys) - len(keep)
+            if not dropped:
+                return 0
+            x = self.vectors()[keep] if keep else np.zeros((0, self.dim or 0), np.float32)
+            self.keys = [self.keys[i] for i in keep]
+            self._pos = {k: i for i, k in enumerate(self.keys)}
+            if self.centroids is not None:
+                self.pq = self.pq[keep]
+            else:
+                self.i8, self.scale = self.i8[keep], self.scale[keep]
+            self._saved, self._pending, self._f16 = 0, [x] if keep else [], None
+            for name in _SEGMENTS:
+                if os.path.exists(self._file(name)):
+                    os.truncate(self._file(name), 0)
+            self._flush()
+            return dropped
+
+    # --- lectura ---
+
+    def vectors(self, keys: Optional[Sequence[str]] = None):
+        """Vectores float32 normalizados (de la copia float16) en el orden de `keys`"""
+        import numpy as np
+
+        with self._lock:
+            rows = np.asarray([self._pos[k] for k in keys] if keys is not None else range(len(self.keys)), dtype=np.int64)
+            out = np.zeros((len(rows), self.dim or 0), dtype=np.float32)
+            on_disk = rows < self._saved
+            if on_disk.any():
+                out[on_disk] = self._rows_f16()[rows[on_disk]]
+            if (~on_disk).any():
+                out[~on_disk] = np.vstack(self._pending)[rows[~on_disk] - self._saved]
+            return out
+
+    def approximate_scores(self, q):
+        """Coseno aproximado de todas las filas contra q (normalizado), sobre los códigos"""
+        import numpy as np
+
+        n = len(self.keys)
+        scores = np.empty(n, dtype=np.float32)
+        if self.centroids is not None:
+            m = self.centroids.shape[0]
+            # Distancia asimétrica: tabla (m, 256) de productos query-centroide
+            table = np.einsum("mkd,md->mk", self.centroids, q.reshape(m, -1)).ravel()
+            # Código del subespacio j -> posición j*256 + código en la tabla aplanada
+            offsets = (np.arange(m) * _PQ_CENTROIDS).astype(np.uint16 if m <= 256 else np.intp)
+            for s in range(0, n, _ADC_BLOCK):
+                scores[s:s + _ADC_BLOCK] = table.take(self.pq[s:s + _ADC_BLOCK] + offsets).sum(axis=1)
+        else:
+            for s in range(0, n, _BLOCK):
+                scores[s:s + _BLOCK] = (self.i8[s:s + _BLOCK] @ q) * self.scale[s:s + _BLOCK]
+        return scores
+
+    def search(self, query, k: int = 10, rescore: int = VECTOR_RESCORE) -> List[Tuple[str, float]]:
+        """Top-k (clave, coseno): aproximado sobre códigos + re-scoring exacto"""
+        import numpy as np
+
+        with self._lock:
+            if not self.keys:
+                return []
+            q = np.asarray(query, dtype=np.float32)
+            if q.shape[0] != self.dim:
+                return []
+            q = q / (np.linalg.norm(q) or 1.0)
+            approx = self.approximate_scores(q)
+            n = min(len(approx), max(k, rescore))
+            cand = np.argpartition(-approx, n - 1)[:n] if n < len(approx) else np.arange(len(approx))
+            cand = np.sort(cand)  # lectura secuencial del memmap
+            exact = self.vectors([self.keys[i] for i in cand]) @ q if rescore else approx[cand]
+            order = np.argsort(-exact, kind="stable")[:k]
+            return [(self.keys[cand[i]], float(exact[i])) for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        n, dim = len(self.keys), self.dim or 0
+        m = 0 if self.centroids is None else self.centroids.shape[0]
+        return {
+            "vectors": n,
+            "dim": dim,
+            "mode": "pq" if m else "int8",
+            "pq_subspaces": m,
+            # Residente: códigos que se recorren en cada búsqueda
+            "memory_bytes": n * m + self.centroids.nbytes if m else n * (dim + 4),
+            "disk_bytes": sum(os.path.getsize(self._file(f)) for f in os.listdir(self.path)) if os.path.isdir(self.path) else 0,
+        }
+
+
+# ---------- Cuantizadores ----------
+
+def _normalize(x):
+    import numpy as np
+
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms == 0, 1.0, norms)
+
+
+def quantize_int8(x):
+    """int8 simétrico con escala por vector: x ~ codes * scale"""
+    import numpy as np
+
+    scale = np.abs(x).max(axis=1) / 127.0
+    scale = np.where(scale == 0, 1.0, scale).astype(np.float32)
+    codes = np.clip(np.rint(x / scale[:, None]), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def pq_train(x, m: int, k: int = _PQ_CENTROIDS, iterations: int = _PQ_ITERATIONS, seed: int = 0):
+    """k-means por subespacio -> centroides (m, k, dim/m)"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    n, dim = x.shape
+    k = min(k, n)
+    sub = x.reshape(n, m, dim // m)
+    centroids = np.empty((m, _PQ_CENTROIDS, dim // m), dtype=np.float32)
+    for j in range(m):
+        data = sub[:, j, :]
+        c = data[rng.choice(n, k, replace=False)].copy()
+        for _ in range(iterations):
+            assign = _nearest(data, c)
+            sums = np.stack([np.bincount(assign, weights=data[:, d], minlength=k) for d in range(data.shape[1])], axis=1)
+            counts = np.bincount(assign, minlength=k)[:, None]
+            empty = counts[:, 0] == 0
+            c = np.where(empty[:, None], data[rng.choice(n, k)], sums / np.maximum(counts, 1))
+        centroids[j, :k] = c
+        centroids[j, k:] = c[0]  # con menos de 256 vectores se repite un centroide
+    return centroids
+
+
+def _nearest(data, c):
+    import numpy as np
+
+    # |x|^2 es constante por fila: no cambia el argmin
+    return np.argmin((c * c).sum(1)[None, :] - 2 * data @ c.T, axis=1)
+
+
+def pq_encode(x, centroids):
+    import numpy as np
+
+    m = centroids.shape[0]
+    sub = x.reshape(len(x), m, -1)
+    return np.stack([_nearest(sub[:, j, :], centroids[j]) for j in range(m)], axis=1).astype(np.uint8)
+
+
+# ---------- Almacenes compartidos ----------
+
+_stores: Dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(base: str, signature: str) -> VectorStore:
+    """Almacén del proceso para (directorio base, firma de embeddings)"""
+    path = os.path.join(base, slug(signature))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = VectorStore(path)
+        return _stores[path]
+
+
+def forget(base: str) -> None:
+    """Descarta los almacenes cargados bajo `base` (tras borrarlo en disco)"""
+    with _stores_lock:
+        for path in [p for p in _stores if p.startswith(base)]:
+            del _stores[path]
+
+
+def migrate_rag(rag_path: str) -> Dict[str, int]:
+    """
+    Mueve los embeddings en línea del JSONL del RAG al almacén y reescribe
+    el JSONL sin ellos (atómico). Las posiciones de línea no cambian.
+    """
+    import embeddings
+
+    with open(rag_path, "r", encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    moved = 0
+    by_sig: Dict[str, List[int]] = {}
+    for i, it in enumerate(items):
+        if it.get("embedding"):
+            by_sig.setdefault(embeddings.signature_of(it), []).append(i)
+    for signature, rows in by_sig.items():
+        store = open_store(rag_path + ".vec", signature)
+        moved += store.add([str(i) for i in rows], [items[i]["embedding"] for i in rows])
+        store.save()
+    tmp = f"{rag_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for it in items:
+            if it.get("embedding"):
+                it = dict(it, embed_provider=embeddings.signature_of(it))
+                it.pop("embedding")
+            f.write(json.dumps(it, ensure_ascii=False) + "\n")
+    os.replace(tmp, rag_path)
+    return {"items": len(items), "moved": moved}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate-rag":
+        target = sys.argv[2] if len(sys.argv) > 2 else os.getenv("RAG_PATH", "rag_store.jsonl")
+        before = os.path.getsize(target)
+        info = migrate_rag(target)
+        print(f"✅ {info['moved']} vectores movidos a {target}.vec/ "
+              f"({before / 1e6:.1f} MB -> {os.path.getsize(target) / 1e6:.1f} MB de JSONL)")
+    else:
+        print("💡 Uso: python vector_store.py migrate-rag [rag_store.jsonl]")